@@ -0,0 +1,79 @@
+"""
+Benchmark of the backends 'numpy' and 'numba' (see pyalchemy.backends).
+
+Reported is the throughput in grid points per second of
+ - the Coulomb potential of a molecule, Coulomb_3D.v, and
+ - the kernel of the transmutation N2 -> CO on the same molecule, kernel_nD_batch
+   with the midpoint rule and A = 1, b = 0,
+for both backends. The first call of the 'numba' backend compiles the loops and is
+not timed. Without numba, both rows use NumPy.
+
+Run with `python benchmarks/backends.py` with `src` on the PYTHONPATH.
+"""
+
+import time
+
+import numpy as np
+from pyalchemy.backends import available, numba
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.potentials import Coulomb_3D
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+N_2 = [[7, 0, 0, 0], [7, 2.076, 0, 0]]
+CO = [[6, 0, 0, 0], [8, 2.076, 0, 0]]
+points = np.random.default_rng(0).uniform(-5, 5, size=(200000, 3))
+rtol = 1e-4
+
+
+def A(lam):
+    return np.eye(3)
+
+
+def b(lam):
+    return np.zeros(3)
+
+
+# ------------------------------Potential differences---------------------------
+
+def Delta_v_numpy(X):
+    return Coulomb_3D(CO).v(X) - Coulomb_3D(N_2).v(X)
+
+
+if numba is not None:
+    _Delta_Z = np.array([[-1, 0, 0, 0], [1, 2.076, 0, 0]], dtype=float)
+
+    @numba.njit
+    def Delta_v_numba(y):
+        s = 0.0
+        for i in range(len(_Delta_Z)):
+            s -= _Delta_Z[i, 0]/np.sqrt((y[0] - _Delta_Z[i, 1])**2 + (y[1] - _Delta_Z[i, 2])**2 + (y[2] - _Delta_Z[i, 3])**2)
+        return s
+else:
+    Delta_v_numba = Delta_v_numpy
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def throughput(f, repeat=3):
+    f()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        f()
+    return repeat*len(points)/(time.perf_counter() - start)
+
+
+def run(backend):
+    Delta_v = Delta_v_numba if backend == 'numba' else Delta_v_numpy
+    return {'backend': backend,
+            'Coulomb_3D.v [points/s]': throughput(lambda: Coulomb_3D(N_2).v(points, backend=backend)),
+            'kernel_nD_batch [points/s]': throughput(lambda: kernel_nD_batch(Delta_v, points, A, b, rtol,
+                                                                             rule='midpoint', backend=backend), repeat=1)}
+
+
+if __name__ == '__main__':
+    print('available backends: ' + ', '.join(available()))
+    for backend in ('numpy', 'numba'):
+        result = run(backend)
+        print(', '.join(key + ' ' + ('{:.3g}'.format(value) if isinstance(value, float) else str(value)) for key, value in result.items()))
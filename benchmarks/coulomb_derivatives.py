@@ -0,0 +1,60 @@
+"""
+Benchmark of the derivatives of the Coulomb potential of a molecule.
+
+The analytical derivatives of Coulomb_3D.derivatives (recurrence of McMurchie and
+Davidson) are compared with the previous evaluation of the orders 4 to 8 in
+partial_v_mol_3D, i.e. recursive central differences with h = 0.01 on top of the
+analytical third derivatives, which need 2**(k-3) evaluations of the molecule for the
+k-th derivative. Reported are the wall time per point of the k-th x-derivative, of all
+derivatives up to order k at once, and the relative deviation of the finite differences.
+
+Run with `python benchmarks/coulomb_derivatives.py` with `src` on the PYTHONPATH.
+"""
+
+import time
+
+import numpy as np
+from pyalchemy.potentials import Coulomb_3D
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+# water
+mol = [[8, 0.0, 0.0, 0.0], [1, 1.43, 1.11, 0.0], [1, -1.43, 1.11, 0.0]]
+orders = range(4, 9)
+points = np.random.default_rng(0).uniform(-3, 3, size=(200, 3))
+h = 0.01
+
+
+# -------------------------The previous recursive version-----------------------
+
+def partial_v_fd(molecule, n_x, x, y, z):
+    # n_x-th x-derivative, recursive central differences above third order
+    if n_x <= 3:
+        indices, values = molecule.derivatives(n_x, [x, y, z])
+        return values[[tuple(index) for index in indices].index((n_x, 0, 0))]
+    return (partial_v_fd(molecule, n_x - 1, x+h, y, z) - partial_v_fd(molecule, n_x - 1, x-h, y, z))/(2*h)
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def run(k):
+    molecule = Coulomb_3D(mol)
+    start = time.perf_counter()
+    fd = np.array([partial_v_fd(molecule, k, *point) for point in points])
+    time_fd = time.perf_counter() - start
+    start = time.perf_counter()
+    indices, values = molecule.derivatives(k, points)
+    time_all = time.perf_counter() - start
+    exact = values[[tuple(index) for index in indices].index((k, 0, 0))]
+    return {'order': k,
+            'time fd [s/point]': time_fd/len(points),
+            'time analytic, all ' + str(len(indices)) + ' [s/point]': time_all/len(points),
+            'median rel dev fd': float(np.median(np.abs(fd - exact)/np.abs(exact))),
+            'max rel dev fd': float(np.max(np.abs(fd - exact)/np.abs(exact)))}
+
+
+if __name__ == '__main__':
+    for k in orders:
+        result = run(k)
+        print(', '.join(key + ' ' + ('{:.3g}'.format(value) if isinstance(value, float) else str(value)) for key, value in result.items()))
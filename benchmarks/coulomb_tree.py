@@ -0,0 +1,62 @@
+"""
+Benchmark of the Barnes-Hut evaluation of the Coulomb potential (Coulomb_3D with method='tree').
+
+For random molecules of increasing size, with the density of atoms of a protein (about
+one atom per 11 bohr^3) and charges of H, C, N and O, the potential and its gradient on
+random grid points in and around the molecule are compared with the direct sum over all
+atoms for several opening angles theta. Reported are the wall times and the median and
+largest relative deviations.
+
+Run with `python benchmarks/coulomb_tree.py` with `src` on the PYTHONPATH.
+"""
+
+import time
+
+import numpy as np
+from pyalchemy.potentials import Coulomb_3D
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+sizes = [500, 2000, 8000]
+thetas = [0.3, 0.5, 0.8]
+n_points = 50000
+rng = np.random.default_rng(0)
+
+
+def molecule(n_atoms):
+    edge = (11*n_atoms)**(1/3)
+    R = rng.uniform(-edge/2, edge/2, size=(n_atoms, 3))
+    Z = rng.choice([1, 6, 7, 8], size=n_atoms, p=[0.5, 0.3, 0.1, 0.1])
+    points = rng.uniform(-edge/2 - 5, edge/2 + 5, size=(n_points, 3))
+    return np.column_stack([Z, R]), points
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def deviation(error, reference):
+    relative = np.abs(error)/np.abs(reference)
+    return float(np.median(relative)), float(np.max(relative))
+
+
+def run(n_atoms):
+    mol, points = molecule(n_atoms)
+    start = time.perf_counter()
+    _, exact = Coulomb_3D(mol).derivatives(1, points)
+    rows = [{'atoms': n_atoms, 'method': 'direct', 'time [s]': time.perf_counter() - start}]
+    for theta in thetas:
+        start = time.perf_counter()
+        _, approx = Coulomb_3D(mol, method='tree', theta=theta).derivatives(1, points)
+        elapsed = time.perf_counter() - start
+        median_v, max_v = deviation(approx[0] - exact[0], exact[0])
+        median_g, max_g = deviation(np.linalg.norm(approx[1:] - exact[1:], axis=0), np.linalg.norm(exact[1:], axis=0))
+        rows.append({'atoms': n_atoms, 'method': 'tree, theta ' + str(theta), 'time [s]': elapsed,
+                     'median rel dev v': median_v, 'max rel dev v': max_v,
+                     'median rel dev grad': median_g, 'max rel dev grad': max_g})
+    return rows
+
+
+if __name__ == '__main__':
+    for n_atoms in sizes:
+        for result in run(n_atoms):
+            print(', '.join(key + ' ' + ('{:.3g}'.format(value) if isinstance(value, float) else str(value)) for key, value in result.items()))
@@ -0,0 +1,98 @@
+"""
+Benchmark of the quadrature rules of the lambda-integration in kernel_nD.
+
+For the 1D quantum harmonic oscillator (omega_A -> omega_B) and the 1D Morse
+potential (a_A -> a_B) the kernel is evaluated on the grids of the examples with
+every rule and compared against the current default, the midpoint rule, in
+evaluations of Delta_v per point, wall time and deviation from a converged reference
+(relative to the largest kernel on the grid).
+
+Run with `python benchmarks/lambda_quadrature.py` with `src` on the PYTHONPATH.
+"""
+
+import time
+
+import numpy as np
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.potentials import QHO, Morse
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+rtol = 1e-6
+rules = [('midpoint', {}),
+         ('gauss-legendre', {'order': 8}),
+         ('gauss-legendre', {'order': 16}),
+         ('gauss-kronrod', {'mode': 'batch'}),
+         ('gauss-kronrod', {'mode': 'point'}),
+         ('richardson', {'mode': 'batch'}),
+         ('richardson', {'mode': 'point'})]
+
+
+# ------------------------------------Systems-----------------------------------
+
+def QHO_system(omega_A=10.0, omega_B=12.0):
+    QHO_A, QHO_B = QHO(omega_A), QHO(omega_B)
+
+    def Delta_v(X):
+        return QHO_B.v(X[:, 0]) - QHO_A.v(X[:, 0])
+
+    # rho_lambda is rho_A scaled by sqrt(omega_lambda/omega_A), omega_lambda**2 being linear in lambda
+    def A(lam):
+        return np.array([[((omega_A**2 + lam*(omega_B**2 - omega_A**2))/omega_A**2)**0.25]])
+
+    def b(lam):
+        return np.zeros(1)
+
+    return Delta_v, A, b, np.linspace(-30, 30, 2**8 + 1)
+
+
+def Morse_system(D=22, a_A=1.0, a_B=1.2):
+    Morse_A, Morse_B = Morse(D, a_A, 0), Morse(D, a_B, 0)
+
+    def Delta_v(X):
+        return Morse_B.v(X[:, 0]) - Morse_A.v(X[:, 0])
+
+    def A(lam):
+        return np.array([[1 + lam*(a_B/a_A - 1)]])
+
+    def b(lam):
+        return np.zeros(1)
+
+    return Delta_v, A, b, np.linspace(-30, 70, 2**13 + 1)
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def run(system):
+    Delta_v, A, b, x = system
+    X = x[:, None]
+    with np.errstate(all='ignore'):
+        reference = kernel_nD_batch(Delta_v, X, A, b, 1e-13, rule='gauss-kronrod')
+    results = []
+    for rule, options in rules:
+        start = time.perf_counter()
+        with np.errstate(all='ignore'):
+            K, error, evaluations = kernel_nD_batch(Delta_v, X, A, b, rtol, rule=rule, full_output=True, **options)
+        elapsed = time.perf_counter() - start
+        # deviations and errors relative to the largest kernel on the grid
+        scale = np.max(np.abs(reference))
+        deviation = np.max(np.abs(K - reference))/scale
+        # the midpoint rule has no error estimate
+        error = np.max(error)/scale if rule != 'midpoint' else np.nan
+        results.append([rule, options, evaluations.mean(), elapsed, deviation, error])
+    return results
+
+
+if __name__ == '__main__':
+    for name, system in [('QHO', QHO_system()), ('Morse', Morse_system())]:
+        print(name)
+        print('{:<16}{:<20}{:>10}{:>12}{:>16}{:>16}'.format('rule', 'options', 'evals/pt', 'time [s]', 'rel. dev.', 'est. rel. err.'))
+        results = run(system)
+        for rule, options, evaluations, elapsed, deviation, error in results:
+            print('{:<16}{:<20}{:>10.1f}{:>12.4f}{:>16.2e}{:>16.2e}'.format(rule, str(options), evaluations, elapsed, deviation, error))
+        midpoint = results[0]
+        # the fastest rule which is at least as accurate as demanded
+        best = min([result for result in results[1:] if result[4] <= rtol], key=lambda result: result[3])
+        print('fastest rule within rtol: ' + best[0] + ' ' + str(best[1]) + ', {:.1f}x fewer evaluations, {:.1f}x faster than the midpoint rule'.format(midpoint[2]/best[2], midpoint[3]/best[3]))
+        print()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the densities of the 1D Morse potential.
+
+The log-space Morse.rho_all, which returns all bound states at once, is compared
+with the previous scalar evaluation of z**(2l-2n-1)*exp(-z)/gamma(2l-n) point by point
+on the 2**13 + 1 point Romberg grid of the Morse example, for the wells of the example
+(D up to 44) and a deep well. Reported are the wall time, the number of non-finite
+values and the normalization of every state.
+
+Run with `python benchmarks/morse_density.py` with `src` on the PYTHONPATH.
+"""
+
+import time
+
+import numpy as np
+from scipy.integrate import romb
+from scipy.special import gamma
+
+from pyalchemy.potentials import Morse
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+wells = [(22, 1.0, 0), (44, 1.0, 0), (44, 1.2, 0), (400, 0.5, 0)]
+x = np.linspace(-30, 70, 2**13 + 1)
+
+
+# -------------------------The previous scalar version--------------------------
+
+def _fc(n):
+    if n == 0 or n == 1:
+        return 1
+    else:
+        return n*_fc(n-1)
+
+
+def _L(n, alpha, x):
+    if n == 0:
+        return 1
+    elif n == 1:
+        return 1 + alpha - x
+    else:
+        return ((2*(n - 1) + 1 + alpha - x)*_L(n - 1, alpha, x) - (n - 1 + alpha)*_L(n - 2, alpha, x))/n
+
+
+def rho_scalar(Morse_A, n, x):
+    l = np.sqrt(2*Morse_A.D)/Morse_A.a
+    z = 2*l*np.exp(-Morse_A.a*(x - Morse_A.r_e))
+    N_squared = _fc(n)*(2*l - 2*n - 1)/(gamma(2*l - n))
+    return Morse_A.a*N_squared*z**(2*l - 2*n - 1)*np.exp(-z)*(_L(n, 2*l-2*n-1, z))**2
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def run(D, a, r_e, n_max=None):
+    Morse_A = Morse(D, a, r_e)
+    dx = x[1] - x[0]
+    start = time.perf_counter()
+    rho_all = Morse_A.rho_all(x)
+    time_new = time.perf_counter() - start
+    n_states = len(rho_all) if n_max is None else min(n_max + 1, len(rho_all))
+    start = time.perf_counter()
+    with np.errstate(all='ignore'):
+        rho_old = np.array([[rho_scalar(Morse_A, n, y) for y in x] for n in range(n_states)])
+    time_old = time.perf_counter() - start
+    return {'states': n_states,
+            'time old [s]': time_old,
+            'time new [s]': time_new*n_states/len(rho_all),
+            'non-finite old': int(np.sum(~np.isfinite(rho_old))),
+            'non-finite new': int(np.sum(~np.isfinite(rho_all[:n_states]))),
+            'worst norm old': np.nanmax(np.abs(romb(np.nan_to_num(rho_old, posinf=0, neginf=0), dx=dx, axis=-1) - 1)),
+            'worst norm new': np.max(np.abs(romb(rho_all[:n_states], dx=dx, axis=-1) - 1))}
+
+
+if __name__ == '__main__':
+    for D, a, r_e in wells:
+        # the scalar version is far too slow for all states of the deep well
+        result = run(D, a, r_e, n_max=12 if D > 100 else None)
+        print('D = ' + str(D) + ', a = ' + str(a) + ': ' + ', '.join(key + ' ' + ('{:.3g}'.format(value) if isinstance(value, float) else str(value)) for key, value in result.items()))
@@ -0,0 +1,145 @@
+"""
+Runner of the regression benchmarks in `benchmarks/suite.py`.
+
+Every ``time_*`` method is timed for all combinations of its parameters (the best of
+``--repeat`` samples of at least 50 ms each, after one warm-up run) and every ``track_*``
+method is recorded. The results are compared with a stored baseline, `benchmarks/baseline.json`
+by default, and reported as ratios current/baseline; timings above ``--threshold`` times their
+baseline and tracked values which changed by more than a relative 1e-6 are marked as regressions.
+A slow timing is measured again ``--confirm`` times before it counts, and the best of all its
+samples is compared, so that a single noisy run, e.g. on a busy machine, is not reported.
+
+Run with `python benchmarks/run_suite.py` with `src` on the PYTHONPATH. Useful options:
+    --filter NAME       only benchmarks whose name contains NAME
+    --save FILE         store the results in FILE
+    --update-baseline   store the results as the new baseline
+    --fail              exit with status 1 if there are regressions, e.g. in nightly jobs
+    --confirm N         number of runs which must confirm a slow timing (default 2)
+"""
+
+import argparse
+import inspect
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+import suite
+
+# ----------------------------------Parameters----------------------------------
+
+baseline_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+track_rtol = 1e-6
+# shortest duration of a timed sample in s; short benchmarks are called repeatedly
+min_time = 0.05
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def benchmarks(pattern=''):
+    # (name, class, method, parameters) of all benchmarks of the suite
+    for class_name, cls in inspect.getmembers(suite, inspect.isclass):
+        if cls.__module__ != suite.__name__:
+            continue
+        for method in sorted(name for name in vars(cls) if name.startswith(('time_', 'track_'))):
+            for parameters in itertools.product(*getattr(cls, 'params', [])):
+                name = class_name + '.' + method + '(' + ', '.join(str(p) for p in parameters) + ')'
+                if pattern in name:
+                    yield name, cls, method, parameters
+
+
+def measure(cls, method, parameters, repeat):
+    instance = cls()
+    if hasattr(instance, 'setup'):
+        instance.setup(*parameters)
+    function = getattr(instance, method)
+    if method.startswith('track_'):
+        return float(function(*parameters))
+    # warm-up, e.g. caches and compilation, and the number of calls per sample such that it lasts min_time
+    start = time.perf_counter()
+    function(*parameters)
+    number = max(1, int(np.ceil(min_time/max(time.perf_counter() - start, 1e-9))))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function(*parameters)
+        timings.append((time.perf_counter() - start)/number)
+    return min(timings)
+
+
+def compare(results, baseline, threshold):
+    # rows (name, baseline, current, ratio, status) and the number of regressions
+    rows, regressions = [], 0
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append((name, np.nan, value, np.nan, 'new'))
+            continue
+        ratio = value/reference if reference else np.inf if value else 1.0
+        if '.track_' in name:
+            regression = abs(value - reference) > track_rtol*max(abs(reference), 1e-300)
+        else:
+            regression = ratio > threshold
+        status = 'REGRESSION' if regression else 'faster' if ratio < 1/threshold else ''
+        regressions += regression
+        rows.append((name, reference, value, ratio, status))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the regression benchmarks of pyalchemy.')
+    parser.add_argument('--filter', default='', help='only benchmarks whose name contains this string')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed samples, the best is reported')
+    parser.add_argument('--baseline', default=baseline_file, help='the stored baseline')
+    parser.add_argument('--threshold', type=float, default=2.0, help='slowdown which counts as a regression')
+    parser.add_argument('--save', help='store the results in this file')
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--fail', action='store_true', help='exit with status 1 if there are regressions')
+    parser.add_argument('--confirm', type=int, default=2, help='number of runs which must confirm a slow timing')
+    args = parser.parse_args()
+
+    results, found = {}, {}
+    for name, cls, method, parameters in benchmarks(args.filter):
+        results[name] = measure(cls, method, parameters, args.repeat)
+        found[name] = (cls, method, parameters)
+        print('{:<50}{:>14.4g}'.format(name, results[name]), file=sys.stderr)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    rows, regressions = compare(results, baseline, args.threshold)
+    # measure slow timings again; only if the best of all runs is still slow, it is a regression
+    for _ in range(args.confirm - 1):
+        slow = [name for name, *_, status in rows if status == 'REGRESSION' and '.time_' in name]
+        if not slow:
+            break
+        for name in slow:
+            results[name] = min(results[name], measure(*found[name], args.repeat))
+            print('{:<50}{:>14.4g}  (confirmation)'.format(name, results[name]), file=sys.stderr)
+        rows, regressions = compare(results, baseline, args.threshold)
+    print('{:<50}{:>14}{:>14}{:>10}  {}'.format('benchmark', 'baseline', 'current', 'ratio', 'status'))
+    for name, reference, value, ratio, status in rows:
+        print('{:<50}{:>14.4g}{:>14.4g}{:>10.2f}  {}'.format(name, reference, value, ratio, status))
+    print(str(regressions) + ' regression(s) against ' + args.baseline)
+
+    record = {'machine': platform.platform(), 'python': platform.python_version(), 'numpy': np.__version__,
+              'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}
+    for path in [args.save] + ([args.baseline] if args.update_baseline else []):
+        if path:
+            if path == args.baseline and args.filter:
+                # keep the benchmarks which were not run
+                record['results'] = {**baseline, **results}
+            with open(path, 'w') as file:
+                json.dump(record, file, indent=1, sort_keys=True)
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Regression benchmarks of pyalchemy, run by `benchmarks/run_suite.py`.
+
+Covered are
+ - kernel_nD point by point and kernel_nD_batch on whole grids, for several rtol and dimensions,
+ - the kernels kernel_1D, kernel_2D and kernel_3D of version 0.0.7 for several orders,
+ - v and rho of every class in pyalchemy.potentials (derivatives and delta_v where there is no rho),
+ - the energy differences of the QHO, Morse and hydrogen-like examples, including their error.
+
+The classes follow the conventions of asv: ``params`` and ``param_names``, ``setup(*params)``,
+``time_*`` methods whose run time is measured and ``track_*`` methods whose return value is
+recorded. They only need `src` on the PYTHONPATH.
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+from pyalchemy.kernels import kernel_nD, kernel_nD_batch, transform_plan
+from pyalchemy.potentials import QHO, Morse, hydlike, Coulomb_3D, CoulombColumns
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+rng = np.random.default_rng(0)
+N_2 = [[7, 0, 0, 0], [7, 2.076, 0, 0]]
+# a cluster of 64 atoms for the potentials of molecules
+cluster = np.column_stack([rng.choice([1, 6, 7, 8], size=64), rng.uniform(-6, 6, size=(64, 3))])
+
+
+def _load_0_0_7(name):
+    # the modules of version 0.0.7 are not on the PYTHONPATH, they are loaded from their files
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pyalchemy0.0.7', name + '.py')
+    spec = importlib.util.spec_from_file_location('pyalchemy_0_0_7_' + name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ------------------------------------Systems-----------------------------------
+
+def harmonic(omega_A, omega_B, dim):
+    # isotropic harmonic oscillators in dim dimensions; rho_lambda is rho_A scaled by sqrt(omega_lambda/omega_A)
+    def Delta_v(X):
+        return 0.5*(omega_B**2 - omega_A**2)*np.sum(X**2, axis=-1)
+
+    def A(lam):
+        return ((omega_A**2 + lam*(omega_B**2 - omega_A**2))/omega_A**2)**0.25*np.eye(dim)
+
+    def b(lam):
+        return np.zeros(dim)
+
+    return Delta_v, A, b
+
+
+def harmonic_0_0_7(omega):
+    # partial_v(n_1, ..., n_dim, x_1, ..., x_dim) of an isotropic harmonic oscillator
+    def partial_v(*arguments):
+        n, x = arguments[:len(arguments)//2], arguments[len(arguments)//2:]
+        if sum(n) == 0:
+            return 0.5*omega**2*sum(x_i**2 for x_i in x)
+        if sum(n) == 1:
+            return omega**2*x[n.index(1)]
+        if max(n) == 2 and sum(n) == 2:
+            return omega**2
+        return 0
+    return partial_v
+
+
+def delta_E_system(name):
+    # the energy difference of the examples: rho_A, Delta_v, A, b, the grid, its weights and the exact result
+    if name == 'QHO':
+        A_sys, B_sys, n = QHO(10.0), QHO(12.0), 1
+        Delta_v, A, b = harmonic(10.0, 12.0, 1)
+        x = np.linspace(-30, 30, 2**12 + 1)
+        weights = np.full(len(x), x[1] - x[0])
+        return A_sys.rho(n, x), Delta_v, A, b, x, weights, B_sys.E(n) - A_sys.E(n)
+    if name == 'Morse':
+        D, a_A, a_B, n = 22, 1.0, 1.2, 1
+        A_sys, B_sys = Morse(D, a_A, 0), Morse(D, a_B, 0)
+        x = np.linspace(-30, 70, 2**13 + 1)
+        weights = np.full(len(x), x[1] - x[0])
+        return (A_sys.rho(n, x), lambda X: B_sys.v(X[:, 0]) - A_sys.v(X[:, 0]),
+                lambda lam: np.array([[1 + lam*(a_B/a_A - 1)]]), lambda lam: np.zeros(1),
+                x, weights, B_sys.E(n) - A_sys.E(n))
+    if name == 'hydlike':
+        # radial integration of the spherically averaged density; rho_lambda is rho_A scaled by Z_lambda/Z_A
+        Z_A, Z_B, n = 9, 6, 2
+        A_sys, B_sys = hydlike(Z_A), hydlike(Z_B)
+        r = np.linspace(0, 20, 2**13 + 1)[1:]
+        weights = 4*np.pi*r**2*(r[1] - r[0])
+        return (A_sys.rho(n, r), lambda X: B_sys.v(X[:, 0]) - A_sys.v(X[:, 0]),
+                lambda lam: np.array([[(Z_A + lam*(Z_B - Z_A))/Z_A]]), lambda lam: np.zeros(1),
+                r, weights, -(Z_B**2 - Z_A**2)/(2*n**2))
+    raise ValueError("System '" + str(name) + "' is not supported!")
+
+
+# ----------------------------------Benchmarks----------------------------------
+
+class KernelND:
+    params = [[1e-3, 1e-4, 1e-6], [1, 2, 3]]
+    param_names = ['rtol', 'dim']
+
+    def setup(self, rtol, dim):
+        self.Delta_v, self.A, self.b = harmonic(10.0, 12.0, dim)
+        self.X = rng.uniform(-1, 1, size=(10000, dim))
+        transform_plan.cache_clear()
+
+    def time_per_point(self, rtol, dim):
+        # 100 positions, point by point
+        for x in self.X[:100]:
+            kernel_nD(self.Delta_v, x, self.A, self.b, rtol)
+
+    def time_batch(self, rtol, dim):
+        # 10000 positions at once
+        kernel_nD_batch(self.Delta_v, self.X, self.A, self.b, rtol)
+
+
+class Kernel007:
+    params = [[1, 2, 3], [3, 5]]
+    param_names = ['dim', 'max_order']
+
+    def setup(self, dim, max_order):
+        kernels = _load_0_0_7('kernels')
+        self.kernel = [kernels.kernel_1D, kernels.kernel_2D, kernels.kernel_3D][dim - 1]
+        self.partial_v_A, self.partial_v_B = harmonic_0_0_7(10.0), harmonic_0_0_7(12.0)
+        self.X = rng.uniform(-1, 1, size=(100, dim))
+        self.orders = list(range(1, max_order + 1))
+
+    def time_kernel(self, dim, max_order):
+        # 100 positions
+        for x in self.X:
+            self.kernel(self.partial_v_A, self.partial_v_B, *x, orders=self.orders)
+
+
+class Potentials:
+    params = [['QHO', 'Morse', 'hydlike']]
+    param_names = ['system']
+
+    def setup(self, system):
+        self.system = {'QHO': QHO(10.0), 'Morse': Morse(22, 1.0, 0), 'hydlike': hydlike(1.0)}[system]
+        self.x = np.linspace(0.01, 10, 100000)
+
+    def time_v(self, system):
+        self.system.v(self.x)
+
+    def time_rho(self, system):
+        # the third excited state (n = 3)
+        self.system.rho(3, self.x)
+
+
+class Molecules:
+    params = [['direct', 'tree']]
+    param_names = ['method']
+
+    def setup(self, method):
+        self.molecule = Coulomb_3D(cluster, method=method)
+        self.points = rng.uniform(-8, 8, size=(20000, 3))
+        self.columns = CoulombColumns(cluster, self.points)
+
+    def time_v(self, method):
+        self.molecule.v(self.points)
+
+    def time_derivatives(self, method):
+        # all derivatives up to second order
+        self.molecule.derivatives(2, self.points)
+
+    def time_delta_v(self, method):
+        # a single-site mutation from the cached columns; independent of the method
+        self.columns.delta_v({0: 5})
+
+
+class DeltaE:
+    params = [['QHO', 'Morse', 'hydlike']]
+    param_names = ['system']
+
+    def setup(self, system):
+        self.rho, self.Delta_v, self.A, self.b, self.x, self.weights, self.exact = delta_E_system(system)
+
+    def delta_E(self):
+        with np.errstate(all='ignore'):
+            K = kernel_nD_batch(self.Delta_v, self.x[:, None], self.A, self.b, 1e-4)
+        return np.sum(self.weights*self.rho*K)
+
+    def time_delta_E(self, system):
+        self.delta_E()
+
+    def track_relative_error(self, system):
+        return abs(self.delta_E()/self.exact - 1)
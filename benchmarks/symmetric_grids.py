@@ -0,0 +1,78 @@
+"""
+Benchmark of the reduced grids of symmetric systems (pyalchemy.grids.reduced_grid) against the full
+Becke-Lebedev grids (pyalchemy.grids.molecular_grid).
+
+ - spherical: the hydrogen-like atom, Z_A = 9 -> Z_B = 6 in its first excited state, with the kernel
+   of the scaling transformation; compared with the exact energy difference,
+ - axial: N2 -> NO with a superposition of 1s-like densities and the kernel v_B - v_A; compared with
+   the reduced grid of the finest level.
+
+Reported are the number of grid points, the wall time of the energy difference (without building the
+grid) and the relative error for several levels.
+
+Run with `python benchmarks/symmetric_grids.py` with `src` on the PYTHONPATH.
+"""
+
+import time
+
+import numpy as np
+from pyalchemy.grids import molecular_grid, reduced_grid
+from pyalchemy.integrate import delta_E
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.potentials import hydlike, Coulomb_3D
+
+# ----------------------------------Parameters----------------------------------
+# Use Hartree atomic units throughout!!!
+
+levels = [1, 3, 5]
+Z_A, Z_B, n = 9, 6, 2
+N_2, NO = [[7, 0, 0, 0], [7, 2.076, 0, 0]], [[7, 0, 0, 0], [8, 2.076, 0, 0]]
+
+
+# ------------------------------------Systems-----------------------------------
+
+def rho_atom(X):
+    return hydlike(Z_A).rho(n, np.linalg.norm(X, axis=1))
+
+
+def Delta_v_atom(X):
+    r = np.linalg.norm(X, axis=1)
+    return hydlike(Z_B).v(r) - hydlike(Z_A).v(r)
+
+
+def kernel_atom(X):
+    # rho_lambda is rho_A scaled by Z_lambda/Z_A
+    return kernel_nD_batch(Delta_v_atom, X, lambda lam: (Z_A + lam*(Z_B - Z_A))/Z_A*np.eye(3),
+                           lambda lam: np.zeros(3), 1e-4)
+
+
+def rho_molecule(X):
+    # 1s-like densities of all electrons at the nuclei
+    return sum(Z**4/(8*np.pi)*np.exp(-Z*np.linalg.norm(X - R, axis=1)) for Z, *R in N_2)
+
+
+def kernel_molecule(X):
+    return Coulomb_3D(NO).v(X) - Coulomb_3D(N_2).v(X)
+
+
+# ----------------------------------Benchmark-----------------------------------
+
+def run(name, rho, kernel, mol, others, exact):
+    print(name)
+    print('{:>6}{:>12}{:>12}{:>12}{:>12}{:>12}{:>12}'.format('level', 'points 3D', 'reduced', 'time 3D', 'reduced',
+                                                            'error 3D', 'reduced'))
+    for level in levels:
+        row = []
+        for points, weights in [molecular_grid(mol, level, cache=False), reduced_grid(mol, level, others=others)]:
+            start = time.perf_counter()
+            Delta_E = delta_E(rho, kernel, points, weights, workers=1)
+            row.append((len(weights), time.perf_counter() - start, abs(Delta_E/exact - 1)))
+        (n_3D, t_3D, e_3D), (n_reduced, t_reduced, e_reduced) = row
+        print('{:>6}{:>12}{:>12}{:>12.4g}{:>12.4g}{:>12.2e}{:>12.2e}'.format(level, n_3D, n_reduced, t_3D, t_reduced,
+                                                                           e_3D, e_reduced))
+
+
+if __name__ == '__main__':
+    run('spherical: hydrogen-like atom', rho_atom, kernel_atom, [[Z_A, 0, 0, 0]], [], -(Z_B**2 - Z_A**2)/(2*n**2))
+    reference = delta_E(rho_molecule, kernel_molecule, *reduced_grid(N_2, 9, others=[NO]), workers=1)
+    run('axial: N2 -> NO', rho_molecule, kernel_molecule, N_2, [NO], reference)
@@ -6,6 +6,10 @@ Throughout this code, Hartree atomic units are used.
 
 """
 
+from functools import lru_cache
+
+import numpy as np
+
 # Regulator for numerically instable fractions like v_B/v_A
 _reg = 1e-8
 
@@ -20,117 +24,147 @@ def _fc(n):
 def _bn(n,k):
     return _fc(n)/(_fc(k)*_fc(n-k))
 
-def _Diophantine_1D(p):
+def _partitions(n):
+    """
+    Return all partitions of n as multiplicity vectors [k_1, ..., k_n], i.e.
+    k_1 + 2*k_2 + ... + n*k_n = n
     """
-    Find all (1+p-1)-tuples of non-negative integers which fulfill:
-    k_1 + ... + k_(p-1) = p-1
-    k_1 + 2*k_2 + ... + (p-1)*k_(p-1) = mu_x
+    partitions = []
+    k = [0]*n
+
+    def fill(rest, i):
+        # distribute rest over the parts 1, ..., i
+        if i == 0:
+            if rest == 0:
+                partitions.append(k.copy())
+            return
+        for k_i in range(rest//i, -1, -1):
+            k[i-1] = k_i
+            fill(rest - i*k_i, i - 1)
+        k[i-1] = 0
+
+    fill(n, n)
+    return partitions
+
 
-    Return an array of arrays: [[mu_x, k_1, ..., k_(p-1)], ..., [mu_x, k_1, ..., k_(p-1)]]
+def _compositions(m, dim):
     """
-    if p == 2:
-        return [[1, 1]]
-    elif p == 3:
-        return [[1, 0, 1], [2, 2, 0]]
-    elif p == 4:
-        return [[1, 0, 0, 1], [2, 1, 1, 0], [3, 3, 0, 0]]
-    elif p == 5:
-        return [[1, 0, 0, 0, 1], [2, 0, 2, 0, 0], [2, 1, 0, 1, 0], [3, 2, 1, 0, 0], [4, 4, 0, 0, 0]]
-    elif p == 6:
-        return [[1, 0, 0, 0, 0, 1], [2, 0, 1, 1, 0, 0], [2, 1, 0, 0, 1, 0], [3, 1, 2, 0, 0, 0], [3, 2, 0, 1, 0, 0], [4, 3, 1, 0, 0, 0], [5, 5, 0, 0, 0, 0]]
-    elif p == 7:
-        return [[1, 0, 0, 0, 0, 0, 1], [2, 0, 0, 2, 0, 0, 0], [2, 0, 1, 0, 1, 0, 0], [2, 1, 0, 0, 0, 1, 0], [3, 0, 3, 0, 0, 0, 0], [3, 1, 1, 1, 0, 0, 0], [3, 2, 0, 0, 1, 0, 0], [4, 2, 2, 0, 0, 0, 0], [4, 3, 0, 1, 0, 0, 0], [5, 4, 1, 0, 0, 0, 0], [6, 6, 0, 0, 0, 0, 0]]
-    elif p == 8:
-        return [[1, 0, 0, 0, 0, 0, 0, 1], [2, 0, 0, 1, 1, 0, 0, 0], [2, 0, 1, 0, 0, 1, 0, 0], [2, 1, 0, 0, 0, 0, 1, 0], [3, 0, 2, 1, 0, 0, 0, 0], [3, 1, 0, 2, 0, 0, 0, 0], [3, 1, 1, 0, 1, 0, 0, 0], [3, 2, 0, 0, 0, 1, 0, 0], [4, 1, 3, 0, 0, 0, 0, 0], [4, 2, 1, 1, 0, 0, 0, 0], [4, 3, 0, 0, 1, 0, 0, 0], [5, 3, 2, 0, 0, 0, 0, 0], [5, 4, 0, 1, 0, 0, 0, 0], [6, 5, 1, 0, 0, 0, 0, 0], [7, 7, 0, 0, 0, 0, 0, 0]]
-    elif p == 9:
-        return [[1, 0, 0, 0, 0, 0, 0, 0, 1], [2, 0, 0, 0, 2, 0, 0, 0, 0], [2, 0, 0, 1, 0, 1, 0, 0, 0], [2, 0, 1, 0, 0, 0, 1, 0, 0], [2, 1, 0, 0, 0, 0, 0, 1, 0], [3, 0, 1, 2, 0, 0, 0, 0, 0], [3, 0, 2, 0, 1, 0, 0, 0, 0], [3, 1, 0, 1, 1, 0, 0, 0, 0], [3, 1, 1, 0, 0, 1, 0, 0, 0], [3, 2, 0, 0, 0, 0, 1, 0, 0], [4, 0, 4, 0, 0, 0, 0, 0, 0], [4, 1, 2, 1, 0, 0, 0, 0, 0], [4, 2, 0, 2, 0, 0, 0, 0, 0], [4, 2, 1, 0, 1, 0, 0, 0, 0], [4, 3, 0, 0, 0, 1, 0, 0, 0], [5, 2, 3, 0, 0, 0, 0, 0, 0], [5, 3, 1, 1, 0, 0, 0, 0, 0], [5, 4, 0, 0, 1, 0, 0, 0, 0], [6, 4, 2, 0, 0, 0, 0, 0, 0], [6, 5, 0, 1, 0, 0, 0, 0, 0], [7, 6, 1, 0, 0, 0, 0, 0, 0], [8, 8, 0, 0, 0, 0, 0, 0, 0]]
-    else:
-        raise ValueError("p = "+str(p)+" is not supported!")
+    Return all dim-tuples of non-negative integers which sum up to m
+    """
+    if dim == 1:
+        return [[m]]
+    return [[mu] + rest for mu in range(m+1) for rest in _compositions(m - mu, dim - 1)]
 
-def _Diophantine_2D(p):
+
+@lru_cache(maxsize=None)
+def _Diophantine(p, dim):
     """
-    Find all (2+p-1)-tuples of non-negative integers which fulfill:
-    k_1 + ... + k_(p-1) = p-1
-    k_1 + 2*k_2 + ... + (p-1)*k_(p-1) = mu_x + mu_y
+    Find all (dim+p-1)-tuples of non-negative integers which fulfill:
+    k_1 + 2*k_2 + ... + (p-1)*k_(p-1) = p-1
+    k_1 + ... + k_(p-1) = mu_1 + ... + mu_dim
 
-    Return an array of arrays: [[mu_x, mu_y, k_1, ..., k_(p-1)], ..., [mu_x, mu_y, k_1, ..., k_(p-1)]]
+    Return an integer array of shape (rows, dim+p-1): [[mu_1, ..., mu_dim, k_1, ..., k_(p-1)], ...]
+    in lexicographic order and the coefficients 1/(k_1! * ... * k_(p-1)!) of all rows
     """
-    if p == 2:
-        return [[1, 0, 1], [0, 1, 1]]
-    elif p == 3:
-        return [[0, 1, 0, 1], [0, 2, 2, 0], [1, 0, 0, 1], [1, 1, 2, 0], [2, 0, 2, 0]]
-    elif p == 4:
-        return [[0, 1, 0, 0, 1], [0, 2, 1, 1, 0], [0, 3, 3, 0, 0], [1, 0, 0, 0, 1], [1, 1, 1, 1, 0], [1, 2, 3, 0, 0], [2, 0, 1, 1, 0], [2, 1, 3, 0, 0], [3, 0, 3, 0, 0]]
-    elif p == 5:
-        return [[0, 1, 0, 0, 0, 1], [0, 2, 0, 2, 0, 0], [0, 2, 1, 0, 1, 0], [0, 3, 2, 1, 0, 0], [0, 4, 4, 0, 0, 0], [1, 0, 0, 0, 0, 1], [1, 1, 0, 2, 0, 0], [1, 1, 1, 0, 1, 0], [1, 2, 2, 1, 0, 0], [1, 3, 4, 0, 0, 0], [2, 0, 0, 2, 0, 0], [2, 0, 1, 0, 1, 0], [2, 1, 2, 1, 0, 0], [2, 2, 4, 0, 0, 0], [3, 0, 2, 1, 0, 0], [3, 1, 4, 0, 0, 0], [4, 0, 4, 0, 0, 0]]
-    elif p == 6:
-        return [[0, 1, 0, 0, 0, 0, 1], [0, 2, 0, 1, 1, 0, 0], [0, 2, 1, 0, 0, 1, 0], [0, 3, 1, 2, 0, 0, 0], [0, 3, 2, 0, 1, 0, 0], [0, 4, 3, 1, 0, 0, 0], [0, 5, 5, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 1], [1, 1, 0, 1, 1, 0, 0], [1, 1, 1, 0, 0, 1, 0], [1, 2, 1, 2, 0, 0, 0], [1, 2, 2, 0, 1, 0, 0], [1, 3, 3, 1, 0, 0, 0], [1, 4, 5, 0, 0, 0, 0], [2, 0, 0, 1, 1, 0, 0], [2, 0, 1, 0, 0, 1, 0], [2, 1, 1, 2, 0, 0, 0], [2, 1, 2, 0, 1, 0, 0], [2, 2, 3, 1, 0, 0, 0], [2, 3, 5, 0, 0, 0, 0], [3, 0, 1, 2, 0, 0, 0], [3, 0, 2, 0, 1, 0, 0], [3, 1, 3, 1, 0, 0, 0], [3, 2, 5, 0, 0, 0, 0], [4, 0, 3, 1, 0, 0, 0], [4, 1, 5, 0, 0, 0, 0], [5, 0, 5, 0, 0, 0, 0]]
-    elif p == 7:
-        return [[0, 1, 0, 0, 0, 0, 0, 1], [0, 2, 0, 0, 2, 0, 0, 0], [0, 2, 0, 1, 0, 1, 0, 0], [0, 2, 1, 0, 0, 0, 1, 0], [0, 3, 0, 3, 0, 0, 0, 0], [0, 3, 1, 1, 1, 0, 0, 0], [0, 3, 2, 0, 0, 1, 0, 0], [0, 4, 2, 2, 0, 0, 0, 0], [0, 4, 3, 0, 1, 0, 0, 0], [0, 5, 4, 1, 0, 0, 0, 0], [0, 6, 6, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 1], [1, 1, 0, 0, 2, 0, 0, 0], [1, 1, 0, 1, 0, 1, 0, 0], [1, 1, 1, 0, 0, 0, 1, 0], [1, 2, 0, 3, 0, 0, 0, 0], [1, 2, 1, 1, 1, 0, 0, 0], [1, 2, 2, 0, 0, 1, 0, 0], [1, 3, 2, 2, 0, 0, 0, 0], [1, 3, 3, 0, 1, 0, 0, 0], [1, 4, 4, 1, 0, 0, 0, 0], [1, 5, 6, 0, 0, 0, 0, 0], [2, 0, 0, 0, 2, 0, 0, 0], [2, 0, 0, 1, 0, 1, 0, 0], [2, 0, 1, 0, 0, 0, 1, 0], [2, 1, 0, 3, 0, 0, 0, 0], [2, 1, 1, 1, 1, 0, 0, 0], [2, 1, 2, 0, 0, 1, 0, 0], [2, 2, 2, 2, 0, 0, 0, 0], [2, 2, 3, 0, 1, 0, 0, 0], [2, 3, 4, 1, 0, 0, 0, 0], [2, 4, 6, 0, 0, 0, 0, 0], [3, 0, 0, 3, 0, 0, 0, 0], [3, 0, 1, 1, 1, 0, 0, 0], [3, 0, 2, 0, 0, 1, 0, 0], [3, 1, 2, 2, 0, 0, 0, 0], [3, 1, 3, 0, 1, 0, 0, 0], [3, 2, 4, 1, 0, 0, 0, 0], [3, 3, 6, 0, 0, 0, 0, 0], [4, 0, 2, 2, 0, 0, 0, 0], [4, 0, 3, 0, 1, 0, 0, 0], [4, 1, 4, 1, 0, 0, 0, 0], [4, 2, 6, 0, 0, 0, 0, 0], [5, 0, 4, 1, 0, 0, 0, 0], [5, 1, 6, 0, 0, 0, 0, 0], [6, 0, 6, 0, 0, 0, 0, 0]]
-    elif p == 8:
-        return [[0, 1, 0, 0, 0, 0, 0, 0, 1], [0, 2, 0, 0, 1, 1, 0, 0, 0], [0, 2, 0, 1, 0, 0, 1, 0, 0], [0, 2, 1, 0, 0, 0, 0, 1, 0], [0, 3, 0, 2, 1, 0, 0, 0, 0], [0, 3, 1, 0, 2, 0, 0, 0, 0], [0, 3, 1, 1, 0, 1, 0, 0, 0], [0, 3, 2, 0, 0, 0, 1, 0, 0], [0, 4, 1, 3, 0, 0, 0, 0, 0], [0, 4, 2, 1, 1, 0, 0, 0, 0], [0, 4, 3, 0, 0, 1, 0, 0, 0], [0, 5, 3, 2, 0, 0, 0, 0, 0], [0, 5, 4, 0, 1, 0, 0, 0, 0], [0, 6, 5, 1, 0, 0, 0, 0, 0], [0, 7, 7, 0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0, 1], [1, 1, 0, 0, 1, 1, 0, 0, 0], [1, 1, 0, 1, 0, 0, 1, 0, 0], [1, 1, 1, 0, 0, 0, 0, 1, 0], [1, 2, 0, 2, 1, 0, 0, 0, 0], [1, 2, 1, 0, 2, 0, 0, 0, 0], [1, 2, 1, 1, 0, 1, 0, 0, 0], [1, 2, 2, 0, 0, 0, 1, 0, 0], [1, 3, 1, 3, 0, 0, 0, 0, 0], [1, 3, 2, 1, 1, 0, 0, 0, 0], [1, 3, 3, 0, 0, 1, 0, 0, 0], [1, 4, 3, 2, 0, 0, 0, 0, 0], [1, 4, 4, 0, 1, 0, 0, 0, 0], [1, 5, 5, 1, 0, 0, 0, 0, 0], [1, 6, 7, 0, 0, 0, 0, 0, 0], [2, 0, 0, 0, 1, 1, 0, 0, 0], [2, 0, 0, 1, 0, 0, 1, 0, 0], [2, 0, 1, 0, 0, 0, 0, 1, 0], [2, 1, 0, 2, 1, 0, 0, 0, 0], [2, 1, 1, 0, 2, 0, 0, 0, 0], [2, 1, 1, 1, 0, 1, 0, 0, 0], [2, 1, 2, 0, 0, 0, 1, 0, 0], [2, 2, 1, 3, 0, 0, 0, 0, 0], [2, 2, 2, 1, 1, 0, 0, 0, 0], [2, 2, 3, 0, 0, 1, 0, 0, 0], [2, 3, 3, 2, 0, 0, 0, 0, 0], [2, 3, 4, 0, 1, 0, 0, 0, 0], [2, 4, 5, 1, 0, 0, 0, 0, 0], [2, 5, 7, 0, 0, 0, 0, 0, 0], [3, 0, 0, 2, 1, 0, 0, 0, 0], [3, 0, 1, 0, 2, 0, 0, 0, 0], [3, 0, 1, 1, 0, 1, 0, 0, 0], [3, 0, 2, 0, 0, 0, 1, 0, 0], [3, 1, 1, 3, 0, 0, 0, 0, 0], [3, 1, 2, 1, 1, 0, 0, 0, 0], [3, 1, 3, 0, 0, 1, 0, 0, 0], [3, 2, 3, 2, 0, 0, 0, 0, 0], [3, 2, 4, 0, 1, 0, 0, 0, 0], [3, 3, 5, 1, 0, 0, 0, 0, 0], [3, 4, 7, 0, 0, 0, 0, 0, 0], [4, 0, 1, 3, 0, 0, 0, 0, 0], [4, 0, 2, 1, 1, 0, 0, 0, 0], [4, 0, 3, 0, 0, 1, 0, 0, 0], [4, 1, 3, 2, 0, 0, 0, 0, 0], [4, 1, 4, 0, 1, 0, 0, 0, 0], [4, 2, 5, 1, 0, 0, 0, 0, 0], [4, 3, 7, 0, 0, 0, 0, 0, 0], [5, 0, 3, 2, 0, 0, 0, 0, 0], [5, 0, 4, 0, 1, 0, 0, 0, 0], [5, 1, 5, 1, 0, 0, 0, 0, 0], [5, 2, 7, 0, 0, 0, 0, 0, 0], [6, 0, 5, 1, 0, 0, 0, 0, 0], [6, 1, 7, 0, 0, 0, 0, 0, 0], [7, 0, 7, 0, 0, 0, 0, 0, 0]]
-    elif p == 9:
-        return [[0, 1, 0, 0, 0, 0, 0, 0, 0, 1], [0, 2, 0, 0, 0, 2, 0, 0, 0, 0], [0, 2, 0, 0, 1, 0, 1, 0, 0, 0], [0, 2, 0, 1, 0, 0, 0, 1, 0, 0], [0, 2, 1, 0, 0, 0, 0, 0, 1, 0], [0, 3, 0, 1, 2, 0, 0, 0, 0, 0], [0, 3, 0, 2, 0, 1, 0, 0, 0, 0], [0, 3, 1, 0, 1, 1, 0, 0, 0, 0], [0, 3, 1, 1, 0, 0, 1, 0, 0, 0], [0, 3, 2, 0, 0, 0, 0, 1, 0, 0], [0, 4, 0, 4, 0, 0, 0, 0, 0, 0], [0, 4, 1, 2, 1, 0, 0, 0, 0, 0], [0, 4, 2, 0, 2, 0, 0, 0, 0, 0], [0, 4, 2, 1, 0, 1, 0, 0, 0, 0], [0, 4, 3, 0, 0, 0, 1, 0, 0, 0], [0, 5, 2, 3, 0, 0, 0, 0, 0, 0], [0, 5, 3, 1, 1, 0, 0, 0, 0, 0], [0, 5, 4, 0, 0, 1, 0, 0, 0, 0], [0, 6, 4, 2, 0, 0, 0, 0, 0, 0], [0, 6, 5, 0, 1, 0, 0, 0, 0, 0], [0, 7, 6, 1, 0, 0, 0, 0, 0, 0], [0, 8, 8, 0, 0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0, 0, 1], [1, 1, 0, 0, 0, 2, 0, 0, 0, 0], [1, 1, 0, 0, 1, 0, 1, 0, 0, 0], [1, 1, 0, 1, 0, 0, 0, 1, 0, 0], [1, 1, 1, 0, 0, 0, 0, 0, 1, 0], [1, 2, 0, 1, 2, 0, 0, 0, 0, 0], [1, 2, 0, 2, 0, 1, 0, 0, 0, 0], [1, 2, 1, 0, 1, 1, 0, 0, 0, 0], [1, 2, 1, 1, 0, 0, 1, 0, 0, 0], [1, 2, 2, 0, 0, 0, 0, 1, 0, 0], [1, 3, 0, 4, 0, 0, 0, 0, 0, 0], [1, 3, 1, 2, 1, 0, 0, 0, 0, 0], [1, 3, 2, 0, 2, 0, 0, 0, 0, 0], [1, 3, 2, 1, 0, 1, 0, 0, 0, 0], [1, 3, 3, 0, 0, 0, 1, 0, 0, 0], [1, 4, 2, 3, 0, 0, 0, 0, 0, 0], [1, 4, 3, 1, 1, 0, 0, 0, 0, 0], [1, 4, 4, 0, 0, 1, 0, 0, 0, 0], [1, 5, 4, 2, 0, 0, 0, 0, 0, 0], [1, 5, 5, 0, 1, 0, 0, 0, 0, 0], [1, 6, 6, 1, 0, 0, 0, 0, 0, 0], [1, 7, 8, 0, 0, 0, 0, 0, 0, 0], [2, 0, 0, 0, 0, 2, 0, 0, 0, 0], [2, 0, 0, 0, 1, 0, 1, 0, 0, 0], [2, 0, 0, 1, 0, 0, 0, 1, 0, 0], [2, 0, 1, 0, 0, 0, 0, 0, 1, 0], [2, 1, 0, 1, 2, 0, 0, 0, 0, 0], [2, 1, 0, 2, 0, 1, 0, 0, 0, 0], [2, 1, 1, 0, 1, 1, 0, 0, 0, 0], [2, 1, 1, 1, 0, 0, 1, 0, 0, 0], [2, 1, 2, 0, 0, 0, 0, 1, 0, 0], [2, 2, 0, 4, 0, 0, 0, 0, 0, 0], [2, 2, 1, 2, 1, 0, 0, 0, 0, 0], [2, 2, 2, 0, 2, 0, 0, 0, 0, 0], [2, 2, 2, 1, 0, 1, 0, 0, 0, 0], [2, 2, 3, 0, 0, 0, 1, 0, 0, 0], [2, 3, 2, 3, 0, 0, 0, 0, 0, 0], [2, 3, 3, 1, 1, 0, 0, 0, 0, 0], [2, 3, 4, 0, 0, 1, 0, 0, 0, 0], [2, 4, 4, 2, 0, 0, 0, 0, 0, 0], [2, 4, 5, 0, 1, 0, 0, 0, 0, 0], [2, 5, 6, 1, 0, 0, 0, 0, 0, 0], [2, 6, 8, 0, 0, 0, 0, 0, 0, 0], [3, 0, 0, 1, 2, 0, 0, 0, 0, 0], [3, 0, 0, 2, 0, 1, 0, 0, 0, 0], [3, 0, 1, 0, 1, 1, 0, 0, 0, 0], [3, 0, 1, 1, 0, 0, 1, 0, 0, 0], [3, 0, 2, 0, 0, 0, 0, 1, 0, 0], [3, 1, 0, 4, 0, 0, 0, 0, 0, 0], [3, 1, 1, 2, 1, 0, 0, 0, 0, 0], [3, 1, 2, 0, 2, 0, 0, 0, 0, 0], [3, 1, 2, 1, 0, 1, 0, 0, 0, 0], [3, 1, 3, 0, 0, 0, 1, 0, 0, 0], [3, 2, 2, 3, 0, 0, 0, 0, 0, 0], [3, 2, 3, 1, 1, 0, 0, 0, 0, 0], [3, 2, 4, 0, 0, 1, 0, 0, 0, 0], [3, 3, 4, 2, 0, 0, 0, 0, 0, 0], [3, 3, 5, 0, 1, 0, 0, 0, 0, 0], [3, 4, 6, 1, 0, 0, 0, 0, 0, 0], [3, 5, 8, 0, 0, 0, 0, 0, 0, 0], [4, 0, 0, 4, 0, 0, 0, 0, 0, 0], [4, 0, 1, 2, 1, 0, 0, 0, 0, 0], [4, 0, 2, 0, 2, 0, 0, 0, 0, 0], [4, 0, 2, 1, 0, 1, 0, 0, 0, 0], [4, 0, 3, 0, 0, 0, 1, 0, 0, 0], [4, 1, 2, 3, 0, 0, 0, 0, 0, 0], [4, 1, 3, 1, 1, 0, 0, 0, 0, 0], [4, 1, 4, 0, 0, 1, 0, 0, 0, 0], [4, 2, 4, 2, 0, 0, 0, 0, 0, 0], [4, 2, 5, 0, 1, 0, 0, 0, 0, 0], [4, 3, 6, 1, 0, 0, 0, 0, 0, 0], [4, 4, 8, 0, 0, 0, 0, 0, 0, 0], [5, 0, 2, 3, 0, 0, 0, 0, 0, 0], [5, 0, 3, 1, 1, 0, 0, 0, 0, 0], [5, 0, 4, 0, 0, 1, 0, 0, 0, 0], [5, 1, 4, 2, 0, 0, 0, 0, 0, 0], [5, 1, 5, 0, 1, 0, 0, 0, 0, 0], [5, 2, 6, 1, 0, 0, 0, 0, 0, 0], [5, 3, 8, 0, 0, 0, 0, 0, 0, 0], [6, 0, 4, 2, 0, 0, 0, 0, 0, 0], [6, 0, 5, 0, 1, 0, 0, 0, 0, 0], [6, 1, 6, 1, 0, 0, 0, 0, 0, 0], [6, 2, 8, 0, 0, 0, 0, 0, 0, 0], [7, 0, 6, 1, 0, 0, 0, 0, 0, 0], [7, 1, 8, 0, 0, 0, 0, 0, 0, 0], [8, 0, 8, 0, 0, 0, 0, 0, 0, 0]]
-    else:
-        raise ValueError("p = "+str(p)+" is not supported!")
+    rows = sorted(mu + k for k in _partitions(p-1) for mu in _compositions(sum(k), dim))
+    table = np.array(rows, dtype=np.int64).reshape(len(rows), dim + p - 1)
+    coefficients = np.array([1/np.prod([_fc(k_i) for k_i in row[dim:]]) for row in rows])
+    for array in (table, coefficients):
+        array.setflags(write=False)
+    return table, coefficients
+
+
+def _Diophantine_1D(p):
+    """
+    Return an array of arrays: [[mu_x, k_1, ..., k_(p-1)], ..., [mu_x, k_1, ..., k_(p-1)]],
+    see ``_Diophantine``
+    """
+    return _Diophantine(p, 1)[0]
+
+
+def _Diophantine_2D(p):
+    """
+    Return an array of arrays: [[mu_x, mu_y, k_1, ..., k_(p-1)], ..., [mu_x, mu_y, k_1, ..., k_(p-1)]],
+    see ``_Diophantine``
+    """
+    return _Diophantine(p, 2)[0]
+
 
 def _Diophantine_3D(p):
     """
-    Find all (3+p-1)-tuples of non-negative integers which fulfill:
-    k_1 + ... + k_(p-1) = p-1
-    k_1 + 2*k_2 + ... + (p-1)*k_(p-1) = mu_x + mu_y + mu_z
+    Return an array of arrays: [[mu_x, mu_y, mu_z, k_1, ..., k_(p-1)], ..., [mu_x, mu_y, mu_z, k_1, ..., k_(p-1)]],
+    see ``_Diophantine``
+    """
+    return _Diophantine(p, 3)[0]
+
+
+def _check_order(p):
+    if int(p) != p or p < 1:
+        raise ValueError("p = " + str(p) + " is not supported!")
+
+@lru_cache(maxsize=None)
+def _derivative_indices(orders, dim):
+    """
+    Collect the distinct derivative multi-indices [mu_1, ..., mu_dim] needed for all orders p
+    in ``orders``, including the zeroth derivative.
 
-    Return an array of arrays: [[mu_x, mu_y, mu_z, k_1, ..., k_(p-1)], ..., [mu_x, mu_y, mu_z, k_1, ..., k_(p-1)]]
+    Return an integer array of shape (distinct, dim) of the multi-indices and a dictionary which maps
+    every order p > 1 onto the positions of the rows of ``_Diophantine(p, dim)`` in that array
     """
-    if p == 2:
-        return [[1, 0, 0, 1], [0, 1, 0, 1], [0, 0, 1, 1]]
-    elif p == 3:
-        return [[0, 0, 1, 0, 1], [0, 0, 2, 2, 0], [0, 1, 0, 0, 1], [0, 1, 1, 2, 0], [0, 2, 0, 2, 0], [1, 0, 0, 0, 1], [1, 0, 1, 2, 0], [1, 1, 0, 2, 0], [2, 0, 0, 2, 0]]
-    elif p == 4:
-        return [[0, 0, 1, 0, 0, 1], [0, 0, 2, 1, 1, 0], [0, 0, 3, 3, 0, 0], [0, 1, 0, 0, 0, 1], [0, 1, 1, 1, 1, 0], [0, 1, 2, 3, 0, 0], [0, 2, 0, 1, 1, 0], [0, 2, 1, 3, 0, 0], [0, 3, 0, 3, 0, 0], [1, 0, 0, 0, 0, 1], [1, 0, 1, 1, 1, 0], [1, 0, 2, 3, 0, 0], [1, 1, 0, 1, 1, 0], [1, 1, 1, 3, 0, 0], [1, 2, 0, 3, 0, 0], [2, 0, 0, 1, 1, 0], [2, 0, 1, 3, 0, 0], [2, 1, 0, 3, 0, 0], [3, 0, 0, 3, 0, 0]]
-    elif p == 5:
-        return [[0, 0, 1, 0, 0, 0, 1], [0, 0, 2, 0, 2, 0, 0], [0, 0, 2, 1, 0, 1, 0], [0, 0, 3, 2, 1, 0, 0], [0, 0, 4, 4, 0, 0, 0], [0, 1, 0, 0, 0, 0, 1], [0, 1, 1, 0, 2, 0, 0], [0, 1, 1, 1, 0, 1, 0], [0, 1, 2, 2, 1, 0, 0], [0, 1, 3, 4, 0, 0, 0], [0, 2, 0, 0, 2, 0, 0], [0, 2, 0, 1, 0, 1, 0], [0, 2, 1, 2, 1, 0, 0], [0, 2, 2, 4, 0, 0, 0], [0, 3, 0, 2, 1, 0, 0], [0, 3, 1, 4, 0, 0, 0], [0, 4, 0, 4, 0, 0, 0], [1, 0, 0, 0, 0, 0, 1], [1, 0, 1, 0, 2, 0, 0], [1, 0, 1, 1, 0, 1, 0], [1, 0, 2, 2, 1, 0, 0], [1, 0, 3, 4, 0, 0, 0], [1, 1, 0, 0, 2, 0, 0], [1, 1, 0, 1, 0, 1, 0], [1, 1, 1, 2, 1, 0, 0], [1, 1, 2, 4, 0, 0, 0], [1, 2, 0, 2, 1, 0, 0], [1, 2, 1, 4, 0, 0, 0], [1, 3, 0, 4, 0, 0, 0], [2, 0, 0, 0, 2, 0, 0], [2, 0, 0, 1, 0, 1, 0], [2, 0, 1, 2, 1, 0, 0], [2, 0, 2, 4, 0, 0, 0], [2, 1, 0, 2, 1, 0, 0], [2, 1, 1, 4, 0, 0, 0], [2, 2, 0, 4, 0, 0, 0], [3, 0, 0, 2, 1, 0, 0], [3, 0, 1, 4, 0, 0, 0], [3, 1, 0, 4, 0, 0, 0], [4, 0, 0, 4, 0, 0, 0]]
-    elif p == 6:
-        return [[0, 0, 1, 0, 0, 0, 0, 1], [0, 0, 2, 0, 1, 1, 0, 0], [0, 0, 2, 1, 0, 0, 1, 0], [0, 0, 3, 1, 2, 0, 0, 0], [0, 0, 3, 2, 0, 1, 0, 0], [0, 0, 4, 3, 1, 0, 0, 0], [0, 0, 5, 5, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0, 0, 1], [0, 1, 1, 0, 1, 1, 0, 0], [0, 1, 1, 1, 0, 0, 1, 0], [0, 1, 2, 1, 2, 0, 0, 0], [0, 1, 2, 2, 0, 1, 0, 0], [0, 1, 3, 3, 1, 0, 0, 0], [0, 1, 4, 5, 0, 0, 0, 0], [0, 2, 0, 0, 1, 1, 0, 0], [0, 2, 0, 1, 0, 0, 1, 0], [0, 2, 1, 1, 2, 0, 0, 0], [0, 2, 1, 2, 0, 1, 0, 0], [0, 2, 2, 3, 1, 0, 0, 0], [0, 2, 3, 5, 0, 0, 0, 0], [0, 3, 0, 1, 2, 0, 0, 0], [0, 3, 0, 2, 0, 1, 0, 0], [0, 3, 1, 3, 1, 0, 0, 0], [0, 3, 2, 5, 0, 0, 0, 0], [0, 4, 0, 3, 1, 0, 0, 0], [0, 4, 1, 5, 0, 0, 0, 0], [0, 5, 0, 5, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 1], [1, 0, 1, 0, 1, 1, 0, 0], [1, 0, 1, 1, 0, 0, 1, 0], [1, 0, 2, 1, 2, 0, 0, 0], [1, 0, 2, 2, 0, 1, 0, 0], [1, 0, 3, 3, 1, 0, 0, 0], [1, 0, 4, 5, 0, 0, 0, 0], [1, 1, 0, 0, 1, 1, 0, 0], [1, 1, 0, 1, 0, 0, 1, 0], [1, 1, 1, 1, 2, 0, 0, 0], [1, 1, 1, 2, 0, 1, 0, 0], [1, 1, 2, 3, 1, 0, 0, 0], [1, 1, 3, 5, 0, 0, 0, 0], [1, 2, 0, 1, 2, 0, 0, 0], [1, 2, 0, 2, 0, 1, 0, 0], [1, 2, 1, 3, 1, 0, 0, 0], [1, 2, 2, 5, 0, 0, 0, 0], [1, 3, 0, 3, 1, 0, 0, 0], [1, 3, 1, 5, 0, 0, 0, 0], [1, 4, 0, 5, 0, 0, 0, 0], [2, 0, 0, 0, 1, 1, 0, 0], [2, 0, 0, 1, 0, 0, 1, 0], [2, 0, 1, 1, 2, 0, 0, 0], [2, 0, 1, 2, 0, 1, 0, 0], [2, 0, 2, 3, 1, 0, 0, 0], [2, 0, 3, 5, 0, 0, 0, 0], [2, 1, 0, 1, 2, 0, 0, 0], [2, 1, 0, 2, 0, 1, 0, 0], [2, 1, 1, 3, 1, 0, 0, 0], [2, 1, 2, 5, 0, 0, 0, 0], [2, 2, 0, 3, 1, 0, 0, 0], [2, 2, 1, 5, 0, 0, 0, 0], [2, 3, 0, 5, 0, 0, 0, 0], [3, 0, 0, 1, 2, 0, 0, 0], [3, 0, 0, 2, 0, 1, 0, 0], [3, 0, 1, 3, 1, 0, 0, 0], [3, 0, 2, 5, 0, 0, 0, 0], [3, 1, 0, 3, 1, 0, 0, 0], [3, 1, 1, 5, 0, 0, 0, 0], [3, 2, 0, 5, 0, 0, 0, 0], [4, 0, 0, 3, 1, 0, 0, 0], [4, 0, 1, 5, 0, 0, 0, 0], [4, 1, 0, 5, 0, 0, 0, 0], [5, 0, 0, 5, 0, 0, 0, 0]]
-    elif p == 7:
-        return [[0, 0, 1, 0, 0, 0, 0, 0, 1], [0, 0, 2, 0, 0, 2, 0, 0, 0], [0, 0, 2, 0, 1, 0, 1, 0, 0], [0, 0, 2, 1, 0, 0, 0, 1, 0], [0, 0, 3, 0, 3, 0, 0, 0, 0], [0, 0, 3, 1, 1, 1, 0, 0, 0], [0, 0, 3, 2, 0, 0, 1, 0, 0], [0, 0, 4, 2, 2, 0, 0, 0, 0], [0, 0, 4, 3, 0, 1, 0, 0, 0], [0, 0, 5, 4, 1, 0, 0, 0, 0], [0, 0, 6, 6, 0, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0, 0, 0, 1], [0, 1, 1, 0, 0, 2, 0, 0, 0], [0, 1, 1, 0, 1, 0, 1, 0, 0], [0, 1, 1, 1, 0, 0, 0, 1, 0], [0, 1, 2, 0, 3, 0, 0, 0, 0], [0, 1, 2, 1, 1, 1, 0, 0, 0], [0, 1, 2, 2, 0, 0, 1, 0, 0], [0, 1, 3, 2, 2, 0, 0, 0, 0], [0, 1, 3, 3, 0, 1, 0, 0, 0], [0, 1, 4, 4, 1, 0, 0, 0, 0], [0, 1, 5, 6, 0, 0, 0, 0, 0], [0, 2, 0, 0, 0, 2, 0, 0, 0], [0, 2, 0, 0, 1, 0, 1, 0, 0], [0, 2, 0, 1, 0, 0, 0, 1, 0], [0, 2, 1, 0, 3, 0, 0, 0, 0], [0, 2, 1, 1, 1, 1, 0, 0, 0], [0, 2, 1, 2, 0, 0, 1, 0, 0], [0, 2, 2, 2, 2, 0, 0, 0, 0], [0, 2, 2, 3, 0, 1, 0, 0, 0], [0, 2, 3, 4, 1, 0, 0, 0, 0], [0, 2, 4, 6, 0, 0, 0, 0, 0], [0, 3, 0, 0, 3, 0, 0, 0, 0], [0, 3, 0, 1, 1, 1, 0, 0, 0], [0, 3, 0, 2, 0, 0, 1, 0, 0], [0, 3, 1, 2, 2, 0, 0, 0, 0], [0, 3, 1, 3, 0, 1, 0, 0, 0], [0, 3, 2, 4, 1, 0, 0, 0, 0], [0, 3, 3, 6, 0, 0, 0, 0, 0], [0, 4, 0, 2, 2, 0, 0, 0, 0], [0, 4, 0, 3, 0, 1, 0, 0, 0], [0, 4, 1, 4, 1, 0, 0, 0, 0], [0, 4, 2, 6, 0, 0, 0, 0, 0], [0, 5, 0, 4, 1, 0, 0, 0, 0], [0, 5, 1, 6, 0, 0, 0, 0, 0], [0, 6, 0, 6, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0, 1], [1, 0, 1, 0, 0, 2, 0, 0, 0], [1, 0, 1, 0, 1, 0, 1, 0, 0], [1, 0, 1, 1, 0, 0, 0, 1, 0], [1, 0, 2, 0, 3, 0, 0, 0, 0], [1, 0, 2, 1, 1, 1, 0, 0, 0], [1, 0, 2, 2, 0, 0, 1, 0, 0], [1, 0, 3, 2, 2, 0, 0, 0, 0], [1, 0, 3, 3, 0, 1, 0, 0, 0], [1, 0, 4, 4, 1, 0, 0, 0, 0], [1, 0, 5, 6, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 2, 0, 0, 0], [1, 1, 0, 0, 1, 0, 1, 0, 0], [1, 1, 0, 1, 0, 0, 0, 1, 0], [1, 1, 1, 0, 3, 0, 0, 0, 0], [1, 1, 1, 1, 1, 1, 0, 0, 0], [1, 1, 1, 2, 0, 0, 1, 0, 0], [1, 1, 2, 2, 2, 0, 0, 0, 0], [1, 1, 2, 3, 0, 1, 0, 0, 0], [1, 1, 3, 4, 1, 0, 0, 0, 0], [1, 1, 4, 6, 0, 0, 0, 0, 0], [1, 2, 0, 0, 3, 0, 0, 0, 0], [1, 2, 0, 1, 1, 1, 0, 0, 0], [1, 2, 0, 2, 0, 0, 1, 0, 0], [1, 2, 1, 2, 2, 0, 0, 0, 0], [1, 2, 1, 3, 0, 1, 0, 0, 0], [1, 2, 2, 4, 1, 0, 0, 0, 0], [1, 2, 3, 6, 0, 0, 0, 0, 0], [1, 3, 0, 2, 2, 0, 0, 0, 0], [1, 3, 0, 3, 0, 1, 0, 0, 0], [1, 3, 1, 4, 1, 0, 0, 0, 0], [1, 3, 2, 6, 0, 0, 0, 0, 0], [1, 4, 0, 4, 1, 0, 0, 0, 0], [1, 4, 1, 6, 0, 0, 0, 0, 0], [1, 5, 0, 6, 0, 0, 0, 0, 0], [2, 0, 0, 0, 0, 2, 0, 0, 0], [2, 0, 0, 0, 1, 0, 1, 0, 0], [2, 0, 0, 1, 0, 0, 0, 1, 0], [2, 0, 1, 0, 3, 0, 0, 0, 0], [2, 0, 1, 1, 1, 1, 0, 0, 0], [2, 0, 1, 2, 0, 0, 1, 0, 0], [2, 0, 2, 2, 2, 0, 0, 0, 0], [2, 0, 2, 3, 0, 1, 0, 0, 0], [2, 0, 3, 4, 1, 0, 0, 0, 0], [2, 0, 4, 6, 0, 0, 0, 0, 0], [2, 1, 0, 0, 3, 0, 0, 0, 0], [2, 1, 0, 1, 1, 1, 0, 0, 0], [2, 1, 0, 2, 0, 0, 1, 0, 0], [2, 1, 1, 2, 2, 0, 0, 0, 0], [2, 1, 1, 3, 0, 1, 0, 0, 0], [2, 1, 2, 4, 1, 0, 0, 0, 0], [2, 1, 3, 6, 0, 0, 0, 0, 0], [2, 2, 0, 2, 2, 0, 0, 0, 0], [2, 2, 0, 3, 0, 1, 0, 0, 0], [2, 2, 1, 4, 1, 0, 0, 0, 0], [2, 2, 2, 6, 0, 0, 0, 0, 0], [2, 3, 0, 4, 1, 0, 0, 0, 0], [2, 3, 1, 6, 0, 0, 0, 0, 0], [2, 4, 0, 6, 0, 0, 0, 0, 0], [3, 0, 0, 0, 3, 0, 0, 0, 0], [3, 0, 0, 1, 1, 1, 0, 0, 0], [3, 0, 0, 2, 0, 0, 1, 0, 0], [3, 0, 1, 2, 2, 0, 0, 0, 0], [3, 0, 1, 3, 0, 1, 0, 0, 0], [3, 0, 2, 4, 1, 0, 0, 0, 0], [3, 0, 3, 6, 0, 0, 0, 0, 0], [3, 1, 0, 2, 2, 0, 0, 0, 0], [3, 1, 0, 3, 0, 1, 0, 0, 0], [3, 1, 1, 4, 1, 0, 0, 0, 0], [3, 1, 2, 6, 0, 0, 0, 0, 0], [3, 2, 0, 4, 1, 0, 0, 0, 0], [3, 2, 1, 6, 0, 0, 0, 0, 0], [3, 3, 0, 6, 0, 0, 0, 0, 0], [4, 0, 0, 2, 2, 0, 0, 0, 0], [4, 0, 0, 3, 0, 1, 0, 0, 0], [4, 0, 1, 4, 1, 0, 0, 0, 0], [4, 0, 2, 6, 0, 0, 0, 0, 0], [4, 1, 0, 4, 1, 0, 0, 0, 0], [4, 1, 1, 6, 0, 0, 0, 0, 0], [4, 2, 0, 6, 0, 0, 0, 0, 0], [5, 0, 0, 4, 1, 0, 0, 0, 0], [5, 0, 1, 6, 0, 0, 0, 0, 0], [5, 1, 0, 6, 0, 0, 0, 0, 0], [6, 0, 0, 6, 0, 0, 0, 0, 0]]
-    elif p == 8:
-        return [[0, 0, 1, 0, 0, 0, 0, 0, 0, 1], [0, 0, 2, 0, 0, 1, 1, 0, 0, 0], [0, 0, 2, 0, 1, 0, 0, 1, 0, 0], [0, 0, 2, 1, 0, 0, 0, 0, 1, 0], [0, 0, 3, 0, 2, 1, 0, 0, 0, 0], [0, 0, 3, 1, 0, 2, 0, 0, 0, 0], [0, 0, 3, 1, 1, 0, 1, 0, 0, 0], [0, 0, 3, 2, 0, 0, 0, 1, 0, 0], [0, 0, 4, 1, 3, 0, 0, 0, 0, 0], [0, 0, 4, 2, 1, 1, 0, 0, 0, 0], [0, 0, 4, 3, 0, 0, 1, 0, 0, 0], [0, 0, 5, 3, 2, 0, 0, 0, 0, 0], [0, 0, 5, 4, 0, 1, 0, 0, 0, 0], [0, 0, 6, 5, 1, 0, 0, 0, 0, 0], [0, 0, 7, 7, 0, 0, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0, 0, 0, 0, 1], [0, 1, 1, 0, 0, 1, 1, 0, 0, 0], [0, 1, 1, 0, 1, 0, 0, 1, 0, 0], [0, 1, 1, 1, 0, 0, 0, 0, 1, 0], [0, 1, 2, 0, 2, 1, 0, 0, 0, 0], [0, 1, 2, 1, 0, 2, 0, 0, 0, 0], [0, 1, 2, 1, 1, 0, 1, 0, 0, 0], [0, 1, 2, 2, 0, 0, 0, 1, 0, 0], [0, 1, 3, 1, 3, 0, 0, 0, 0, 0], [0, 1, 3, 2, 1, 1, 0, 0, 0, 0], [0, 1, 3, 3, 0, 0, 1, 0, 0, 0], [0, 1, 4, 3, 2, 0, 0, 0, 0, 0], [0, 1, 4, 4, 0, 1, 0, 0, 0, 0], [0, 1, 5, 5, 1, 0, 0, 0, 0, 0], [0, 1, 6, 7, 0, 0, 0, 0, 0, 0], [0, 2, 0, 0, 0, 1, 1, 0, 0, 0], [0, 2, 0, 0, 1, 0, 0, 1, 0, 0], [0, 2, 0, 1, 0, 0, 0, 0, 1, 0], [0, 2, 1, 0, 2, 1, 0, 0, 0, 0], [0, 2, 1, 1, 0, 2, 0, 0, 0, 0], [0, 2, 1, 1, 1, 0, 1, 0, 0, 0], [0, 2, 1, 2, 0, 0, 0, 1, 0, 0], [0, 2, 2, 1, 3, 0, 0, 0, 0, 0], [0, 2, 2, 2, 1, 1, 0, 0, 0, 0], [0, 2, 2, 3, 0, 0, 1, 0, 0, 0], [0, 2, 3, 3, 2, 0, 0, 0, 0, 0], [0, 2, 3, 4, 0, 1, 0, 0, 0, 0], [0, 2, 4, 5, 1, 0, 0, 0, 0, 0], [0, 2, 5, 7, 0, 0, 0, 0, 0, 0], [0, 3, 0, 0, 2, 1, 0, 0, 0, 0], [0, 3, 0, 1, 0, 2, 0, 0, 0, 0], [0, 3, 0, 1, 1, 0, 1, 0, 0, 0], [0, 3, 0, 2, 0, 0, 0, 1, 0, 0], [0, 3, 1, 1, 3, 0, 0, 0, 0, 0], [0, 3, 1, 2, 1, 1, 0, 0, 0, 0], [0, 3, 1, 3, 0, 0, 1, 0, 0, 0], [0, 3, 2, 3, 2, 0, 0, 0, 0, 0], [0, 3, 2, 4, 0, 1, 0, 0, 0, 0], [0, 3, 3, 5, 1, 0, 0, 0, 0, 0], [0, 3, 4, 7, 0, 0, 0, 0, 0, 0], [0, 4, 0, 1, 3, 0, 0, 0, 0, 0], [0, 4, 0, 2, 1, 1, 0, 0, 0, 0], [0, 4, 0, 3, 0, 0, 1, 0, 0, 0], [0, 4, 1, 3, 2, 0, 0, 0, 0, 0], [0, 4, 1, 4, 0, 1, 0, 0, 0, 0], [0, 4, 2, 5, 1, 0, 0, 0, 0, 0], [0, 4, 3, 7, 0, 0, 0, 0, 0, 0], [0, 5, 0, 3, 2, 0, 0, 0, 0, 0], [0, 5, 0, 4, 0, 1, 0, 0, 0, 0], [0, 5, 1, 5, 1, 0, 0, 0, 0, 0], [0, 5, 2, 7, 0, 0, 0, 0, 0, 0], [0, 6, 0, 5, 1, 0, 0, 0, 0, 0], [0, 6, 1, 7, 0, 0, 0, 0, 0, 0], [0, 7, 0, 7, 0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0, 0, 1], [1, 0, 1, 0, 0, 1, 1, 0, 0, 0], [1, 0, 1, 0, 1, 0, 0, 1, 0, 0], [1, 0, 1, 1, 0, 0, 0, 0, 1, 0], [1, 0, 2, 0, 2, 1, 0, 0, 0, 0], [1, 0, 2, 1, 0, 2, 0, 0, 0, 0], [1, 0, 2, 1, 1, 0, 1, 0, 0, 0], [1, 0, 2, 2, 0, 0, 0, 1, 0, 0], [1, 0, 3, 1, 3, 0, 0, 0, 0, 0], [1, 0, 3, 2, 1, 1, 0, 0, 0, 0], [1, 0, 3, 3, 0, 0, 1, 0, 0, 0], [1, 0, 4, 3, 2, 0, 0, 0, 0, 0], [1, 0, 4, 4, 0, 1, 0, 0, 0, 0], [1, 0, 5, 5, 1, 0, 0, 0, 0, 0], [1, 0, 6, 7, 0, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 1, 1, 0, 0, 0], [1, 1, 0, 0, 1, 0, 0, 1, 0, 0], [1, 1, 0, 1, 0, 0, 0, 0, 1, 0], [1, 1, 1, 0, 2, 1, 0, 0, 0, 0], [1, 1, 1, 1, 0, 2, 0, 0, 0, 0], [1, 1, 1, 1, 1, 0, 1, 0, 0, 0], [1, 1, 1, 2, 0, 0, 0, 1, 0, 0], [1, 1, 2, 1, 3, 0, 0, 0, 0, 0], [1, 1, 2, 2, 1, 1, 0, 0, 0, 0], [1, 1, 2, 3, 0, 0, 1, 0, 0, 0], [1, 1, 3, 3, 2, 0, 0, 0, 0, 0], [1, 1, 3, 4, 0, 1, 0, 0, 0, 0], [1, 1, 4, 5, 1, 0, 0, 0, 0, 0], [1, 1, 5, 7, 0, 0, 0, 0, 0, 0], [1, 2, 0, 0, 2, 1, 0, 0, 0, 0], [1, 2, 0, 1, 0, 2, 0, 0, 0, 0], [1, 2, 0, 1, 1, 0, 1, 0, 0, 0], [1, 2, 0, 2, 0, 0, 0, 1, 0, 0], [1, 2, 1, 1, 3, 0, 0, 0, 0, 0], [1, 2, 1, 2, 1, 1, 0, 0, 0, 0], [1, 2, 1, 3, 0, 0, 1, 0, 0, 0], [1, 2, 2, 3, 2, 0, 0, 0, 0, 0], [1, 2, 2, 4, 0, 1, 0, 0, 0, 0], [1, 2, 3, 5, 1, 0, 0, 0, 0, 0], [1, 2, 4, 7, 0, 0, 0, 0, 0, 0], [1, 3, 0, 1, 3, 0, 0, 0, 0, 0], [1, 3, 0, 2, 1, 1, 0, 0, 0, 0], [1, 3, 0, 3, 0, 0, 1, 0, 0, 0], [1, 3, 1, 3, 2, 0, 0, 0, 0, 0], [1, 3, 1, 4, 0, 1, 0, 0, 0, 0], [1, 3, 2, 5, 1, 0, 0, 0, 0, 0], [1, 3, 3, 7, 0, 0, 0, 0, 0, 0], [1, 4, 0, 3, 2, 0, 0, 0, 0, 0], [1, 4, 0, 4, 0, 1, 0, 0, 0, 0], [1, 4, 1, 5, 1, 0, 0, 0, 0, 0], [1, 4, 2, 7, 0, 0, 0, 0, 0, 0], [1, 5, 0, 5, 1, 0, 0, 0, 0, 0], [1, 5, 1, 7, 0, 0, 0, 0, 0, 0], [1, 6, 0, 7, 0, 0, 0, 0, 0, 0], [2, 0, 0, 0, 0, 1, 1, 0, 0, 0], [2, 0, 0, 0, 1, 0, 0, 1, 0, 0], [2, 0, 0, 1, 0, 0, 0, 0, 1, 0], [2, 0, 1, 0, 2, 1, 0, 0, 0, 0], [2, 0, 1, 1, 0, 2, 0, 0, 0, 0], [2, 0, 1, 1, 1, 0, 1, 0, 0, 0], [2, 0, 1, 2, 0, 0, 0, 1, 0, 0], [2, 0, 2, 1, 3, 0, 0, 0, 0, 0], [2, 0, 2, 2, 1, 1, 0, 0, 0, 0], [2, 0, 2, 3, 0, 0, 1, 0, 0, 0], [2, 0, 3, 3, 2, 0, 0, 0, 0, 0], [2, 0, 3, 4, 0, 1, 0, 0, 0, 0], [2, 0, 4, 5, 1, 0, 0, 0, 0, 0], [2, 0, 5, 7, 0, 0, 0, 0, 0, 0], [2, 1, 0, 0, 2, 1, 0, 0, 0, 0], [2, 1, 0, 1, 0, 2, 0, 0, 0, 0], [2, 1, 0, 1, 1, 0, 1, 0, 0, 0], [2, 1, 0, 2, 0, 0, 0, 1, 0, 0], [2, 1, 1, 1, 3, 0, 0, 0, 0, 0], [2, 1, 1, 2, 1, 1, 0, 0, 0, 0], [2, 1, 1, 3, 0, 0, 1, 0, 0, 0], [2, 1, 2, 3, 2, 0, 0, 0, 0, 0], [2, 1, 2, 4, 0, 1, 0, 0, 0, 0], [2, 1, 3, 5, 1, 0, 0, 0, 0, 0], [2, 1, 4, 7, 0, 0, 0, 0, 0, 0], [2, 2, 0, 1, 3, 0, 0, 0, 0, 0], [2, 2, 0, 2, 1, 1, 0, 0, 0, 0], [2, 2, 0, 3, 0, 0, 1, 0, 0, 0], [2, 2, 1, 3, 2, 0, 0, 0, 0, 0], [2, 2, 1, 4, 0, 1, 0, 0, 0, 0], [2, 2, 2, 5, 1, 0, 0, 0, 0, 0], [2, 2, 3, 7, 0, 0, 0, 0, 0, 0], [2, 3, 0, 3, 2, 0, 0, 0, 0, 0], [2, 3, 0, 4, 0, 1, 0, 0, 0, 0], [2, 3, 1, 5, 1, 0, 0, 0, 0, 0], [2, 3, 2, 7, 0, 0, 0, 0, 0, 0], [2, 4, 0, 5, 1, 0, 0, 0, 0, 0], [2, 4, 1, 7, 0, 0, 0, 0, 0, 0], [2, 5, 0, 7, 0, 0, 0, 0, 0, 0], [3, 0, 0, 0, 2, 1, 0, 0, 0, 0], [3, 0, 0, 1, 0, 2, 0, 0, 0, 0], [3, 0, 0, 1, 1, 0, 1, 0, 0, 0], [3, 0, 0, 2, 0, 0, 0, 1, 0, 0], [3, 0, 1, 1, 3, 0, 0, 0, 0, 0], [3, 0, 1, 2, 1, 1, 0, 0, 0, 0], [3, 0, 1, 3, 0, 0, 1, 0, 0, 0], [3, 0, 2, 3, 2, 0, 0, 0, 0, 0], [3, 0, 2, 4, 0, 1, 0, 0, 0, 0], [3, 0, 3, 5, 1, 0, 0, 0, 0, 0], [3, 0, 4, 7, 0, 0, 0, 0, 0, 0], [3, 1, 0, 1, 3, 0, 0, 0, 0, 0], [3, 1, 0, 2, 1, 1, 0, 0, 0, 0], [3, 1, 0, 3, 0, 0, 1, 0, 0, 0], [3, 1, 1, 3, 2, 0, 0, 0, 0, 0], [3, 1, 1, 4, 0, 1, 0, 0, 0, 0], [3, 1, 2, 5, 1, 0, 0, 0, 0, 0], [3, 1, 3, 7, 0, 0, 0, 0, 0, 0], [3, 2, 0, 3, 2, 0, 0, 0, 0, 0], [3, 2, 0, 4, 0, 1, 0, 0, 0, 0], [3, 2, 1, 5, 1, 0, 0, 0, 0, 0], [3, 2, 2, 7, 0, 0, 0, 0, 0, 0], [3, 3, 0, 5, 1, 0, 0, 0, 0, 0], [3, 3, 1, 7, 0, 0, 0, 0, 0, 0], [3, 4, 0, 7, 0, 0, 0, 0, 0, 0], [4, 0, 0, 1, 3, 0, 0, 0, 0, 0], [4, 0, 0, 2, 1, 1, 0, 0, 0, 0], [4, 0, 0, 3, 0, 0, 1, 0, 0, 0], [4, 0, 1, 3, 2, 0, 0, 0, 0, 0], [4, 0, 1, 4, 0, 1, 0, 0, 0, 0], [4, 0, 2, 5, 1, 0, 0, 0, 0, 0], [4, 0, 3, 7, 0, 0, 0, 0, 0, 0], [4, 1, 0, 3, 2, 0, 0, 0, 0, 0], [4, 1, 0, 4, 0, 1, 0, 0, 0, 0], [4, 1, 1, 5, 1, 0, 0, 0, 0, 0], [4, 1, 2, 7, 0, 0, 0, 0, 0, 0], [4, 2, 0, 5, 1, 0, 0, 0, 0, 0], [4, 2, 1, 7, 0, 0, 0, 0, 0, 0], [4, 3, 0, 7, 0, 0, 0, 0, 0, 0], [5, 0, 0, 3, 2, 0, 0, 0, 0, 0], [5, 0, 0, 4, 0, 1, 0, 0, 0, 0], [5, 0, 1, 5, 1, 0, 0, 0, 0, 0], [5, 0, 2, 7, 0, 0, 0, 0, 0, 0], [5, 1, 0, 5, 1, 0, 0, 0, 0, 0], [5, 1, 1, 7, 0, 0, 0, 0, 0, 0], [5, 2, 0, 7, 0, 0, 0, 0, 0, 0], [6, 0, 0, 5, 1, 0, 0, 0, 0, 0], [6, 0, 1, 7, 0, 0, 0, 0, 0, 0], [6, 1, 0, 7, 0, 0, 0, 0, 0, 0], [7, 0, 0, 7, 0, 0, 0, 0, 0, 0]]
-    elif p == 9:
-        return [[0, 0, 1, 0, 0, 0, 0, 0, 0, 1, 0], [0, 0, 2, 0, 0, 1, 1, 0, 0, 0, 0], [0, 0, 2, 0, 1, 0, 0, 1, 0, 0, 0], [0, 0, 2, 1, 0, 0, 0, 0, 1, 0, 0], [0, 0, 3, 0, 2, 1, 0, 0, 0, 0, 0], [0, 0, 3, 1, 0, 2, 0, 0, 0, 0, 0], [0, 0, 3, 1, 1, 0, 1, 0, 0, 0, 0], [0, 0, 3, 2, 0, 0, 0, 1, 0, 0, 0], [0, 0, 4, 1, 3, 0, 0, 0, 0, 0, 0], [0, 0, 4, 2, 1, 1, 0, 0, 0, 0, 0], [0, 0, 4, 3, 0, 0, 1, 0, 0, 0, 0], [0, 0, 5, 3, 2, 0, 0, 0, 0, 0, 0], [0, 0, 5, 4, 0, 1, 0, 0, 0, 0, 0], [0, 0, 6, 5, 1, 0, 0, 0, 0, 0, 0], [0, 0, 7, 7, 0, 0, 0, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0, 0, 0, 0, 1, 0], [0, 1, 1, 0, 0, 1, 1, 0, 0, 0, 0], [0, 1, 1, 0, 1, 0, 0, 1, 0, 0, 0], [0, 1, 1, 1, 0, 0, 0, 0, 1, 0, 0], [0, 1, 2, 0, 2, 1, 0, 0, 0, 0, 0], [0, 1, 2, 1, 0, 2, 0, 0, 0, 0, 0], [0, 1, 2, 1, 1, 0, 1, 0, 0, 0, 0], [0, 1, 2, 2, 0, 0, 0, 1, 0, 0, 0], [0, 1, 3, 1, 3, 0, 0, 0, 0, 0, 0], [0, 1, 3, 2, 1, 1, 0, 0, 0, 0, 0], [0, 1, 3, 3, 0, 0, 1, 0, 0, 0, 0], [0, 1, 4, 3, 2, 0, 0, 0, 0, 0, 0], [0, 1, 4, 4, 0, 1, 0, 0, 0, 0, 0], [0, 1, 5, 5, 1, 0, 0, 0, 0, 0, 0], [0, 1, 6, 7, 0, 0, 0, 0, 0, 0, 0], [0, 2, 0, 0, 0, 1, 1, 0, 0, 0, 0], [0, 2, 0, 0, 1, 0, 0, 1, 0, 0, 0], [0, 2, 0, 1, 0, 0, 0, 0, 1, 0, 0], [0, 2, 1, 0, 2, 1, 0, 0, 0, 0, 0], [0, 2, 1, 1, 0, 2, 0, 0, 0, 0, 0], [0, 2, 1, 1, 1, 0, 1, 0, 0, 0, 0], [0, 2, 1, 2, 0, 0, 0, 1, 0, 0, 0], [0, 2, 2, 1, 3, 0, 0, 0, 0, 0, 0], [0, 2, 2, 2, 1, 1, 0, 0, 0, 0, 0], [0, 2, 2, 3, 0, 0, 1, 0, 0, 0, 0], [0, 2, 3, 3, 2, 0, 0, 0, 0, 0, 0], [0, 2, 3, 4, 0, 1, 0, 0, 0, 0, 0], [0, 2, 4, 5, 1, 0, 0, 0, 0, 0, 0], [0, 2, 5, 7, 0, 0, 0, 0, 0, 0, 0], [0, 3, 0, 0, 2, 1, 0, 0, 0, 0, 0], [0, 3, 0, 1, 0, 2, 0, 0, 0, 0, 0], [0, 3, 0, 1, 1, 0, 1, 0, 0, 0, 0], [0, 3, 0, 2, 0, 0, 0, 1, 0, 0, 0], [0, 3, 1, 1, 3, 0, 0, 0, 0, 0, 0], [0, 3, 1, 2, 1, 1, 0, 0, 0, 0, 0], [0, 3, 1, 3, 0, 0, 1, 0, 0, 0, 0], [0, 3, 2, 3, 2, 0, 0, 0, 0, 0, 0], [0, 3, 2, 4, 0, 1, 0, 0, 0, 0, 0], [0, 3, 3, 5, 1, 0, 0, 0, 0, 0, 0], [0, 3, 4, 7, 0, 0, 0, 0, 0, 0, 0], [0, 4, 0, 1, 3, 0, 0, 0, 0, 0, 0], [0, 4, 0, 2, 1, 1, 0, 0, 0, 0, 0], [0, 4, 0, 3, 0, 0, 1, 0, 0, 0, 0], [0, 4, 1, 3, 2, 0, 0, 0, 0, 0, 0], [0, 4, 1, 4, 0, 1, 0, 0, 0, 0, 0], [0, 4, 2, 5, 1, 0, 0, 0, 0, 0, 0], [0, 4, 3, 7, 0, 0, 0, 0, 0, 0, 0], [0, 5, 0, 3, 2, 0, 0, 0, 0, 0, 0], [0, 5, 0, 4, 0, 1, 0, 0, 0, 0, 0], [0, 5, 1, 5, 1, 0, 0, 0, 0, 0, 0], [0, 5, 2, 7, 0, 0, 0, 0, 0, 0, 0], [0, 6, 0, 5, 1, 0, 0, 0, 0, 0, 0], [0, 6, 1, 7, 0, 0, 0, 0, 0, 0, 0], [0, 7, 0, 7, 0, 0, 0, 0, 0, 0, 0], [1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0], [1, 0, 1, 0, 0, 1, 1, 0, 0, 0, 0], [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0], [1, 0, 1, 1, 0, 0, 0, 0, 1, 0, 0], [1, 0, 2, 0, 2, 1, 0, 0, 0, 0, 0], [1, 0, 2, 1, 0, 2, 0, 0, 0, 0, 0], [1, 0, 2, 1, 1, 0, 1, 0, 0, 0, 0], [1, 0, 2, 2, 0, 0, 0, 1, 0, 0, 0], [1, 0, 3, 1, 3, 0, 0, 0, 0, 0, 0], [1, 0, 3, 2, 1, 1, 0, 0, 0, 0, 0], [1, 0, 3, 3, 0, 0, 1, 0, 0, 0, 0], [1, 0, 4, 3, 2, 0, 0, 0, 0, 0, 0], [1, 0, 4, 4, 0, 1, 0, 0, 0, 0, 0], [1, 0, 5, 5, 1, 0, 0, 0, 0, 0, 0], [1, 0, 6, 7, 0, 0, 0, 0, 0, 0, 0], [1, 1, 0, 0, 0, 1, 1, 0, 0, 0, 0], [1, 1, 0, 0, 1, 0, 0, 1, 0, 0, 0], [1, 1, 0, 1, 0, 0, 0, 0, 1, 0, 0], [1, 1, 1, 0, 2, 1, 0, 0, 0, 0, 0], [1, 1, 1, 1, 0, 2, 0, 0, 0, 0, 0], [1, 1, 1, 1, 1, 0, 1, 0, 0, 0, 0], [1, 1, 1, 2, 0, 0, 0, 1, 0, 0, 0], [1, 1, 2, 1, 3, 0, 0, 0, 0, 0, 0], [1, 1, 2, 2, 1, 1, 0, 0, 0, 0, 0], [1, 1, 2, 3, 0, 0, 1, 0, 0, 0, 0], [1, 1, 3, 3, 2, 0, 0, 0, 0, 0, 0], [1, 1, 3, 4, 0, 1, 0, 0, 0, 0, 0], [1, 1, 4, 5, 1, 0, 0, 0, 0, 0, 0], [1, 1, 5, 7, 0, 0, 0, 0, 0, 0, 0], [1, 2, 0, 0, 2, 1, 0, 0, 0, 0, 0], [1, 2, 0, 1, 0, 2, 0, 0, 0, 0, 0], [1, 2, 0, 1, 1, 0, 1, 0, 0, 0, 0], [1, 2, 0, 2, 0, 0, 0, 1, 0, 0, 0], [1, 2, 1, 1, 3, 0, 0, 0, 0, 0, 0], [1, 2, 1, 2, 1, 1, 0, 0, 0, 0, 0], [1, 2, 1, 3, 0, 0, 1, 0, 0, 0, 0], [1, 2, 2, 3, 2, 0, 0, 0, 0, 0, 0], [1, 2, 2, 4, 0, 1, 0, 0, 0, 0, 0], [1, 2, 3, 5, 1, 0, 0, 0, 0, 0, 0], [1, 2, 4, 7, 0, 0, 0, 0, 0, 0, 0], [1, 3, 0, 1, 3, 0, 0, 0, 0, 0, 0], [1, 3, 0, 2, 1, 1, 0, 0, 0, 0, 0], [1, 3, 0, 3, 0, 0, 1, 0, 0, 0, 0], [1, 3, 1, 3, 2, 0, 0, 0, 0, 0, 0], [1, 3, 1, 4, 0, 1, 0, 0, 0, 0, 0], [1, 3, 2, 5, 1, 0, 0, 0, 0, 0, 0], [1, 3, 3, 7, 0, 0, 0, 0, 0, 0, 0], [1, 4, 0, 3, 2, 0, 0, 0, 0, 0, 0], [1, 4, 0, 4, 0, 1, 0, 0, 0, 0, 0], [1, 4, 1, 5, 1, 0, 0, 0, 0, 0, 0], [1, 4, 2, 7, 0, 0, 0, 0, 0, 0, 0], [1, 5, 0, 5, 1, 0, 0, 0, 0, 0, 0], [1, 5, 1, 7, 0, 0, 0, 0, 0, 0, 0], [1, 6, 0, 7, 0, 0, 0, 0, 0, 0, 0], [2, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0], [2, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0], [2, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0], [2, 0, 1, 0, 2, 1, 0, 0, 0, 0, 0], [2, 0, 1, 1, 0, 2, 0, 0, 0, 0, 0], [2, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0], [2, 0, 1, 2, 0, 0, 0, 1, 0, 0, 0], [2, 0, 2, 1, 3, 0, 0, 0, 0, 0, 0], [2, 0, 2, 2, 1, 1, 0, 0, 0, 0, 0], [2, 0, 2, 3, 0, 0, 1, 0, 0, 0, 0], [2, 0, 3, 3, 2, 0, 0, 0, 0, 0, 0], [2, 0, 3, 4, 0, 1, 0, 0, 0, 0, 0], [2, 0, 4, 5, 1, 0, 0, 0, 0, 0, 0], [2, 0, 5, 7, 0, 0, 0, 0, 0, 0, 0], [2, 1, 0, 0, 2, 1, 0, 0, 0, 0, 0], [2, 1, 0, 1, 0, 2, 0, 0, 0, 0, 0], [2, 1, 0, 1, 1, 0, 1, 0, 0, 0, 0], [2, 1, 0, 2, 0, 0, 0, 1, 0, 0, 0], [2, 1, 1, 1, 3, 0, 0, 0, 0, 0, 0], [2, 1, 1, 2, 1, 1, 0, 0, 0, 0, 0], [2, 1, 1, 3, 0, 0, 1, 0, 0, 0, 0], [2, 1, 2, 3, 2, 0, 0, 0, 0, 0, 0], [2, 1, 2, 4, 0, 1, 0, 0, 0, 0, 0], [2, 1, 3, 5, 1, 0, 0, 0, 0, 0, 0], [2, 1, 4, 7, 0, 0, 0, 0, 0, 0, 0], [2, 2, 0, 1, 3, 0, 0, 0, 0, 0, 0], [2, 2, 0, 2, 1, 1, 0, 0, 0, 0, 0], [2, 2, 0, 3, 0, 0, 1, 0, 0, 0, 0], [2, 2, 1, 3, 2, 0, 0, 0, 0, 0, 0], [2, 2, 1, 4, 0, 1, 0, 0, 0, 0, 0], [2, 2, 2, 5, 1, 0, 0, 0, 0, 0, 0], [2, 2, 3, 7, 0, 0, 0, 0, 0, 0, 0], [2, 3, 0, 3, 2, 0, 0, 0, 0, 0, 0], [2, 3, 0, 4, 0, 1, 0, 0, 0, 0, 0], [2, 3, 1, 5, 1, 0, 0, 0, 0, 0, 0], [2, 3, 2, 7, 0, 0, 0, 0, 0, 0, 0], [2, 4, 0, 5, 1, 0, 0, 0, 0, 0, 0], [2, 4, 1, 7, 0, 0, 0, 0, 0, 0, 0], [2, 5, 0, 7, 0, 0, 0, 0, 0, 0, 0], [3, 0, 0, 0, 2, 1, 0, 0, 0, 0, 0], [3, 0, 0, 1, 0, 2, 0, 0, 0, 0, 0], [3, 0, 0, 1, 1, 0, 1, 0, 0, 0, 0], [3, 0, 0, 2, 0, 0, 0, 1, 0, 0, 0], [3, 0, 1, 1, 3, 0, 0, 0, 0, 0, 0], [3, 0, 1, 2, 1, 1, 0, 0, 0, 0, 0], [3, 0, 1, 3, 0, 0, 1, 0, 0, 0, 0], [3, 0, 2, 3, 2, 0, 0, 0, 0, 0, 0], [3, 0, 2, 4, 0, 1, 0, 0, 0, 0, 0], [3, 0, 3, 5, 1, 0, 0, 0, 0, 0, 0], [3, 0, 4, 7, 0, 0, 0, 0, 0, 0, 0], [3, 1, 0, 1, 3, 0, 0, 0, 0, 0, 0], [3, 1, 0, 2, 1, 1, 0, 0, 0, 0, 0], [3, 1, 0, 3, 0, 0, 1, 0, 0, 0, 0], [3, 1, 1, 3, 2, 0, 0, 0, 0, 0, 0], [3, 1, 1, 4, 0, 1, 0, 0, 0, 0, 0], [3, 1, 2, 5, 1, 0, 0, 0, 0, 0, 0], [3, 1, 3, 7, 0, 0, 0, 0, 0, 0, 0], [3, 2, 0, 3, 2, 0, 0, 0, 0, 0, 0], [3, 2, 0, 4, 0, 1, 0, 0, 0, 0, 0], [3, 2, 1, 5, 1, 0, 0, 0, 0, 0, 0], [3, 2, 2, 7, 0, 0, 0, 0, 0, 0, 0], [3, 3, 0, 5, 1, 0, 0, 0, 0, 0, 0], [3, 3, 1, 7, 0, 0, 0, 0, 0, 0, 0], [3, 4, 0, 7, 0, 0, 0, 0, 0, 0, 0], [4, 0, 0, 1, 3, 0, 0, 0, 0, 0, 0], [4, 0, 0, 2, 1, 1, 0, 0, 0, 0, 0], [4, 0, 0, 3, 0, 0, 1, 0, 0, 0, 0], [4, 0, 1, 3, 2, 0, 0, 0, 0, 0, 0], [4, 0, 1, 4, 0, 1, 0, 0, 0, 0, 0], [4, 0, 2, 5, 1, 0, 0, 0, 0, 0, 0], [4, 0, 3, 7, 0, 0, 0, 0, 0, 0, 0], [4, 1, 0, 3, 2, 0, 0, 0, 0, 0, 0], [4, 1, 0, 4, 0, 1, 0, 0, 0, 0, 0], [4, 1, 1, 5, 1, 0, 0, 0, 0, 0, 0], [4, 1, 2, 7, 0, 0, 0, 0, 0, 0, 0], [4, 2, 0, 5, 1, 0, 0, 0, 0, 0, 0], [4, 2, 1, 7, 0, 0, 0, 0, 0, 0, 0], [4, 3, 0, 7, 0, 0, 0, 0, 0, 0, 0], [5, 0, 0, 3, 2, 0, 0, 0, 0, 0, 0], [5, 0, 0, 4, 0, 1, 0, 0, 0, 0, 0], [5, 0, 1, 5, 1, 0, 0, 0, 0, 0, 0], [5, 0, 2, 7, 0, 0, 0, 0, 0, 0, 0], [5, 1, 0, 5, 1, 0, 0, 0, 0, 0, 0], [5, 1, 1, 7, 0, 0, 0, 0, 0, 0, 0], [5, 2, 0, 7, 0, 0, 0, 0, 0, 0, 0], [6, 0, 0, 5, 1, 0, 0, 0, 0, 0, 0], [6, 0, 1, 7, 0, 0, 0, 0, 0, 0, 0], [6, 1, 0, 7, 0, 0, 0, 0, 0, 0, 0], [7, 0, 0, 7, 0, 0, 0, 0, 0, 0, 0]]
-    else:
-        raise ValueError("p = "+str(p)+" is not supported!")
+    tables = [_Diophantine(p, dim)[0][:, :dim] for p in orders if p > 1]
+    indices, inverse = np.unique(np.vstack([np.zeros((1, dim), dtype=np.int64)] + tables), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    positions = {}
+    offset = 1
+    for p, table in zip([p for p in orders if p > 1], tables):
+        positions[p] = inverse[offset:offset + len(table)]
+        offset += len(table)
+    for array in [indices] + list(positions.values()):
+        array.setflags(write=False)
+    return indices, positions
+
 
 # ------------------------------------------------------------------------------
 # partial_v_B and partial_v_A are callables with arguments:
 # mu_x-th derivative, mu_y-th derivative, mu_z-th derivative, x, y, z,
 # depending on the dimensionality of the problem (1,2,3)
 # ------------------------------------------------------------------------------
+def _kernel(orders, partial_v_A, partial_v_B, position, verbose = False):
+    """
+    Calculate the kernel expression for all orders p in ``orders`` at ``position`` for the
+    transmutation of v_A to v_B. Every distinct derivative of v_A and v_B is evaluated exactly once
+    and shared by all orders
+    """
+    for p in orders:
+        _check_order(p)
+    dim = len(position)
+    indices, positions = _derivative_indices(tuple(int(p) for p in orders), dim)
+    # the zeroth derivative is the first row, since the multi-indices are sorted
+    partial_A = np.array([partial_v_A(*mu, *position) for mu in indices])
+    partial_B = np.array([partial_v_B(*mu, *position) for mu in indices])
+    deriv = partial_B - partial_A
+    ratio = (partial_B[0] - _reg)/(partial_A[0] - _reg)
+    if verbose and any(p > 1 for p in orders):
+        if abs(ratio) >= 1:
+            print('Warning: naive convergence criterion | 1 - v_B/v_A | < 1 violated at point ' + str(tuple(position)) + ' !')
+    sum = 0
+    for p in orders:
+        if p == 1:
+            sum += deriv[0]
+        else:
+            Dio, coefficients = _Diophantine(int(p), dim)
+            # in 1D the powers are x**mu_x, in 2D (x+y)**(mu_x+mu_y) and in 3D (x+y+z)**(mu_x+mu_y+mu_z)
+            final_sum = deriv[positions[int(p)]] @ (coefficients*np.sum(position)**Dio[:, :dim].sum(axis=1))
+            sum += final_sum*((1 - ratio)**(p-1))/p
+    return sum
+
+
 def _single_kernel_1D(p, partial_v_A, partial_v_B, x, verbose = False):
     """
     Calculate the kernel expression at order p and point x for the transmutation
     of v_A to v_B
     """
-    if p not in [1, 2, 3, 4, 5, 6, 7, 8, 9]:
-        raise ValueError("p = " + str(p) + " is not supported!")
-    if p == 1:
-        return partial_v_B(0,x) - partial_v_A(0,x)
-    else:
-        final_sum = 0
-        Dio = _Diophantine_1D(p)
-        for index in range(len(Dio)):
-            mu_x = Dio[index][0]
-            deriv = partial_v_B(mu_x,x) - partial_v_A(mu_x,x)
-            product_i = x**mu_x
-            for i in range(p-1):
-                k_i = Dio[index][1+i]
-                product_i /= _fc(k_i)
-            final_sum += deriv*product_i
-        ratio = (partial_v_B(0,x) - _reg)/(partial_v_A(0,x) - _reg)
-        if verbose:
-            if abs(ratio) >= 1:
-                print('Warning: naive convergence criterion | 1 - v_B/v_A | < 1 violated at point ' + str(x) + ' !')
-        return final_sum*((1 - ratio)**(p-1))/p
+    return _kernel([p], partial_v_A, partial_v_B, (x,), verbose = verbose)
 
 
 def _single_kernel_2D(p, partial_v_A, partial_v_B, x,y, verbose = False):
@@ -138,28 +172,7 @@ def _single_kernel_2D(p, partial_v_A, partial_v_B, x,y, verbose = False):
     Calculate the kernel expression at order p and point x,y for the transmutation
     of v_A to v_B
     """
-    if p not in [1, 2, 3, 4, 5, 6, 7, 8, 9]:
-        raise ValueError("p = " + str(p) + " is not supported!")
-    if p == 1:
-        return partial_v_B(0,0,x,y) - partial_v_A(0,0,x,y)
-    else:
-        final_sum = 0
-        Dio = _Diophantine_2D(p)
-        for index in range(len(Dio)):
-            mu_x = Dio[index][0]
-            mu_y = Dio[index][1]
-            deriv = partial_v_B(mu_x,mu_y,x,y) - partial_v_A(mu_x,mu_y,x,y)
-            k = mu_x + mu_y
-            product_i = (x + y)**k
-            for i in range(p-1):
-                k_i = Dio[index][2+i]
-                product_i /= _fc(k_i)
-            final_sum += deriv*product_i
-        ratio = (partial_v_B(0,0,x,y) - _reg)/(partial_v_A(0,0,x,y) - _reg)
-        if verbose:
-            if abs(ratio) >= 1:
-                print('Warning: naive convergence criterion | 1 - v_B/v_A | < 1 violated at point (' + str(x) + ', ' + str(y) + ') !')
-        return final_sum*((1 - ratio)**(p-1))/p
+    return _kernel([p], partial_v_A, partial_v_B, (x, y), verbose = verbose)
 
 
 def _single_kernel_3D(p, partial_v_A, partial_v_B, x,y,z, verbose = False):
@@ -167,29 +180,7 @@ def _single_kernel_3D(p, partial_v_A, partial_v_B, x,y,z, verbose = False):
     Calculate the kernel expression at order p and point x,y,z for the transmutation
     of v_A to v_B
     """
-    if p not in [1, 2, 3, 4, 5, 6, 7, 8, 9]:
-        raise ValueError("p = " + str(p) + " is not supported!")
-    if p == 1:
-        return partial_v_B(0,0,0,x,y,z) - partial_v_A(0,0,0,x,y,z)
-    else:
-        final_sum = 0
-        Dio = _Diophantine_3D(p)
-        for index in range(len(Dio)):
-            mu_x = Dio[index][0]
-            mu_y = Dio[index][1]
-            mu_z = Dio[index][2]
-            deriv = partial_v_B(mu_x,mu_y,mu_z,x,y,z) - partial_v_A(mu_x,mu_y,mu_z,x,y,z)
-            k = mu_x + mu_y + mu_z
-            product_i = (x + y + z)**k
-            for i in range(p-1):
-                k_i = Dio[index][3+i]
-                product_i /= _fc(k_i)
-            final_sum += deriv*product_i
-        ratio = (partial_v_B(0,0,0,x,y,z) - _reg)/(partial_v_A(0,0,0,x,y,z) - _reg)
-        if verbose:
-            if abs(ratio) >= 1:
-                print('Warning: naive convergence criterion | 1 - v_B/v_A | < 1 violated at point (' + str(x) + ', ' + str(y) + str(z) + ') !')
-        return final_sum*((1 - ratio)**(p-1))/p
+    return _kernel([p], partial_v_A, partial_v_B, (x, y, z), verbose = verbose)
 
 
 
@@ -213,7 +204,7 @@ def kernel_1D(partial_v_A, partial_v_B, x, orders = [1, 2, 3], verbose = False):
                 coordinate
             orders : list, optional
                 A list of the orders :math:`p` in the kernel to be summed over. Recommended are at least ``[1,2,3]``,
-                precise is ``[1,2,3,4,5]``. :math:`p` is implemented up to and including 9-th order
+                precise is ``[1,2,3,4,5]``. :math:`p` is implemented for arbitrary order
             verbose : bool, optional
                 If ``True``, prints a warning if the naive convergence criterion :math:`|1 - v_B(x)/v_A(x)| < 1` is violated.
                 This does not imply divergence of the series but may hint towards
@@ -228,13 +219,9 @@ def kernel_1D(partial_v_A, partial_v_B, x, orders = [1, 2, 3], verbose = False):
     if len(orders) == 0:
         print('Warning: No orders defined!')
         return 0
-    if not all([n in [1, 2, 3, 4, 5, 6, 7, 8, 9] for n in orders]):
-        raise ValueError('Only orders p = {1,2,3,4,5,6,7,8,9} are supported!')
-        return 0
-    sum = 0
-    for i in orders:
-        sum += _single_kernel_1D(i, partial_v_A, partial_v_B, x, verbose = verbose)
-    return sum
+    if not all([int(n) == n and n >= 1 for n in orders]):
+        raise ValueError('Only positive integer orders p are supported!')
+    return _kernel(orders, partial_v_A, partial_v_B, (x,), verbose = verbose)
 
 
 def kernel_2D(partial_v_A, partial_v_B, x,y, orders = [1, 2, 3], verbose = False):
@@ -254,7 +241,7 @@ def kernel_2D(partial_v_A, partial_v_B, x,y, orders = [1, 2, 3], verbose = False
                 coordinates
             orders : list, optional
                 A list of the orders :math:`p` in the kernel to be summed over. Recommended are at least ``[1,2,3]``,
-                precise is ``[1,2,3,4,5]``. :math:`p` is implemented up to and including 9-th order
+                precise is ``[1,2,3,4,5]``. :math:`p` is implemented for arbitrary order
             verbose : bool, optional
                 If ``True``, prints a warning if the naive convergence criterion :math:`|1 - v_B(x,y)/v_A(x,y)| < 1` is violated.
                 This does not imply divergence of the series but may hint towards
@@ -269,13 +256,9 @@ def kernel_2D(partial_v_A, partial_v_B, x,y, orders = [1, 2, 3], verbose = False
     if len(orders) == 0:
         print('Warning: No orders defined!')
         return 0
-    if not all([n in [1, 2, 3, 4, 5, 6, 7, 8, 9] for n in orders]):
-        raise ValueError('Only orders p = {1,2,3,4,5,6,7,8,9} are supported!')
-        return 0
-    sum = 0
-    for i in orders:
-        sum += _single_kernel_2D(i, partial_v_A, partial_v_B, x,y, verbose = verbose)
-    return sum
+    if not all([int(n) == n and n >= 1 for n in orders]):
+        raise ValueError('Only positive integer orders p are supported!')
+    return _kernel(orders, partial_v_A, partial_v_B, (x, y), verbose = verbose)
 
 
 def kernel_3D(partial_v_A, partial_v_B, x,y,z, orders = [1, 2, 3], verbose = False):
@@ -295,7 +278,7 @@ def kernel_3D(partial_v_A, partial_v_B, x,y,z, orders = [1, 2, 3], verbose = Fal
                 coordinates
             orders : list, optional
                 A list of the orders :math:`p` in the kernel to be summed over. Recommended are at least ``[1,2,3]``,
-                precise is ``[1,2,3,4,5]``. :math:`p` is implemented up to and including 9-th order
+                precise is ``[1,2,3,4,5]``. :math:`p` is implemented for arbitrary order
             verbose : bool, optional
                 If ``True``, prints a warning if the naive convergence criterion :math:`|1 - v_B(x,y,z)/v_A(x,y,z)| < 1` is violated.
                 This does not imply divergence of the series but may hint towards
@@ -310,10 +293,6 @@ def kernel_3D(partial_v_A, partial_v_B, x,y,z, orders = [1, 2, 3], verbose = Fal
     if len(orders) == 0:
         print('Warning: No orders defined!')
         return 0
-    if not all([n in [1, 2, 3, 4, 5, 6, 7, 8, 9] for n in orders]):
-        raise ValueError('Only orders p = {1,2,3,4,5,6,7,8,9} are supported!')
-        return 0
-    sum = 0
-    for i in orders:
-        sum += _single_kernel_3D(i, partial_v_A, partial_v_B, x,y,z, verbose = verbose)
-    return sum
+    if not all([int(n) == n and n >= 1 for n in orders]):
+        raise ValueError('Only positive integer orders p are supported!')
+    return _kernel(orders, partial_v_A, partial_v_B, (x, y, z), verbose = verbose)
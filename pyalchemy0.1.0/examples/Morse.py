@@ -4,7 +4,7 @@ from scipy.integrate import romb
 import matplotlib.pyplot as plt
 plt.rcParams['text.usetex'] = True
 
-from pyalchemy.kernels import kernel_1D
+from pyalchemy.kernels import kernel_1D_grid
 from pyalchemy.potentials import Morse
 
 # ----------------------------------Parameters----------------------------------
@@ -30,26 +30,27 @@ for D_B in D_B_list:
         for r_B in r_B_list:
             Morse_B = Morse(D_B, a_B, r_B)
 
-            for n in n_list:
+            def v_A(k, x):
+                return Morse_A.v(k, x)
 
-                # The true value
-                Delta_E_analyt = Morse_B.E(n) - Morse_A.E(n)
+            def v_B(k, x):
+                return Morse_B.v(k, x)
 
-                def v_A(k, x):
-                    return Morse_A.v(k, x)
+            # The kernel does not depend on n; evaluate it once per pair of potentials
+            steps = 2**13 + 1
+            limit_low = -30
+            limit_high = 70
+            dx = (limit_high - limit_low)/steps
+            x = np.linspace(limit_low, limit_high, steps)
+            kernel = kernel_1D_grid(v_A, v_B, x)
 
-                def v_B(k, x):
-                    return Morse_B.v(k, x)
+            for n in n_list:
 
-                def integrand(x):
-                    return Morse_A.rho(n, x)*kernel_1D(v_A, v_B , x)
+                # The true value
+                Delta_E_analyt = Morse_B.E(n) - Morse_A.E(n)
 
                 # The value computed via AIT, romb
-                steps = 2**13 + 1
-                limit_low = -30
-                limit_high = 70
-                dx = (limit_high - limit_low)/steps
-                romb_list = [integrand(x) for x in np.linspace(limit_low, limit_high, steps)]
+                romb_list = Morse_A.rho(n, x)*kernel
                 Delta_E_AIT = romb(romb_list, dx=dx)
 
 
@@ -4,7 +4,7 @@ from scipy.integrate import romb
 import matplotlib.pyplot as plt
 plt.rcParams['text.usetex'] = True
 
-from pyalchemy.kernels import kernel_1D
+from pyalchemy.kernels import kernel_1D_grid
 from pyalchemy.potentials import QHO
 
 # ----------------------------------Parameters----------------------------------
@@ -28,26 +28,27 @@ QHO_A = QHO(omega_A)
 for omega_B in omega_B_list:
     QHO_B = QHO(omega_B)
 
-    for n in n_list:
+    def v_A(k, x):
+        return QHO_A.v(k, x)
 
-        # The true value
-        Delta_E_analyt = QHO_B.E(n) - QHO_A.E(n)
+    def v_B(k, x):
+        return QHO_B.v(k, x)
 
-        def v_A(k, x):
-            return QHO_A.v(k, x)
+    # The kernel does not depend on n; evaluate it once per pair of potentials
+    steps = 2**8 + 1
+    limit_low = -30
+    limit_high = 30
+    dx = (limit_high - limit_low)/steps
+    x = np.linspace(limit_low, limit_high, steps)
+    kernel = kernel_1D_grid(v_A, v_B, x, max_order=10)
 
-        def v_B(k, x):
-            return QHO_B.v(k, x)
+    for n in n_list:
 
-        def integrand(x):
-            return QHO_A.rho(n, x)*kernel_1D(v_A, v_B , x, max_order=10)
+        # The true value
+        Delta_E_analyt = QHO_B.E(n) - QHO_A.E(n)
 
         # The value computed via AIT, romb; accurate, but slow
-        steps = 2**8 + 1
-        limit_low = -30
-        limit_high = 30
-        dx = (limit_high - limit_low)/steps
-        romb_list = [integrand(x) for x in np.linspace(limit_low, limit_high, steps)]
+        romb_list = QHO_A.rho(n, x)*kernel
         Delta_E_AIT = romb(romb_list, dx=dx)
 
         deviation = abs(Delta_E_AIT-Delta_E_analyt)
@@ -6,27 +6,55 @@ Throughout this code, Hartree atomic units are used.
 
 """
 
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from .taylor import TaylorPotential
+
 _reg = 1e-8
 
 
-# factorial function
+# factorial function; exact integers, memoized
+@lru_cache(maxsize=None)
 def _fc(n):
-    if n == 0 or n == 1:
-        return 1
-    else:
-        return n*_fc(n-1)
+    return math.factorial(n)
 
 
-# binomial coefficient
+# binomial coefficient; exact integers, memoized
+@lru_cache(maxsize=None)
 def _bn(n,k):
-    if n == k:
-        return 1
-    elif k > n:
-        return 0
-    elif n < 0:
+    if n < 0:
         print('Warning')
     else:
-        return _fc(n)/(_fc(k)*_fc(n-k))
+        return math.comb(n, k)
+
+
+# Rows 0, ..., n of Pascal's triangle as a float array of shape (n+1, n+1)
+@lru_cache(maxsize=None)
+def _binomials(n):
+    table = np.array([[_bn(m, k) for k in range(n+1)] for m in range(n+1)], dtype=float)
+    table.setflags(write=False)
+    return table
+
+
+def _Bell_table(n, x):
+    """
+    Return all partial Bell polynomials B(m, k) with 0 <= k <= m <= n at once, as an array
+    of shape (n+1, n+1, ...), by the recurrence B(m, k) = sum_i binom(m-1, i) x[i] B(m-i-1, k-1).
+    x is an array of shape (L, ...) whose leading axis holds the arguments and whose remaining axes
+    are evaluation points; B(m, k) is only correct if L >= m-k+1, as in ``_Bell``.
+    """
+    x = np.asarray(x, dtype=float)
+    B = np.zeros((n+1, n+1) + x.shape[1:])
+    B[0, 0] = 1
+    binomials = _binomials(max(n-1, 0))
+    for m in range(1, n+1):
+        # row m from the rows m-1, ..., 0, i.e. O(n^2) array operations for the whole triangle
+        for i in range(min(m, len(x))):
+            B[m, 1:m+1] += binomials[m-1, i]*x[i]*B[m-i-1, :m]
+    return B
 
 
 # Bell polynomials
@@ -36,18 +64,41 @@ def _Bell(n, k, x):
     x must be at least of length n-k+1, but can be longer, although these elements
     are ignored.
     """
-    if n == 0 and k == 0:
-        return 1
-    elif n > 0 and k == 0:
-        return 0
-    elif n == 0 and k > 0:
+    if k > n:
         return 0
-    else:
-        summe = 0
-        for i in range(0, n-k+1):
-            # the new x must be of length n-i-k+2
-            summe += _bn(n-1, i)*x[i]*_Bell(n-i-1, k-1, x)
-        return summe
+    return _Bell_table(n, x[:max(n-k+1, 0)])[n, k]
+
+
+def _inverse(n, derivatives):
+    """
+    Return the coefficients g_1, ..., g_n of the inverse of a function (see ``_g``) from its
+    derivatives of orders 1, ..., n, an array of shape (n, ...) whose remaining axes are evaluation
+    points. All coefficients at all points share one table of Bell polynomials.
+    """
+    derivatives = np.asarray(derivatives, dtype=float)
+    f1 = derivatives[0]
+    g = np.zeros(derivatives.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g[0] = 1/f1
+        if n > 1:
+            k = np.arange(2, n+1).reshape((-1,) + (1,)*f1.ndim)
+            f_hat = derivatives[1:]/(k*(f1 + _reg))
+            B = _Bell_table(n-1, f_hat)
+            for i in range(2, n+1):
+                coefficients = [(-1)**k * (_fc(i+k-1)/_fc(k-1)) for k in range(1, i)]
+                g[i-1] = np.tensordot(coefficients, B[i-1, 1:i], axes=1)/((f1)**i)
+    # first derivative too small for Lagrange inversion to hold; just return zero,
+    # as the number of points where f1 = 0 should be a non-measurable subset
+    return np.where(np.abs(f1) < _reg, 0, g)
+
+
+def _g_all(n, f, x):
+    """
+    Return the coefficients g_1, ..., g_n of the inverse of the function f (see ``_g``) at once,
+    as an array of shape (n, ...).
+    """
+    f1 = f(1, x)
+    return _inverse(n, [f1] + [f(k, x) + 0*f1 for k in range(2, n+1)])
 
 
 def _g(i, f, x):
@@ -56,20 +107,44 @@ def _g(i, f, x):
     in return can be computed as its derivatives. f needs to be of form
     f(k, x); k stores the order of the derivative w.r.t. the variable x
     """
-    f1 = f(1, x)
-    if abs(f1) < _reg:
-        # first derivative too small for Lagrange inversion to hold; just return zero,
-        # as the number of points where f1 = 0 should be a non-measurable subset
-        return 0
-    if i == 1:
-        return 1/(f1)
-    else:
-        # initialize all necessary f_i's
-        f_hat = [f(k+1, x)/((k+1)*(f1 + _reg)) for k in range(1,i)]
-        sum = 0
-        for k in range(1,i):
-            sum += (-1)**k * (_fc(i+k-1)/_fc(k-1)) * _Bell(i-1,k,f_hat)
-        return sum/((f1)**i)
+    return _g_all(i, f, x)[i-1][()]
+
+
+def _derivatives(v, order, x):
+    """
+    Return the derivatives of orders 0, ..., order of the potential v at all points x, an array of
+    shape (order+1, len(x)). A ``TaylorPotential`` is evaluated once for all of them, any other
+    callable v(k, x) once per order and point.
+    """
+    if isinstance(v, TaylorPotential):
+        return v.derivatives(order, np.asarray(x, dtype=float))
+    return np.array([[v(k, y) for y in x] for k in range(order+1)], dtype=float).reshape(order+1, len(x))
+
+
+def _kernel_1D_stencils(v_A, v_B, nodes, stencils, max_order, h):
+    """
+    Return the 1D kernel at many points from a common set of nodes of the central finite differences.
+    stencils is an integer array of shape (N, 2*p_max-1) whose row j holds the indices in nodes of
+    x_j + m*h/2, m = -(p_max-1), ..., p_max-1; the points x_j + (k/2 - i)*h of all orders are among them.
+    """
+    width = max_order - 1
+    # g_1, ..., g_(p_max-1) and Delta v at every node, and one table of all Bell polynomials
+    # B(p-1, k) at all of them; row p-1 of the table only depends on g_1, ..., g_(p-1)
+    derivatives = _derivatives(v_A, width, nodes)
+    Delta_v = _derivatives(v_B, 0, nodes)[0] - derivatives[0]
+    if max_order > 1:
+        Bell = _Bell_table(width, -_inverse(width, derivatives[1:]))
+
+    # first order is just Delta v
+    summe = Delta_v[stencils[:, width]]
+    for p in range(2, max_order+1):
+        for k in range(1,p):
+            # Approximate derivative with central finite differences at x + (k/2 - i)*h, i = 0, ..., k
+            stencil = stencils[:, width + k - 2*np.arange(k+1)]
+            f = Bell[p-1, k][stencil]*Delta_v[stencil]**p
+            derivative = sum([(-1)**i * _bn(k,i) * f[:, i] for i in range(0,k+1)])/(h**k)
+        summe = summe + derivative/_fc(p)
+    return summe
 
 
 def kernel_1D(v_A, v_B, x, max_order = 4):
@@ -95,19 +170,59 @@ def kernel_1D(v_A, v_B, x, max_order = 4):
       The 1D kernel of AIT between systems $A$ and $B$ at $x$ up to order $p_{max}$.
 
     """
-    # first order is just Delta v
-    summe = v_B(0, x) - v_A(0, x)
-    for p in range(2, int(max_order)+1):
-        for k in range(1,p):
-            def f(y):
-                g_vec = [-_g(i, v_A, y) for i in range(1,p-k+1)]
-                Delta_v = (v_B(0, y) - v_A(0, y))
-                return _Bell(p-1,k,g_vec)*Delta_v**p
-            # Approximate derivative with central finite differences
-            h = 0.01
-            derivative = sum([(-1)**i * _bn(k,i) * f(x+(k/2 - i)*h) for i in range(0,k+1)])/(h**k)
-        summe += derivative/_fc(p)
-    return summe
+    max_order = int(max_order)
+    h = 0.01
+    # the points x + (k/2 - i)*h of the finite differences recur for many k and p
+    nodes = [x + m*(h/2) for m in range(-max_order+1, max_order)]
+    return _kernel_1D_stencils(v_A, v_B, nodes, np.arange(len(nodes))[None, :], max_order, h)[0]
+
+
+def kernel_1D_grid(v_A, v_B, x, max_order = 4, h = 0.01):
+    """
+
+    One-dimensional kernel of the Alchemical Integral Transform at all points of a grid
+
+    The finite differences of all orders and all points share one lattice of nodes, so $v_A$, $v_B$ and the
+    coefficients of the inversion of $v_A$ are evaluated once per node. If `x` is uniform with spacing $\Delta x$,
+    the lattice is aligned with the grid: $h$ is lowered to the next value for which $2 \Delta x / h$ is an
+    integer, such that neighbouring points share their nodes if $\Delta x < (p_{max}-1) \, h$. Otherwise, every
+    point has its own nodes, as in `kernel_1D()`.
+
+    **Parameters:**
+
+    - `v_A` **: callable**
+      A scalar function of the initial system's external potential in 1D. It expects two arguments, `k` and `x` such that `v_A(k, x)` $=\frac{\partial^k}{\partial x^k} v_A(x)$
+    - `v_B` **: callable**
+      A scalar function of the final system's external potential in 1D. It expects two arguments, `k` and `x` such that `v_B(k, x)` $=\frac{\partial^k}{\partial x^k} v_B(x)$
+    - `x`**: array of shape (N,)**
+      coordinates $x$ of the grid
+    - `max_order` **: int, optional**
+      Maximum order $p_{max}$ in the kernel to be summed over. Default is 4.
+    - `h` **: float, optional**
+      Largest step of the central finite differences. Default is 0.01, as in `kernel_1D()`.
+
+    **Returns:**
+
+    - **array of shape (N,)**
+      The 1D kernel of AIT between systems $A$ and $B$ at all points up to order $p_{max}$.
+
+    """
+    max_order = int(max_order)
+    x = np.asarray(x, dtype=float).ravel()
+    m = np.arange(-max_order+1, max_order)
+    steps = np.diff(x)
+    if len(x) > 1 and steps[0] != 0 and np.allclose(steps, steps[0], rtol=1e-10, atol=0):
+        # lattice of spacing h/2 = |dx|/M through all points of the grid, in units of dx/M
+        M = int(np.ceil(2*abs(steps[0])/h - 1e-9))
+        h = 2*abs(steps[0])/M
+        keys = (M*np.arange(len(x)))[:, None] + np.sign(steps[0]).astype(int)*m
+        keys, stencils = np.unique(keys, return_inverse=True)
+        nodes = x[0] + keys*(steps[0]/M)
+    else:
+        nodes = (x[:, None] + m*(h/2)).ravel()
+        stencils = np.arange(len(nodes))
+    stencils = stencils.reshape(len(x), len(m))
+    return _kernel_1D_stencils(v_A, v_B, [float(y) for y in nodes], stencils, max_order, h)
 
 
 def param(v_A, v_B, x, Lambda, max_order=4):
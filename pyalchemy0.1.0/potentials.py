@@ -5,6 +5,9 @@ Throughout this code, Hartree atomic units are used.
 
 """
 
+from functools import lru_cache
+
+import numpy as np
 from scipy.special import gamma
 
 # Regulator for numerically instable fractions
@@ -117,6 +120,59 @@ class hydlike:
         return sum([(2*l+1)*((xi*r)**(2*l))*(xi**3)*(e**(-xi*r))*(_L(n-l-1,2*l+1,xi*r))**2*_fc(n-l-1)/(2*n*_fc(n+l)) for l in range(0,n)])/(4*pi*n**2)
 
 
+# _multi_indices and _coulomb_derivatives follow those of src/pyalchemy/potentials.py, which this version
+# cannot import, and are the same as in pyalchemy0.0.7/potentials.py; unlike src, the recurrence runs on
+# the numerators to keep the regulator _reg, and the atoms are not treated in blocks
+# All multi-indices [n_x, n_y, n_z] with n_x + n_y + n_z <= order, sorted by their total order
+@lru_cache(maxsize=None)
+def _multi_indices(order):
+    indices = np.array([(t, u, L - t - u) for L in range(order + 1) for t in range(L, -1, -1) for u in range(L - t, -1, -1)],
+                       dtype=int).reshape(-1, 3)
+    indices.setflags(write=False)
+    return indices
+
+
+def _coulomb_derivatives(mol, indices, r, nuc_rad=0.0):
+    """
+    Derivatives of the Coulomb potential sum_i -Z_i/sqrt(|r - R_i|^2 + nuc_rad^2) for many multi-indices at once
+    via the Hermite recurrence of McMurchie and Davidson: with s = |r - R_i|^2 + nuc_rad^2 and R^m_(tuv) the
+    derivative d^(t+u+v)/dx^t dy^u dz^v of d^m/ds^m s^(-1/2),
+
+        R^m_(t+1,u,v) = 2*(t*R^(m+1)_(t-1,u,v) + (x - x_i)*R^(m+1)_(tuv))
+
+    and likewise in y and z. The multi-indices must be sorted by their total order and contain every index
+    which follows from lowering their first non-vanishing component, e.g. ``_multi_indices(order)``.
+    The recurrence runs on the numerators N^m_(tuv) = R^m_(tuv)*s^(m+t+u+v+1/2), which are polynomials in
+    x - x_i, y - y_i, z - z_i and s, such that the denominators s^(t+u+v+1/2) are regularized by ``_reg``
+    as in the explicit formulas up to third order, and the derivatives are finite at the nuclei.
+    Returns an array of shape (len(indices), *r.shape[:-1]).
+    """
+    mol = np.asarray(mol, dtype=float).reshape(-1, 4)
+    r = np.asarray(r, dtype=float)
+    indices = [tuple(int(n) for n in index) for index in indices]
+    order = max(sum(index) for index in indices)
+    values = np.zeros((len(indices),) + r.shape[:-1])
+    for Z, *R_i in mol:
+        d = np.moveaxis(r - R_i, -1, 0)
+        s = np.sum(d**2, axis=0) + nuc_rad**2
+        # N^m_(000) = s^(m+1/2) d^m/ds^m s^(-1/2) for m = 0, ..., order
+        N_0 = np.cumprod([1.0] + [-(2*m - 1)/2 for m in range(1, order + 1)])
+        N = {(0, 0, 0): N_0.reshape((-1,) + (1,)*s.ndim)*np.ones_like(s)}
+        for index in indices:
+            if index in N:
+                continue
+            # lower the first non-vanishing component; N^m is kept for m = 0, ..., order - (t+u+v)
+            axis = next(j for j in range(3) if index[j] > 0)
+            lower = index[:axis] + (index[axis] - 1,) + index[axis+1:]
+            term = d[axis]*N[lower][1:]
+            if lower[axis] > 0:
+                lowest = index[:axis] + (index[axis] - 2,) + index[axis+1:]
+                term += lower[axis]*s*N[lowest][1:len(term) + 1]
+            N[index] = 2*term
+        values -= Z*np.array([N[index][0]/(s**(sum(index) + 0.5) + _reg) for index in indices])
+    return values
+
+
 class Coulomb_3D:
     """
     A class for the external potential in 3D of the given molecule
@@ -130,112 +186,55 @@ class Coulomb_3D:
     def __init__(self, mol):
         self.mol = mol
 
-    def v(self, n, r):
+    def v(self, n, r, nuc_rad = 0):
         """
         A function for the external potential in 3D of the given molecule and its spatial derivatives.
-        These derivatives are analytical up to and including third order :math:`n_x+n_y+n_z \leq 3`,
-        and defined recursively via finite differences for higher orders.
+        These derivatives are analytical for all orders.
 
         Parameters:
-                mol : array of shape (..., 4)
-                    A list of lists of the 4D coordinates (nuclear charge :math:`Z_i`, coordinates :math:`x_i, y_i, z_i` of all atoms,
-                    i.e. ``mole = [[Z_1, x_1, y_1, z_1], [Z_2, x_2, y_2, z_2], ...]``
                 n : list of three ints n_x, n_y, n_z
                     Order of the derivative
                 r : list of three floats x, y, z
                     coordinates
                 nuc_rad : float, optional
-                    An optional nuclear radius :math:`\eta` such that the Coulomb potential is rendered finite everywhere:
-                    :math:`\\frac{-Z_i}{\\sqrt{(x - x_i)^2 + (y - y_i)^2 + (z - z_i)^2}} \\rightarrow \\frac{-Z_i}{\sqrt{(x - x_i)^2 + (y - y_i)^2 + (z - z_i)^2 + \eta^2}}`
+                    An optional nuclear radius :math:`\\eta` such that the Coulomb potential is rendered finite everywhere:
+                    :math:`\\frac{-Z_i}{\\sqrt{(x - x_i)^2 + (y - y_i)^2 + (z - z_i)^2}} \\rightarrow \\frac{-Z_i}{\\sqrt{(x - x_i)^2 + (y - y_i)^2 + (z - z_i)^2 + \\eta^2}}`
 
         Returns:
                 float
-                    the :math:`\bm{n} = [n_x+n_y+n_z]`-th derivative of the external potential
-                    with nuclear radius ``nuc_rad`` at ``\bm{r} = [x,y,z]``,
+                    the :math:`\\bm{n} = [n_x+n_y+n_z]`-th derivative of the external potential
+                    with nuclear radius ``nuc_rad`` at ``\\bm{r} = [x,y,z]``,
                     i.e. :math:`\\frac{\\partial^{n_x + n_y + n_z} }{\\partial x^{n_x} \\partial y^{n_y} \\partial z^{n_z} } v_{\\text{mol}}(x,y,z)`
 
         """
-        n[0] = n_x
-        n[1] = n_y
-        n[2] = n_z
-        r[0] = x
-        r[1] = y
-        r[2] = z
-        sum = 0
-        # ----------------------------0-th derivatives------------------------------
-        if n_x == 0 and n_y == 0 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(1/2) + _reg)
-        # ----------------------------1-st derivatives------------------------------
-        elif n_x == 1 and n_y == 0 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*(x-self.mol[i][1])/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(3/2) + _reg)
-        elif n_x == 0 and n_y == 1 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*(y-self.mol[i][2])/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(3/2) + _reg)
-        elif n_x == 0 and n_y == 0 and n_z == 1:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*(z-self.mol[i][3])/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(3/2) + _reg)
-        # ----------------------------2-nd derivatives------------------------------
-        elif n_x == 2 and n_y == 0 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*(-2*(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(5/2) + _reg)
-        elif n_x == 0 and n_y == 2 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*(-2*(y-self.mol[i][2])**2+(x-self.mol[i][1])**2+(z-self.mol[i][3])**2)/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(5/2) + _reg)
-        elif n_x == 0 and n_y == 0 and n_z == 2:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*(-2*(z-self.mol[i][3])**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2)/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(5/2) + _reg)
-        elif n_x == 1 and n_y == 1 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += -3*self.mol[i][0]*(x-self.mol[i][1])*(y-self.mol[i][2])/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(5/2) + _reg)
-        elif n_x == 1 and n_y == 0 and n_z == 1:
-            for i in range(len(self.mol)):
-                sum += -3*self.mol[i][0]*(x-self.mol[i][1])*(z-self.mol[i][3])/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(5/2) + _reg)
-        elif n_x == 0 and n_y == 1 and n_z == 1:
-            for i in range(len(self.mol)):
-                sum += -3*self.mol[i][0]*(y-self.mol[i][2])*(z-self.mol[i][3])/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(5/2) + _reg)
-        # ----------------------------3-rd derivatives------------------------------
-        elif n_x == 3 and n_y == 0 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*6*((x-self.mol[i][1])**3 - (x-self.mol[i][1])*(y-self.mol[i][2])**2 - (x-self.mol[i][1])*(z-self.mol[i][3])**2)/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 0 and n_y == 3 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*6*((y-self.mol[i][2])**3 - (y-self.mol[i][2])*(x-self.mol[i][1])**2 - (y-self.mol[i][2])*(z-self.mol[i][3])**2)/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 0 and n_y == 0 and n_z == 3:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*6*((z-self.mol[i][3])**3 - (z-self.mol[i][3])*(x-self.mol[i][1])**2 - (z-self.mol[i][3])*(y-self.mol[i][2])**2)/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 2 and n_y == 1 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]*3*(y - self.mol[i][2])*( (-4)*(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2 )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 2 and n_y == 0 and n_z == 1:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]*3*(z - self.mol[i][3])*( (-4)*(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2 )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 1 and n_y == 2 and n_z == 0:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]*3*(x - self.mol[i][1])*( (x-self.mol[i][1])**2+(-4)*(y-self.mol[i][2])**2+(z-self.mol[i][3])**2 )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 0 and n_y == 2 and n_z == 1:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]*3*(z - self.mol[i][3])*( (x-self.mol[i][1])**2+(-4)*(y-self.mol[i][2])**2+(z-self.mol[i][3])**2 )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 1 and n_y == 0 and n_z == 2:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]*3*(x - self.mol[i][1])*( (x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(-4)*(z-self.mol[i][3])**2 )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 0 and n_y == 1 and n_z == 2:
-            for i in range(len(self.mol)):
-                sum += -self.mol[i][0]*3*(y - self.mol[i][2])*( (x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(-4)*(z-self.mol[i][3])**2 )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        elif n_x == 1 and n_y == 1 and n_z == 1:
-            for i in range(len(self.mol)):
-                sum += self.mol[i][0]*15*( (x-self.mol[i][1])*(y-self.mol[i][2])*(z-self.mol[i][3]) )/((nuc_rad**2+(x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)**(7/2) + _reg)
-        # --------------------------higher derivatives------------------------------
-        elif n_x + n_y + n_z > 3:
-            h = 0.01
-            if n_x > 3:
-                sum += (self.v(self.mol,n_x - 1, n_y, n_z, x+h, y, z) - self.v(self.mol,n_x - 1, n_y, n_z, x-h, y, z))/(2*h)
-            if n_y > 3:
-                sum += (self.v(self.mol,n_x, n_y - 1, n_z, x, y+h, z) - self.v(self.mol,n_x, n_y - 1, n_z, x, y-h, z))/(2*h)
-            if n_z > 3:
-                sum += (self.v(self.mol,n_x, n_y, n_z - 1, x, y, z+h) - self.v(self.mol,n_x, n_y, n_z - 1, x, y, z-h))/(2*h)
-        # --------------------------------------------------------------------------
-        else:
-            raise ValueError("The "+str(n_x + n_y + n_z)+"-th derivative is not supported!")
-        return sum
+        n_x, n_y, n_z = n
+        if min(n_x, n_y, n_z) < 0 or any(int(k) != k for k in (n_x, n_y, n_z)):
+            raise ValueError("The derivative "+str(list(n))+" is not supported!")
+        # only the multi-indices up to [n_x, n_y, n_z] enter the recurrence
+        indices = sorted(((t, u, v) for t in range(int(n_x)+1) for u in range(int(n_y)+1) for v in range(int(n_z)+1)), key=sum)
+        return _coulomb_derivatives(self.mol, indices, r, nuc_rad)[-1][()]
+
+    def derivatives(self, order, r, nuc_rad = 0):
+        """
+        All spatial derivatives of the external potential up to and including a total order
+        :math:`n_x+n_y+n_z \\leq` ``order`` at once.
+
+        Parameters:
+                order : int
+                    The highest total order of the derivatives
+                r : array of shape (..., 3)
+                    coordinates
+                nuc_rad : float, optional
+                    An optional nuclear radius :math:`\\eta`, see ``v``
+
+        Returns:
+                indices : array of shape (K, 3)
+                    all multi-indices :math:`[n_x, n_y, n_z]`, sorted by their total order
+                values : array of shape (K, ...)
+                    the derivatives of all multi-indices at all positions
+
+        """
+        if int(order) != order or order < 0:
+            raise ValueError("Only non-negative integer orders are supported!")
+        indices = _multi_indices(int(order))
+        return indices, _coulomb_derivatives(self.mol, indices, r, nuc_rad)
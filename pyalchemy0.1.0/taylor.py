@@ -0,0 +1,289 @@
+"""
+A module which provides the derivatives of arbitrary potentials in 1D by
+Taylor-mode automatic differentiation, i.e. the arithmetic of truncated power series.
+
+A potential is written as a plain function ``v(x)`` of NumPy operations. Evaluated
+on a ``Taylor`` object instead of an array, every operation propagates the whole
+series, so all derivatives up to order K at all points follow from one evaluation
+at the cost of O(K^2) array operations per operation of ``v``.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import math
+
+import numpy as np
+
+
+def _coefficients(a, order, shape):
+    # the Taylor coefficients of a constant or a series, truncated to the given order
+    if isinstance(a, Taylor):
+        return a.c[:order+1]
+    c = np.zeros((order+1,) + shape)
+    c[0] = a
+    return c
+
+
+def _order(*inputs):
+    return min(a.order for a in inputs if isinstance(a, Taylor))
+
+
+def _shape(*inputs):
+    return np.broadcast_shapes(*[a.c.shape[1:] if isinstance(a, Taylor) else np.shape(a) for a in inputs])
+
+
+def _binary(a, b):
+    order, shape = _order(a, b), _shape(a, b)
+    return _coefficients(a, order, shape), _coefficients(b, order, shape)
+
+
+def _cauchy(a, b, n):
+    # coefficient n of the product of the series a and b
+    return sum(a[j]*b[n-j] for j in range(n+1))
+
+
+def _add(a, b):
+    a, b = _binary(a, b)
+    return Taylor(a + b)
+
+
+def _subtract(a, b):
+    a, b = _binary(a, b)
+    return Taylor(a - b)
+
+
+def _multiply(a, b):
+    a, b = _binary(a, b)
+    return Taylor(np.array([_cauchy(a, b, n) for n in range(len(a))]))
+
+
+def _divide(a, b):
+    a, b = _binary(a, b)
+    # a = b*q, solved for q term by term
+    q = np.zeros(np.broadcast_shapes(a.shape, b.shape))
+    for n in range(len(q)):
+        q[n] = (a[n] - sum(b[j]*q[n-j] for j in range(1, n+1)))/b[0]
+    return Taylor(q)
+
+
+def _power(a, b):
+    if isinstance(b, Taylor):
+        # a^b = exp(b log a)
+        if not isinstance(a, Taylor):
+            a = Taylor(_coefficients(a, b.order, _shape(a, b)))
+        return _exp(_multiply(b, _log(a)))
+    if isinstance(a, Taylor) and np.ndim(b) == 0 and float(b).is_integer() and b >= 0:
+        # repeated squaring, also valid where the series of a vanishes
+        result, base, m = 1.0, a, int(b)
+        while m:
+            if m & 1:
+                result = _multiply(base, result)
+            base = _multiply(base, base)
+            m >>= 1
+        return result if isinstance(result, Taylor) else Taylor(_coefficients(1.0, a.order, a.c.shape[1:]))
+    a = a.c
+    # b = a^alpha with n a_0 b_n = sum_j (alpha j - (n - j)) a_j b_(n-j)
+    p = np.zeros(np.broadcast_shapes(a.shape, np.shape(b)))
+    p[0] = a[0]**b
+    for n in range(1, len(a)):
+        p[n] = sum((b*j - (n - j))*a[j]*p[n-j] for j in range(1, n+1))/(n*a[0])
+    return Taylor(p)
+
+
+def _negative(a):
+    return Taylor(-a.c)
+
+
+def _square(a):
+    return _multiply(a, a)
+
+
+def _exp(a):
+    a = a.c
+    e = np.zeros(a.shape)
+    e[0] = np.exp(a[0])
+    for n in range(1, len(a)):
+        e[n] = sum(j*a[j]*e[n-j] for j in range(1, n+1))/n
+    return Taylor(e)
+
+
+def _log(a):
+    a = a.c
+    l = np.zeros(a.shape)
+    l[0] = np.log(a[0])
+    for n in range(1, len(a)):
+        l[n] = (a[n] - sum(j*l[j]*a[n-j] for j in range(1, n))/n)/a[0]
+    return Taylor(l)
+
+
+def _sqrt(a):
+    return _power(a, 0.5)
+
+
+def _sin_cos(a, sign):
+    # s' = c a', c' = sign s a'; sign = -1 for sin and cos, +1 for sinh and cosh
+    a = a.c
+    s, c = np.zeros(a.shape), np.zeros(a.shape)
+    s[0], c[0] = (np.sin(a[0]), np.cos(a[0])) if sign < 0 else (np.sinh(a[0]), np.cosh(a[0]))
+    for n in range(1, len(a)):
+        s[n] = sum(j*a[j]*c[n-j] for j in range(1, n+1))/n
+        c[n] = sign*sum(j*a[j]*s[n-j] for j in range(1, n+1))/n
+    return Taylor(s), Taylor(c)
+
+
+_UFUNCS = {
+    np.add: _add,
+    np.subtract: _subtract,
+    np.multiply: _multiply,
+    np.true_divide: _divide,
+    np.power: _power,
+    np.negative: _negative,
+    np.positive: lambda a: a,
+    np.square: _square,
+    np.exp: _exp,
+    np.log: _log,
+    np.sqrt: _sqrt,
+    np.sin: lambda a: _sin_cos(a, -1)[0],
+    np.cos: lambda a: _sin_cos(a, -1)[1],
+    np.sinh: lambda a: _sin_cos(a, 1)[0],
+    np.cosh: lambda a: _sin_cos(a, 1)[1],
+    np.tanh: lambda a: _divide(*_sin_cos(a, 1)),
+}
+
+
+class Taylor:
+    """
+    A truncated power series :math:`\\sum_{n=0}^K c_n (x - x_0)^n` at many points :math:`x_0` at once.
+    It supports the arithmetic operators and the NumPy functions ``exp``, ``log``, ``sqrt``, ``square``,
+    ``sin``, ``cos``, ``sinh``, ``cosh`` and ``tanh``; everything else raises a ``TypeError``.
+
+    Parameters:
+            c : array of shape (K+1, ...)
+                The Taylor coefficients :math:`c_n = v^{(n)}(x_0)/n!` at all points
+
+    Attributes:
+            c : array of shape (K+1, ...)
+                The Taylor coefficients
+            order : int
+                The order K of the series
+    """
+
+    def __init__(self, c):
+        self.c = np.asarray(c, dtype=float)
+        self.order = len(self.c) - 1
+
+    @classmethod
+    def variable(cls, x, order):
+        """
+        Return the series of the independent variable at the points ``x``, i.e. :math:`x_0 + (x - x_0)`.
+        """
+        x = np.asarray(x, dtype=float)
+        c = np.zeros((order+1,) + x.shape)
+        c[0] = x
+        if order > 0:
+            c[1] = 1
+        return cls(c)
+
+    def derivatives(self):
+        """
+        Return the derivatives :math:`v^{(n)}(x_0) = n! \\, c_n`, an array of shape (K+1, ...).
+        """
+        factorials = np.array([math.factorial(n) for n in range(self.order+1)], dtype=float)
+        return factorials.reshape((-1,) + (1,)*(self.c.ndim-1))*self.c
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs or ufunc not in _UFUNCS:
+            return NotImplemented
+        return _UFUNCS[ufunc](*inputs)
+
+    def __add__(self, other):
+        return np.add(self, other)
+
+    def __radd__(self, other):
+        return np.add(other, self)
+
+    def __sub__(self, other):
+        return np.subtract(self, other)
+
+    def __rsub__(self, other):
+        return np.subtract(other, self)
+
+    def __mul__(self, other):
+        return np.multiply(self, other)
+
+    def __rmul__(self, other):
+        return np.multiply(other, self)
+
+    def __truediv__(self, other):
+        return np.true_divide(self, other)
+
+    def __rtruediv__(self, other):
+        return np.true_divide(other, self)
+
+    def __pow__(self, other):
+        return np.power(self, other)
+
+    def __rpow__(self, other):
+        return np.power(other, self)
+
+    def __neg__(self):
+        return np.negative(self)
+
+    def __pos__(self):
+        return self
+
+
+def derivatives(v, x, order):
+    """
+    All derivatives of a potential up to a given order at many points in one evaluation.
+
+    Parameters:
+            v : callable
+                The potential, a function ``v(x)`` of arithmetic operators and the NumPy functions
+                supported by ``Taylor``
+            x : float or array
+                The points
+            order : int
+                The highest order K of the derivatives
+
+    Returns:
+            array of shape (K+1, ...)
+                :math:`v^{(k)}(x)` for k = 0, ..., K at all points
+    """
+    value = v(Taylor.variable(x, int(order)))
+    if not isinstance(value, Taylor):
+        # v does not depend on x
+        value = Taylor(_coefficients(value, int(order), np.broadcast_shapes(np.shape(x), np.shape(value))))
+    return value.derivatives()
+
+
+class TaylorPotential:
+    """
+    A potential whose derivatives are computed by Taylor-mode automatic differentiation, such that
+    it can be passed to the kernels as ``v_A`` or ``v_B`` without hand-coding ``v(k, x)``.
+
+    Parameters:
+            v : callable
+                The potential, a function ``v(x)`` of arithmetic operators and the NumPy functions
+                supported by ``Taylor``, e.g. ``lambda x: 0.5*x**2`` or ``lambda x: D*(1 - np.exp(-a*x))**2``
+
+    Attributes:
+            v : callable
+                The potential
+    """
+
+    def __init__(self, v):
+        self.v = v
+
+    def __call__(self, k, x):
+        """
+        Return the k-th derivative of the potential at x, i.e. the interface ``v(k, x)`` of the kernels.
+        """
+        return self.derivatives(k, x)[k][()]
+
+    def derivatives(self, order, x):
+        """
+        Return all derivatives up to the given order at all points x, an array of shape (order+1, ...).
+        """
+        return derivatives(self.v, x, order)
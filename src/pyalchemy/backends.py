@@ -0,0 +1,140 @@
+"""
+A module which provides the optional compiled backend of the hot loops of
+pyalchemy, i.e. the $\\lambda$-integration of the kernel at many positions
+and the Coulomb potential of molecules on grids.
+
+The backend 'numba' compiles these loops with ``numba.njit(parallel=True)``
+and distributes the positions over all threads. If numba is not installed,
+it falls back to the NumPy implementation with a ``RuntimeWarning``, such
+that scripts run unchanged everywhere.
+
+"""
+
+import warnings
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+BACKENDS = ('numpy', 'numba')
+
+
+def available():
+    """
+    Return the backends which can be used in this environment.
+    """
+    return BACKENDS if numba is not None else BACKENDS[:1]
+
+
+def resolve_backend(backend):
+    """
+    Return the backend which is actually used for ``backend``.
+
+    Parameters:
+            backend : str or None
+                'numpy' or 'numba'; ``None`` means 'numpy'
+
+    Returns:
+            str
+                'numba' if it was requested and numba is installed, 'numpy' otherwise; the fallback
+                of a requested 'numba' to 'numpy' issues a ``RuntimeWarning``
+
+    """
+    if backend is None:
+        return 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError("Backend '" + str(backend) + "' is not supported!")
+    if backend == 'numba' and numba is None:
+        warnings.warn("Backend 'numba' requested, but numba is not installed; falling back to 'numpy'",
+                      RuntimeWarning, stacklevel=3)
+        return 'numpy'
+    return backend
+
+
+def is_compiled(f):
+    """
+    Return ``True`` if ``f`` is a function compiled with ``numba.njit``, which the 'numba' backend
+    can call from compiled code.
+    """
+    return numba is not None and isinstance(f, numba.core.registry.CPUDispatcher)
+
+
+if numba is not None:
+    @numba.njit(parallel=True, error_model='numpy')
+    def _fixed_rule_sum(Delta_v, A_inv, offsets, weights, error_weights, X):
+        # sum over the nodes of a fixed rule of Delta_v(A_inv @ (x - b)), every position in its own thread
+        N, n = X.shape
+        integral = np.zeros(N)
+        error = np.zeros(N)
+        for j in numba.prange(N):
+            y = np.empty(n)
+            for i in range(len(weights)):
+                for k in range(n):
+                    s = 0.0
+                    for m in range(n):
+                        s += A_inv[i, k, m]*(X[j, m] - offsets[i, m])
+                    y[k] = s
+                value = Delta_v(y)
+                integral[j] += weights[i]*value
+                error[j] += error_weights[i]*value
+        return integral, error
+
+    @numba.njit(parallel=True, error_model='numpy')
+    def _coulomb_sum(mol, r):
+        # -sum_i Z_i/|r - R_i| at every position, every position in its own thread
+        v = np.empty(len(r))
+        for j in numba.prange(len(r)):
+            s = 0.0
+            for i in range(len(mol)):
+                s -= mol[i, 0]/np.sqrt((r[j, 0] - mol[i, 1])**2 + (r[j, 1] - mol[i, 2])**2 + (r[j, 2] - mol[i, 3])**2)
+            v[j] = s
+        return v
+
+
+def fixed_rule_sum(Delta_v, plan, X):
+    """
+    The $\\lambda$-integral of a fixed rule with the 'numba' backend.
+
+    Parameters:
+            Delta_v : callable compiled with ``numba.njit``
+                Takes a single nD position, an array of shape (n,), and returns a float
+            plan : TransformPlan
+                The transformations at the nodes of the rule
+            X : array of shape (N, n)
+                The nD positions
+
+    Returns:
+            integral : array of shape (N,)
+                The kernel at all positions
+            error : array of shape (N,)
+                The error estimates of the rule, NaN for the midpoint rule
+
+    """
+    error_weights = np.zeros(plan.steps) if plan.error_weights is None else plan.error_weights
+    integral, error = _fixed_rule_sum(Delta_v, plan.A_inv, plan.offsets, plan.weights, error_weights,
+                                      np.ascontiguousarray(X, dtype=float))
+    if plan.error_weights is None:
+        error = np.full(len(X), np.nan)
+    return integral, np.abs(error)
+
+
+def coulomb_sum(mol, r):
+    """
+    The Coulomb potential $-\\sum_i Z_i/|r - R_i|$ of a molecule with the 'numba' backend.
+
+    Parameters:
+            mol : array of shape (N_atoms, 4)
+                Nuclear charges and coordinates of all atoms
+            r : array of shape (M, 3)
+                The positions
+
+    Returns:
+            array of shape (M,)
+                the potential at all positions, ``-inf`` at the nuclei
+
+    """
+    return _coulomb_sum(np.ascontiguousarray(mol, dtype=float), np.ascontiguousarray(r, dtype=float))
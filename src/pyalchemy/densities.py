@@ -0,0 +1,215 @@
+"""
+A module which provides electron densities for the integrators, i.e. objects
+which are called with whole chunks of positions instead of single points.
+
+A density provider is any callable ``rho(points)`` which takes an array of
+shape (M, n) of positions and returns an array of shape (M,). ``DensityProvider``
+is the base class of the providers of pyalchemy; it splits large arrays of
+positions into chunks of ``chunk_size`` points. ``GaussianDensity`` evaluates
+the density of a contracted Gaussian basis and a density matrix, e.g. of a
+Hartree-Fock or DFT calculation, with all primitives of a shell at once and
+without the shells which vanish on a chunk.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .profiling import instrumented
+
+
+def cartesian_components(l):
+    """
+    Return the exponents (a, b, c) of the Cartesian components x^a y^b z^c of angular momentum l,
+    in the order of PySCF, i.e. xx, xy, xz, yy, yz, zz for l = 2.
+    """
+    return [(a, b, l - a - b) for a in range(l, -1, -1) for b in range(l - a, -1, -1)]
+
+
+def _double_factorial(n):
+    return math.prod(range(n, 0, -2)) if n > 0 else 1
+
+
+def _primitive_norm(l, alpha):
+    # normalization of the primitive x^l exp(-alpha r^2)
+    return (2*alpha/np.pi)**0.75*(4*alpha)**(l/2)/np.sqrt(_double_factorial(2*l - 1))
+
+
+class DensityProvider(ABC):
+    """
+    Abstract base class of the densities which are evaluated on chunks of positions. Subclasses implement
+    ``evaluate(points)``; calling the provider evaluates it on chunks of at most ``chunk_size`` points.
+
+    Parameters:
+            chunk_size : int, optional
+                The largest number of positions per evaluation, which bounds the memory of the intermediate arrays
+    """
+
+    def __init__(self, chunk_size=4096):
+        self.chunk_size = int(chunk_size)
+
+    @abstractmethod
+    def evaluate(self, points):
+        """
+        Return the density at an array of shape (M, n) of positions, an array of shape (M,).
+        """
+
+    def __call__(self, points):
+        points = np.asarray(points, dtype=float)
+        if points.ndim == 1:
+            points = points[None, :]
+        if len(points) <= self.chunk_size:
+            return self.evaluate(points)
+        return np.concatenate([self.evaluate(points[start:start + self.chunk_size])
+                               for start in range(0, len(points), self.chunk_size)])
+
+
+class GaussianDensity(DensityProvider):
+    """
+    The density $\\rho(x) = \\sum_{ij} D_{ij} \\chi_i(x) \\chi_j(x)$ of a basis of contracted Cartesian Gaussians
+
+        $\\chi(x) = N \\, x^a y^b z^c \\sum_p c_p N_p \\exp(-\\alpha_p |x - R|^2)$
+
+    with the primitives normalized by $N_p$ and every contracted function normalized by $N$. The functions
+    are ordered shell by shell and within a shell like ``cartesian_components(l)``.
+
+    Parameters:
+            shells : list of tuples (l, center, exponents, coefficients)
+                The shells: their angular momentum, the position of their center, and the exponents
+                and contraction coefficients of their primitives
+            dm : array of shape (N_ao, N_ao)
+                The density matrix in this basis
+            cutoff : float, optional
+                Basis functions are set to zero where their magnitude is certainly below ``cutoff``
+            chunk_size : int, optional
+                The largest number of positions per evaluation. Default is given by ``max_memory``
+            max_memory : int, optional
+                Upper bound in bytes of the intermediate arrays
+
+    Attributes:
+            n_ao : int
+                The number of basis functions
+            radii : array of shape (N_shells,)
+                The distance beyond which the functions of every shell are below ``cutoff``
+    """
+
+    def __init__(self, shells, dm, cutoff=1e-12, chunk_size=None, max_memory=2**27):
+        self.shells = [(int(l), np.asarray(center, dtype=float), np.atleast_1d(np.asarray(exponents, dtype=float)),
+                        np.atleast_1d(np.asarray(coefficients, dtype=float))) for l, center, exponents, coefficients in shells]
+        self.dm = np.asarray(dm, dtype=float)
+        self.cutoff = float(cutoff)
+        # offsets of the shells in the basis, and the normalized coefficients of every component
+        self._offsets = np.cumsum([0] + [len(cartesian_components(l)) for l, *_ in self.shells])
+        self.n_ao = int(self._offsets[-1])
+        if self.dm.shape != (self.n_ao, self.n_ao):
+            raise ValueError("The density matrix must be of shape (" + str(self.n_ao) + ", " + str(self.n_ao) + ")!")
+        self._coefficients = [self._normalize(*shell) for shell in self.shells]
+        self.radii = np.array([self._radius(shell, c) for shell, c in zip(self.shells, self._coefficients)])
+        if chunk_size is None:
+            # the basis functions at every position, and their product with the density matrix
+            chunk_size = max(1, int(max_memory//(8*(2*self.n_ao + len(self.shells) + 4))))
+        super().__init__(chunk_size)
+
+    @staticmethod
+    def _normalize(l, center, exponents, coefficients):
+        # coefficients of the primitives per component, shape (n_components, n_primitives)
+        c = coefficients*_primitive_norm(l, exponents)
+        gamma = exponents[:, None] + exponents[None, :]
+        rows = []
+        for component in cartesian_components(l):
+            # overlap of the contracted function with itself, a product of one-dimensional integrals
+            overlap = np.sqrt(np.pi/gamma)**3
+            for k in component:
+                overlap = overlap*_double_factorial(2*k - 1)/(2*gamma)**k
+            rows.append(c/np.sqrt(c @ overlap @ c))
+        return np.array(rows)
+
+    def _radius(self, shell, c):
+        # |chi| <= r^l sum_p |c_p| exp(-alpha_p r^2); the largest r where this bound reaches the cutoff
+        l, _, exponents, _ = shell
+        r = np.linspace(0, np.sqrt(-np.log(self.cutoff/1e3)/exponents.min()) + 1, 2000)
+        bound = r[:, None]**l*np.exp(-np.outer(r**2, exponents)) @ np.abs(c).max(axis=0)
+        above = np.nonzero(bound >= self.cutoff)[0]
+        return r[min(above[-1] + 1, len(r) - 1)] if len(above) else 0.0
+
+    @classmethod
+    def load(cls, filename, **kwargs):
+        """
+        Read a basis and a density matrix from an ``.npz`` file written by ``save``, i.e. with the arrays
+        ``l``, ``centers`` and ``n_primitives`` of shape (N_shells,), (N_shells, 3) and (N_shells,),
+        ``exponents`` and ``coefficients`` of all primitives, shell by shell, and ``dm``.
+        """
+        with np.load(filename) as data:
+            ends = np.cumsum(data['n_primitives'])
+            starts = ends - data['n_primitives']
+            shells = [(l, center, data['exponents'][start:end], data['coefficients'][start:end])
+                      for l, center, start, end in zip(data['l'], data['centers'], starts, ends)]
+            return cls(shells, data['dm'], **kwargs)
+
+    def save(self, filename):
+        """
+        Write the basis and the density matrix to an ``.npz`` file which can be read by ``load``.
+        """
+        np.savez(filename, l=np.array([l for l, *_ in self.shells]),
+                 centers=np.array([center for _, center, *_ in self.shells]).reshape(-1, 3),
+                 n_primitives=np.array([len(exponents) for _, _, exponents, _ in self.shells]),
+                 exponents=np.concatenate([exponents for _, _, exponents, _ in self.shells]),
+                 coefficients=np.concatenate([coefficients for *_, coefficients in self.shells]), dm=self.dm)
+
+    @classmethod
+    def from_pyscf(cls, mol, dm, **kwargs):
+        """
+        The density of a PySCF molecule ``mol`` and its (spin-summed) density matrix ``dm``, in the
+        spherical or Cartesian basis of ``mol``; the density matrix is transformed to the normalized
+        Cartesian functions of this class. Requires PySCF.
+        """
+        shells = []
+        for shell in range(mol.nbas):
+            l, center, exponents = mol.bas_angular(shell), mol.bas_coord(shell), mol.bas_exp(shell)
+            # every contraction of a shell is a shell of its own, in the order of PySCF
+            for coefficients in np.asarray(mol.bas_ctr_coeff(shell)).T:
+                shells.append((l, center, exponents, coefficients))
+        dm = np.asarray(dm, dtype=float)
+        if dm.ndim == 3:
+            dm = dm.sum(axis=0)
+        if not mol.cart:
+            c2s = mol.cart2sph_coeff()
+            dm = c2s @ dm @ c2s.T
+        # the Cartesian functions of PySCF are multiples of the normalized ones
+        scale = np.sqrt(np.diag(mol.intor('int1e_ovlp_cart')))
+        return cls(shells, scale[:, None]*dm*scale[None, :], **kwargs)
+
+    def orbitals(self, points):
+        """
+        Return the values of all basis functions at an array of shape (M, 3) of positions, an array of
+        shape (M, N_ao); functions are zero beyond the radii of their shells.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        values = np.zeros((len(points), self.n_ao))
+        for (l, center, exponents, _), c, radius, offset in zip(self.shells, self._coefficients, self.radii, self._offsets):
+            d = points - center
+            r_2 = np.einsum('ij,ij->i', d, d)
+            # shell screening: only the positions within the radius of the shell
+            inside = np.nonzero(r_2 <= radius**2)[0]
+            if len(inside) == 0:
+                continue
+            d, radial = d[inside], np.exp(-np.outer(r_2[inside], exponents))
+            for k, (a, b, e) in enumerate(cartesian_components(l)):
+                values[inside, offset + k] = d[:, 0]**a*d[:, 1]**b*d[:, 2]**e*(radial @ c[k])
+        return values
+
+    @instrumented
+    def evaluate(self, points):
+        values = self.orbitals(points)
+        # only the functions which do not vanish on the whole chunk
+        active = np.nonzero(np.any(values != 0, axis=0))[0]
+        if len(active) < self.n_ao:
+            values = values[:, active]
+            dm = self.dm[np.ix_(active, active)]
+        else:
+            dm = self.dm
+        return np.einsum('ij,ij->i', values @ dm, values)
@@ -0,0 +1,312 @@
+"""
+A module which provides atom-centred integration grids of molecules, i.e.
+radial x Lebedev grids around every nucleus whose weights are partitioned
+between the atoms with Becke's fuzzy cells.
+
+Grids only depend on the geometry, the nuclear charges and the level, so they
+are cached in memory and on disk, keyed by these. Screening jobs which share a
+reference molecule build its grid once.
+
+For spherically symmetric (one atom) and axially symmetric (linear) molecules,
+``reduced_grid`` integrates the angles analytically, i.e. it provides a radial
+or a two-dimensional grid of positions in 3D whose weights include 4 pi r^2 or
+2 pi r^2 sin(theta), which the integrators use like any other grid.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+from scipy.special import roots_legendre
+
+try:
+    from scipy.integrate import lebedev_rule
+except ImportError:
+    lebedev_rule = None
+
+
+# Number of radial points per level (rows) and period of the element (columns: H-He, Li-Ne, Na-Ar,
+# K-Kr, Rb-Xe, Cs-Rn and beyond)
+RADIAL_POINTS = np.array([[10, 15, 20, 30, 35, 40],
+                          [30, 40, 50, 60, 65, 70],
+                          [40, 60, 65, 75, 80, 85],
+                          [50, 75, 80, 90, 95, 100],
+                          [60, 90, 95, 105, 110, 115],
+                          [70, 105, 110, 120, 125, 130],
+                          [80, 120, 125, 135, 140, 145],
+                          [90, 135, 140, 150, 155, 160],
+                          [100, 150, 155, 165, 170, 175],
+                          [200, 200, 200, 200, 200, 200]])
+# Degree of the Lebedev rule per level, i.e. 50, 110, 194, 302, 434, 590, 770, 974, 1202 and 1454 points
+ANGULAR_DEGREES = (11, 17, 23, 29, 35, 41, 47, 53, 59, 65)
+# Version of the construction; part of the keys of the cache
+_version = 1
+# Grids of this process, keyed like the files on disk, and the largest number of them kept;
+# the least recently used grid is dropped first
+_memory = OrderedDict()
+_memory_size = 8
+
+
+def _period(Z):
+    return int(np.searchsorted([2, 10, 18, 36, 54], Z))
+
+
+def _angular(degree):
+    # unit vectors of shape (N, 3) and weights summing to 4 pi, exact for spherical harmonics up to degree
+    if lebedev_rule is not None:
+        points, weights = lebedev_rule(degree)
+        return points.T, weights
+    # product of Gauss-Legendre in cos(theta) and the trapezoidal rule in phi
+    cos_theta, w_theta = roots_legendre(degree//2 + 1)
+    phi = 2*np.pi*np.arange(degree + 1)/(degree + 1)
+    sin_theta = np.sqrt(1 - cos_theta**2)
+    points = np.stack([np.outer(sin_theta, np.cos(phi)), np.outer(sin_theta, np.sin(phi)),
+                       np.outer(cos_theta, np.ones_like(phi))], axis=-1).reshape(-1, 3)
+    return points, np.outer(w_theta, np.full(len(phi), 2*np.pi/len(phi))).ravel()
+
+
+def _radial(Z, n):
+    # Mura-Knowles (log3) grid, r = -alpha ln(1 - x^3) with the midpoint rule in x; weights include r^2
+    alpha = 7.0 if Z in (3, 4, 11, 12, 19, 20, 37, 38, 55, 56, 87, 88) else 5.0
+    x = (np.arange(n) + 0.5)/n
+    r = -alpha*np.log(1 - x**3)
+    return r, 3*alpha*x**2/(1 - x**3)*r**2/n
+
+
+def atomic_grid(Z, level=3):
+    """
+    The grid of a single atom at the origin.
+
+    Parameters:
+            Z : float
+                The nuclear charge, which determines the number of radial points and their extent
+            level : int, optional
+                The size of the grid, from 0 (coarsest) to 9 (finest). Default is 3
+
+    Returns:
+            tuple (points, weights)
+                arrays of shape (N, 3) and (N,)
+    """
+    if int(level) != level or not 0 <= level < len(ANGULAR_DEGREES):
+        raise ValueError("Only the levels 0, ..., " + str(len(ANGULAR_DEGREES) - 1) + " are supported!")
+    level = int(level)
+    r, w_r = _radial(round(Z), RADIAL_POINTS[level, _period(round(Z))])
+    directions, w_angular = _angular(ANGULAR_DEGREES[level])
+    points = (r[:, None, None]*directions).reshape(-1, 3)
+    return points, np.outer(w_r, w_angular).ravel()
+
+
+def becke_weights(mol, points, atom):
+    """
+    The share of ``atom`` at ``points`` of Becke's partition of unity, with three iterations of the
+    switching function and without size adjustments.
+
+    Parameters:
+            mol : array of shape (N_atoms, 4)
+                The molecule, i.e. ``[[Z_1, x_1, y_1, z_1], ...]``
+            points : array of shape (N, 3)
+                The positions
+            atom : int
+                The index of the atom
+
+    Returns:
+            array of shape (N,)
+                the weights in [0, 1]; summed over all atoms they are 1
+    """
+    R = np.asarray(mol, dtype=float).reshape(-1, 4)[:, 1:]
+    if len(R) == 1:
+        return np.ones(len(points))
+    # distances of all positions to all atoms, and the distances between the atoms
+    distances = np.linalg.norm(np.asarray(points, dtype=float)[:, None, :] - R, axis=-1)
+    separations = np.linalg.norm(R[:, None, :] - R, axis=-1)
+    np.fill_diagonal(separations, np.inf)
+    # cell functions P_i = prod_(j != i) s(mu_ij), mu_ij = (r_i - r_j)/R_ij
+    mu = (distances[:, :, None] - distances[:, None, :])/separations
+    for _ in range(3):
+        mu = 1.5*mu - 0.5*mu**3
+    cells = np.prod(0.5*(1 - mu), axis=2)
+    total = cells.sum(axis=1)
+    return np.divide(cells[:, atom], total, out=np.zeros(len(points)), where=total > 0)
+
+
+def _build(mol, level, max_memory):
+    points, weights = [], []
+    for atom, (Z, *R) in enumerate(mol):
+        local, local_weights = atomic_grid(Z, level)
+        local = local + R
+        # chunks of positions, such that the intermediate array of all pairs of atoms fits into max_memory
+        chunk_size = max(1, int(max_memory//(8*len(mol)**2)))
+        share = np.concatenate([becke_weights(mol, local[start:start + chunk_size], atom)
+                                for start in range(0, len(local), chunk_size)])
+        keep = share*local_weights > 0
+        points.append(local[keep])
+        weights.append((share*local_weights)[keep])
+    return np.ascontiguousarray(np.concatenate(points)), np.ascontiguousarray(np.concatenate(weights))
+
+
+def cache_dir():
+    """
+    Return the directory of the grids on disk: ``$PYALCHEMY_GRID_CACHE`` if set, otherwise
+    ``~/.cache/pyalchemy/grids``.
+    """
+    return os.environ.get('PYALCHEMY_GRID_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'pyalchemy', 'grids'))
+
+
+def molecular_grid(mol, level=3, cache=True, directory=None, max_memory=2**27):
+    """
+    The integration grid of a molecule: radial x Lebedev grids around all nuclei, partitioned with Becke's
+    fuzzy cells. If ``cache``, the grid is cached in memory (the last ``_memory_size`` grids) and on disk,
+    keyed by the exact charges, coordinates and level, so it is built once for any number of jobs with the
+    same molecule. A file of the cache which cannot be read is built and written again.
+
+    Parameters:
+            mol : Coulomb_3D or array of shape (N_atoms, 4)
+                The molecule, i.e. ``[[Z_1, x_1, y_1, z_1], [Z_2, x_2, y_2, z_2], ...]``
+            level : int, optional
+                The size of the grid, from 0 (coarsest) to 9 (finest). Default is 3
+            cache : bool, optional
+                Whether to read and write the grid in memory and on disk. Default is ``True``
+            directory : str, optional
+                The directory of the cache on disk; default is ``cache_dir()``
+            max_memory : int, optional
+                Upper bound in bytes of the intermediate arrays of the partition
+
+    Returns:
+            tuple (points, weights)
+                read-only, contiguous arrays of shape (N, 3) and (N,)
+    """
+    mol = np.ascontiguousarray(getattr(mol, 'mol', mol), dtype=float).reshape(-1, 4)
+    if int(level) != level or not 0 <= level < len(ANGULAR_DEGREES):
+        raise ValueError("Only the levels 0, ..., " + str(len(ANGULAR_DEGREES) - 1) + " are supported!")
+    key = hashlib.sha256(mol.tobytes() + bytes([int(level), _version, lebedev_rule is None])).hexdigest()
+    if cache and key in _memory:
+        _memory.move_to_end(key)
+        return _memory[key]
+    grid = None
+    path = os.path.join(directory or cache_dir(), key + '.npz')
+    if cache and os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                if np.array_equal(data['mol'], mol):
+                    grid = data['points'], data['weights']
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # e.g. truncated by a full disk; it is replaced below
+            grid = None
+    if grid is None:
+        grid = _build(mol, int(level), max_memory)
+        if cache:
+            # write to a temporary file first, so that concurrent jobs never read a partial grid
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.npz')
+            with os.fdopen(handle, 'wb') as file:
+                np.savez(file, mol=mol, points=grid[0], weights=grid[1])
+            # mkstemp creates the file for the owner only; grids are shared with other users
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+    for array in grid:
+        array.setflags(write=False)
+    if cache:
+        _memory[key] = grid
+        while len(_memory) > _memory_size:
+            _memory.popitem(last=False)
+    return grid
+
+
+def detect_symmetry(*mols, tol=1e-8):
+    """
+    The symmetry of the potentials of molecules which share it, e.g. an initial molecule and its mutations.
+
+    Parameters:
+            *mols : Coulomb_3D or arrays of shape (N_atoms, 4)
+                The molecules, i.e. ``[[Z_1, x_1, y_1, z_1], ...]``
+            tol : float, optional
+                The largest distance in bohr of an atom from the center or the axis
+
+    Returns:
+            tuple (kind, center, axis)
+                'spherical' if all nuclei are at one position, 'axial' if they are on one line with ``axis``
+                its unit vector, otherwise None
+    """
+    R = np.concatenate([np.asarray(getattr(mol, 'mol', mol), dtype=float).reshape(-1, 4)[:, 1:] for mol in mols])
+    center = R.mean(axis=0)
+    if np.all(np.linalg.norm(R - center, axis=1) <= tol):
+        return 'spherical', center, None
+    axis = np.linalg.svd(R - center)[2][0]
+    # distances of the nuclei from the line through the center along the axis
+    if np.all(np.linalg.norm(np.cross(R - center, axis), axis=1) <= tol):
+        return 'axial', center, axis
+    return None, center, None
+
+
+def reduced_grid(mol, level=3, symmetry='auto', others=()):
+    """
+    The integration grid of a molecule with the angles of its symmetry integrated analytically: for one atom
+    the radial grid along the z-axis with the weights $4 \\pi r^2 w_r$, for linear molecules the radial x
+    Gauss-Legendre grids in $\\cos \\theta$ around all nuclei in a half-plane through the axis, partitioned with
+    Becke's fuzzy cells, with the weights $2 \\pi r^2 w_r w_\\theta$. Without symmetry, it is ``molecular_grid``.
+
+    The reduction is exact if the density and the kernel share the symmetry, i.e. the density of the initial
+    system, all final systems (see ``others``) and the affine transformation of the kernel.
+
+    Parameters:
+            mol : Coulomb_3D or array of shape (N_atoms, 4)
+                The molecule, i.e. ``[[Z_1, x_1, y_1, z_1], ...]``
+            level : int, optional
+                The size of the grid, as in ``molecular_grid``. Default is 3
+            symmetry : str, optional
+                'auto' (default) to detect the symmetry of the nuclei, or 'spherical', 'axial' or 'none';
+                a symmetry which the nuclei do not have raises a ``ValueError``
+            others : list, optional
+                Further molecules which must share the symmetry, e.g. the final systems; for one atom, the
+                radial grid has the most points and the widest extent of those of all nuclear charges of both
+
+    Returns:
+            tuple (points, weights)
+                contiguous arrays of shape (N, 3) and (N,)
+    """
+    mol = np.asarray(getattr(mol, 'mol', mol), dtype=float).reshape(-1, 4)
+    if int(level) != level or not 0 <= level < len(ANGULAR_DEGREES):
+        raise ValueError("Only the levels 0, ..., " + str(len(ANGULAR_DEGREES) - 1) + " are supported!")
+    level = int(level)
+    if symmetry not in ('auto', 'spherical', 'axial', 'none'):
+        raise ValueError("Symmetry '" + str(symmetry) + "' is not supported!")
+    kind, center, axis = detect_symmetry(mol, *others)
+    if symmetry == 'none' or (symmetry == 'auto' and kind is None):
+        return molecular_grid(mol, level)
+    if symmetry != 'auto' and symmetry != kind and not (symmetry == 'axial' and kind == 'spherical'):
+        raise ValueError("The nuclei are not " + symmetry + "ly symmetric!")
+    kind = kind if symmetry == 'auto' else symmetry
+
+    if kind == 'spherical':
+        # all nuclei are at the center: the most radial points and the widest extent of any of them
+        nuclei = np.concatenate([np.asarray(getattr(other, 'mol', other), dtype=float).reshape(-1, 4) for other in others]
+                                + [mol])
+        charges = {round(Z) for Z in nuclei[:, 0]}
+        n = max(RADIAL_POINTS[level, _period(Z)] for Z in charges)
+        r, w_r = max((_radial(Z, n) for Z in charges), key=lambda grid: grid[0][-1])
+        points = center + r[:, None]*np.array([0.0, 0.0, 1.0])
+        return np.ascontiguousarray(points), np.ascontiguousarray(4*np.pi*w_r)
+
+    if axis is None:
+        axis = np.array([0.0, 0.0, 1.0])
+    # a unit vector perpendicular to the axis, which spans the half-plane with it
+    perpendicular = np.cross(axis, np.eye(3)[np.argmin(np.abs(axis))])
+    perpendicular /= np.linalg.norm(perpendicular)
+    cos_theta, w_theta = roots_legendre(ANGULAR_DEGREES[level]//2 + 1)
+    directions = np.outer(cos_theta, axis) + np.outer(np.sqrt(1 - cos_theta**2), perpendicular)
+    points, weights = [], []
+    for atom, (Z, *R) in enumerate(mol):
+        r, w_r = _radial(round(Z), RADIAL_POINTS[level, _period(round(Z))])
+        local = (R + r[:, None, None]*directions).reshape(-1, 3)
+        local_weights = 2*np.pi*np.outer(w_r, w_theta).ravel()*becke_weights(mol, local, atom)
+        keep = local_weights > 0
+        points.append(local[keep])
+        weights.append(local_weights[keep])
+    return np.ascontiguousarray(np.concatenate(points)), np.ascontiguousarray(np.concatenate(weights))
+
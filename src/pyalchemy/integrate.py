@@ -0,0 +1,234 @@
+"""
+A module which provides the integration of the energy difference of the
+Alchemical Integral Transform (AIT) over a grid,
+
+    E_B - E_A = sum_i w_i rho_A(x_i) K(x_i)
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import math
+import mmap
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .profiling import span
+
+
+# The contexts of the calls of delta_E in a worker process, keyed by a token per call; every context holds
+# the arrays of the grid, rho and the kernel. Calls in the calling process pass their context directly.
+_contexts = {}
+
+
+def _share(array):
+    # copy an array into a new block of shared memory
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block
+
+
+def _file(array):
+    # (filename, offset) of an array which is a contiguous view into a memory-mapped file, else None
+    root = array
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    if not (isinstance(root, np.memmap) and isinstance(root.base, mmap.mmap) and array.flags.c_contiguous):
+        return None
+    return root.filename, root.offset + array.ctypes.data - root.ctypes.data
+
+
+def _attach(token, specs, rho, kernel):
+    # initializer of the worker processes: map the shared arrays and files of one call without copying
+    context = {'blocks': [], 'rho': rho, 'kernel': kernel}
+    for name, (block_name, shape, dtype) in specs.items():
+        if isinstance(block_name, tuple):
+            filename, offset = block_name
+            context[name] = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape)
+            continue
+        block = shared_memory.SharedMemory(name=block_name)
+        context['blocks'].append(block)
+        context[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _contexts[token] = context
+
+
+def _chunk_sum(context, start, stop):
+    # pairwise summation (np.sum) of the contributions of one chunk
+    points = context['points'][start:stop]
+    with span('rho', points=stop - start):
+        rho = context['rho_values'][start:stop] if 'rho_values' in context else context['rho'](points)
+    K = context['kernel'](points)
+    with span('reduction', points=stop - start):
+        return float(np.sum(context['weights'][start:stop]*rho*K))
+
+
+def _worker_sum(token, start, stop):
+    return _chunk_sum(_contexts[token], start, stop)
+
+
+def delta_E(rho, kernel, grid_points, weights, workers=None, chunk_size=4096):
+    """
+    The energy difference $E_B - E_A = \\int dx \\, \\rho_A(x) \\, K(x)$ on a grid.
+
+    The grid is split into chunks which are distributed over a pool of processes; the grid is
+    placed in shared memory so the workers do not copy it; arrays which are memory-mapped files,
+    e.g. of a ``pyalchemy.store.Reference``, are mapped by the workers directly. Every chunk is summed pairwise
+    and the chunks are added exactly (``math.fsum``), so the result does not depend on the
+    number of workers.
+
+    Parameters:
+            rho : callable or array of shape (N,)
+                The electron density of the initial system. Either a callable which takes an
+                array of shape (M, n) of positions and returns an array of shape (M,), e.g. a
+                ``pyalchemy.densities.DensityProvider``, or its values at all grid points
+            kernel : callable
+                The kernel of AIT; takes an array of shape (M, n) of positions and returns an array of
+                shape (M,), e.g. ``functools.partial(kernel_nD_batch, Delta_v, A=A, b=b)``.
+                For ``workers > 1``, ``rho`` and ``kernel`` must be picklable, i.e. defined at module level
+            grid_points : array of shape (N, n)
+                The positions of the grid
+            weights : array of shape (N,)
+                The integration weights of the grid
+            workers : int, optional
+                Number of processes. Default is the number of CPUs; 1 integrates in this process
+            chunk_size : int, optional
+                Number of grid points per task
+
+    Returns:
+            float
+                the energy difference $E_B - E_A$
+
+    """
+    grid_points = np.ascontiguousarray(grid_points, dtype=float)
+    if grid_points.ndim == 1:
+        grid_points = grid_points[:, None]
+    weights = np.ascontiguousarray(weights, dtype=float)
+    if len(weights) != len(grid_points):
+        raise ValueError("The number of weights does not match the number of grid points!")
+    arrays = {'points': grid_points, 'weights': weights}
+    if not callable(rho):
+        arrays['rho_values'] = np.ascontiguousarray(rho, dtype=float)
+        if len(arrays['rho_values']) != len(grid_points):
+            raise ValueError("The number of density values does not match the number of grid points!")
+        rho = None
+    chunks = [(start, min(start + chunk_size, len(grid_points))) for start in range(0, len(grid_points), chunk_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(int(workers), len(chunks)))
+
+    if workers == 1:
+        context = {'rho': rho, 'kernel': kernel, **arrays}
+        with span('delta_E', points=len(grid_points)):
+            return math.fsum(_chunk_sum(context, start, stop) for start, stop in chunks)
+
+    files = {name: _file(array) for name, array in arrays.items()}
+    blocks = {name: _share(array) for name, array in arrays.items() if files[name] is None}
+    try:
+        specs = {name: (files[name] or blocks[name].name, array.shape, array.dtype) for name, array in arrays.items()}
+        token = uuid.uuid4().hex
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(token, specs, rho, kernel)) as pool:
+            starts, stops = zip(*chunks)
+            with span('delta_E', points=len(grid_points), workers=workers):
+                return math.fsum(pool.map(partial(_worker_sum, token), starts, stops))
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+def screen_grid(grid_points, weights, rho, tol, bound=None, cell=None, chunk_size=4096):
+    """
+    Remove the grid points whose total contribution to $E_B - E_A$ is provably below ``tol``.
+
+    The kernel is an average of $\\Delta v$ over the path of the affine transformation, so every point
+    contributes at most $|w_i \\rho_A(x_i)| \\, B(x_i)$ with an upper bound $B \\geq |\\Delta v|$ on that path.
+    The points are ranked by this bound and the smallest ones are dropped as long as their sum stays
+    below ``tol``. With ``cell``, the dropped points are coarsened instead: the points of every cubic cell
+    are replaced by one point at their centroid which carries their total $w \\rho_A$. The selection uses
+    half of ``tol`` and the centroids the other half; cells whose centroids would exceed it keep their points.
+
+    Parameters:
+            grid_points : array of shape (N, n)
+                The positions of the grid
+            weights : array of shape (N,)
+                The integration weights of the grid
+            rho : callable or array of shape (N,)
+                The electron density of the initial system, a callable which takes an array of shape (M, n)
+                of positions or its values at all grid points
+            tol : float
+                The largest error of the energy difference in Hartree, or of the number of electrons with
+                ``bound=1``
+            bound : float or callable
+                An upper bound of $|\\Delta v|$; a number, or a callable which takes an array of shape (M, n)
+                of positions, e.g. ``pyalchemy.screening.coulomb_bound(mol, Delta_Z)``. It is required, since
+                the error bound only holds for a true bound; ``bound=1`` explicitly screens the number of electrons
+            cell : float, optional
+                The edge length of the cells in which dropped points are coarsened. Default is to drop them
+            chunk_size : int, optional
+                Number of grid points per evaluation of ``rho`` and ``bound``
+
+    Returns:
+            tuple (grid_points, weights, rho_values, report)
+                the remaining points, their weights and density values, to be passed to ``delta_E()``, and
+                a dictionary with the number of ``points`` before, the number of points ``kept``, of
+                ``coarse`` points and of ``dropped`` points, the ``discarded_mass`` $\\sum |w \\rho_A|$ of the
+                dropped points (with ``cell``, the mass moved into the coarse points) and the ``error_bound``
+                of the energy difference
+
+    """
+    if bound is None:
+        raise ValueError("An upper bound of |Delta v| is required, e.g. pyalchemy.screening.coulomb_bound(mol, Delta_Z),"
+                         " or bound=1 to screen the number of electrons!")
+    grid_points = np.asarray(grid_points, dtype=float)
+    if grid_points.ndim == 1:
+        grid_points = grid_points[:, None]
+    weights = np.asarray(weights, dtype=float)
+
+    def evaluate(f, X):
+        return np.concatenate([np.broadcast_to(f(X[start:start + chunk_size]), (len(X[start:start + chunk_size]),))
+                               for start in range(0, len(X), chunk_size)]) if len(X) else np.zeros(0)
+
+    rho_values = evaluate(rho, grid_points) if callable(rho) else np.asarray(rho, dtype=float)
+    mass = np.abs(weights*rho_values)
+    contributions = mass*(evaluate(bound, grid_points) if callable(bound) else bound)
+    # coarse points may contribute as much as the points they replace, so they get half of the tolerance
+    order = np.argsort(contributions, kind='stable')
+    n_dropped = int(np.searchsorted(np.cumsum(contributions[order]), tol if cell is None else tol/2, side='right'))
+    dropped = np.zeros(len(weights), dtype=bool)
+    dropped[order[:n_dropped]] = True
+    report = {'points': len(weights), 'kept': len(weights) - n_dropped, 'coarse': 0, 'dropped': n_dropped,
+              'discarded_mass': float(np.sum(mass[dropped])), 'error_bound': float(np.sum(contributions[dropped]))}
+    if cell is None or n_dropped == 0:
+        return grid_points[~dropped], weights[~dropped], rho_values[~dropped], report
+
+    # one point per cell at the centroid of |w rho|; its weight is the total w rho of the cell and its density 1
+    dropped_indices = np.nonzero(dropped)[0]
+    X, w_rho, m = grid_points[dropped_indices], (weights*rho_values)[dropped_indices], mass[dropped_indices]
+    _, cells = np.unique(np.floor(X/cell), axis=0, return_inverse=True)
+    cells = cells.ravel()
+    total = np.bincount(cells, weights=m)
+    occupied = np.nonzero(total > 0)[0]
+    centroids = np.column_stack([np.bincount(cells, weights=m*X[:, d]) for d in range(X.shape[1])])[occupied]
+    centroids /= total[occupied, None]
+    coarse_weights = np.bincount(cells, weights=w_rho)[occupied]
+    coarse_bound = np.abs(coarse_weights)*(evaluate(bound, centroids) if callable(bound) else bound)
+    # the cells with the largest bounds of their centroids keep their points until the rest is within tol/2
+    order = np.argsort(coarse_bound, kind='stable')
+    n_coarse = int(np.searchsorted(np.cumsum(coarse_bound[order]), tol/2, side='right'))
+    restored = np.zeros(len(total), dtype=bool)
+    restored[occupied[order[n_coarse:]]] = True
+    dropped[dropped_indices[restored[cells]]] = False
+    coarse = np.sort(order[:n_coarse])
+    centroids, coarse_weights = centroids[coarse], coarse_weights[coarse]
+    report.update({'kept': int(np.sum(~dropped)), 'coarse': len(centroids), 'dropped': int(np.sum(dropped)),
+                   'discarded_mass': float(np.sum(mass[dropped])),
+                   'error_bound': float(np.sum(contributions[dropped]) + np.sum(coarse_bound[coarse]))})
+    return (np.concatenate([grid_points[~dropped], centroids]), np.concatenate([weights[~dropped], coarse_weights]),
+            np.concatenate([rho_values[~dropped], np.ones(len(centroids))]), report)
+
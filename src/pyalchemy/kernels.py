@@ -6,10 +6,165 @@ Throughout this code, Hartree atomic units are used.
 
 """
 
+from functools import lru_cache
+
 import numpy as np
 
+from .backends import fixed_rule_sum, is_compiled, resolve_backend
+from .profiling import is_enabled, span
+from .quadrature import FIXED_RULES, adaptive, fixed_rule, get_quadrature
+
+
+def _transform(A_inv, offset, X):
+    # stacked matrix-vector products, i.e. A_inv @ (x - b) for every point
+    return np.matmul(A_inv, (np.asarray(X, dtype=float) - offset)[..., None])[..., 0]
+
+
+class TransformPlan:
+    """
+    The affine transformations $x \\rightarrow A(\\lambda)^{-1} (x - b(\\lambda))$ at all nodes of a fixed
+    quadrature rule of the $\\lambda$-integration. Since they do not depend on the position, they are computed
+    once and can be reused for any number of positions and any number of potential differences.
+
+    Parameters:
+            A : callable
+                Must return and invertible matrix of size n x n
+            b : callable
+                Must return a vector of size n
+            rtol : float, optional
+                The relative tolerance of the kernel. It determines the number of steps used
+                in the midpoint rule of the $\\lambda$-integration
+            rule : str, optional
+                The fixed quadrature rule, 'midpoint' (default) or 'gauss-legendre'
+            order : int, optional
+                The number of nodes of the Gauss-Legendre rule
+
+    Attributes:
+            steps : int
+                Number of nodes of the rule
+            lambdas : array of shape (steps,)
+                The nodes of the rule
+            weights : array of shape (steps,)
+                The weights of the rule
+            error_weights : array of shape (steps,) or None
+                The weights of the embedded error estimate, ``None`` for the midpoint rule
+            A_inv : array of shape (steps, n, n)
+                The inverses of $A(\\lambda)$ at all nodes
+            offsets : array of shape (steps, n)
+                The vectors $b(\\lambda)$ at all nodes
+    """
+
+    def __init__(self, A, b, rtol=1e-6, rule='midpoint', order=None):
+        self.lambdas, self.weights, self.error_weights = fixed_rule(rule, rtol, order)
+        self.steps = len(self.lambdas)
+        with span('transform setup', steps=self.steps):
+            self.A_inv = np.linalg.inv(np.array([A(lam) for lam in self.lambdas], dtype=float))
+            self.offsets = np.array([b(lam) for lam in self.lambdas], dtype=float)
+        # plans are shared via the cache, so protect them against modification
+        for array in (self.A_inv, self.offsets):
+            array.setflags(write=False)
 
-def kernel_nD(Delta_v, x, A=None, b=None, rtol=1e-6):
+    def transform(self, i, X):
+        """
+        Map positions onto the $i$-th node of the $\\lambda$-integration.
+
+        Parameters:
+                i : int
+                    Index of the node
+                X : array of shape (N, n) or (n,)
+                    The nD positions
+
+        Returns:
+                array of the same shape as X
+                    $A(\\lambda_i)^{-1} (x - b(\\lambda_i))$ for all positions $x$
+
+        """
+        return _transform(self.A_inv[i], self.offsets[i], X)
+
+
+def transform_plan(A, b, rtol=1e-6, rule='midpoint', order=None):
+    """
+    Return the ``TransformPlan`` of ``A``, ``b``, ``rtol`` and the rule. Plans are kept in a least-recently-used
+    cache keyed by the callables ``A``, ``b`` and the remaining arguments, such that repeated jobs with the same
+    reference system skip the setup entirely. Use ``transform_plan.cache_clear()`` to empty the cache.
+
+    Parameters:
+            A : callable
+                Must return and invertible matrix of size n x n
+            b : callable
+                Must return a vector of size n
+            rtol : float, optional
+                The relative tolerance of the kernel
+            rule : str, optional
+                The fixed quadrature rule, 'midpoint' (default) or 'gauss-legendre'
+            order : int, optional
+                The number of nodes of the Gauss-Legendre rule
+
+    Returns:
+            TransformPlan
+                the (possibly cached) plan
+
+    """
+    # the same arguments, given positionally or by keyword, share one entry of the cache
+    return _transform_plan(A, b, float(rtol), rule, None if order is None else int(order))
+
+
+@lru_cache(maxsize=32)
+def _transform_plan(A, b, rtol, rule, order):
+    return TransformPlan(A, b, rtol, rule, order)
+
+
+transform_plan.cache_clear = _transform_plan.cache_clear
+transform_plan.cache_info = _transform_plan.cache_info
+
+
+def _lambda_integral(evaluate, n, A, b, rtol, plan, rule, options, compiled=None):
+    """
+    Integrate over $\\lambda$ for n positions at once. ``evaluate(A_inv, offset, active)`` must return
+    $\\Delta v$ at the transformed positions of the ``active`` positions. For fixed rules,
+    ``compiled(plan)`` replaces the loop over the nodes if given.
+    Return the integrals, the error estimates and the number of evaluations per position.
+    """
+    if is_enabled():
+        evaluate_Delta_v = evaluate
+
+        def evaluate(A_inv, offset, active):
+            with span('Delta_v', points=len(active)):
+                return evaluate_Delta_v(A_inv, offset, active)
+    if plan is None:
+        if rule is None:
+            rule, default_options = get_quadrature()
+            options = {**default_options, **options}
+        if rule in FIXED_RULES:
+            plan = transform_plan(A, b, rtol, rule, options.get('order'))
+    everyone = np.arange(n)
+    if plan is not None and compiled is not None:
+        with span('quadrature', points=n*plan.steps):
+            integral, error = compiled(plan)
+        return integral, error, np.full(n, plan.steps)
+    if plan is not None:
+        integral = 0
+        error = 0
+        with span('quadrature', points=n*plan.steps):
+            for i in range(0, plan.steps):
+                values = evaluate(plan.A_inv[i], plan.offsets[i], everyone)
+                integral += plan.weights[i]*values
+                if plan.error_weights is not None:
+                    error += plan.error_weights[i]*values
+        if plan.error_weights is None:
+            error = np.full(n, np.nan)
+        return integral, np.abs(error), np.full(n, plan.steps)
+
+    def f(nodes, active):
+        with span('transform setup', steps=len(nodes)):
+            A_inv = np.linalg.inv(np.array([A(lam) for lam in nodes], dtype=float))
+            offsets = np.array([b(lam) for lam in nodes], dtype=float)
+        return np.array([evaluate(A_inv[i], offsets[i], active) for i in range(len(nodes))]).reshape(len(nodes), -1)
+    with span('quadrature'):
+        return adaptive(f, n, rule, rtol, **options)
+
+
+def kernel_nD(Delta_v, x, A=None, b=None, rtol=1e-6, plan=None, rule=None, full_output=False, backend=None, **options):
     """
     The kernel of AIT in n dimensions.
 ​
@@ -26,23 +181,97 @@ def kernel_nD(Delta_v, x, A=None, b=None, rtol=1e-6):
             rtol : float, optional
                 The relative tolerance of the kernel. It determines the number of steps used
                 in the midpoint rule of the $\lambda$-integration
+            plan : TransformPlan, optional
+                A precomputed plan of the transformations; if given, ``A``, ``b``, ``rtol`` and ``rule`` are ignored
+            rule : str, optional
+                The quadrature rule of the $\\lambda$-integration, 'midpoint', 'gauss-legendre',
+                'gauss-kronrod' or 'richardson'. Default is the rule selected with
+                ``pyalchemy.quadrature.set_quadrature()``, i.e. 'midpoint' unless changed
+            full_output : bool, optional
+                If ``True``, also return the error estimate and the number of evaluations of ``Delta_v``
+            backend : str, optional
+                'numpy' (default) or 'numba'. With 'numba', a ``Delta_v`` compiled with ``numba.njit`` which
+                takes a single position, and a fixed rule, the $\\lambda$-integration runs compiled and in parallel
+                over the positions; otherwise NumPy is used, with a warning if numba is not installed
+            options : keyword arguments, optional
+                Options of the rule, see ``pyalchemy.quadrature``
 
     Returns:
             float
-                the kernel in nD at position $x$
+                the kernel in nD at position $x$; if ``full_output``, a tuple of the kernel,
+                its estimated error (NaN for the midpoint rule; a loose upper bound for 'gauss-legendre',
+                see ``pyalchemy.quadrature.fixed_rule``) and the number of evaluations
 ​
     """
-    # number of steps in the integration, use the midpoint rule
-    # the error of the midpoint rule is at most
-    # Error \leq max(f'')*(b-a)^3/24*steps**2, i.e. we can find steps
-    # via the rtol demanded above, i.e. rtol := Error/max(f'')
-    steps = int(1/np.sqrt(24*rtol))+1
-    h = 1/steps
-    integral = 0
-
-    # invert the matrix A
-    for i in range(0, steps):
-        A_inv = np.linalg.inv(A(steps*h))
-        new_vec = A_inv @ (x - b(steps*h))
-        integral += Delta_v(new_vec)
+    def evaluate(A_inv, offset, active):
+        return Delta_v(_transform(A_inv, offset, x))
+
+    compiled = None
+    if resolve_backend(backend) == 'numba' and is_compiled(Delta_v):
+        def compiled(plan):
+            return fixed_rule_sum(Delta_v, plan, np.atleast_2d(np.asarray(x, dtype=float)))
+    with span('kernel_nD', points=1):
+        integral, error, evaluations = _lambda_integral(evaluate, 1, A, b, rtol, plan, rule, options, compiled)
+    integral, error, evaluations = (np.ravel(value)[0] for value in (integral, error, evaluations))
+    if full_output:
+        return integral, error, evaluations
+    return integral
+
+
+def kernel_nD_batch(Delta_v, X, A=None, b=None, rtol=1e-6, plan=None, rule=None, full_output=False, backend=None, **options):
+    """
+    The kernel of AIT in n dimensions, evaluated for many positions at once.
+
+    Parameters:
+            Delta_v : callable
+                The difference in external potentials, i.e. $v_B(x) - v_A(x)$. It must accept
+                an array of shape (N, n) of nD positions and return an array of shape (N,)
+            X : array of shape (N, n)
+                The nD positions, e.g. all points of an integration grid
+            A : callable
+                Must return and invertible matrix of size n x n
+            b : callable
+                Must return a vector of size n
+            rtol : float, optional
+                The relative tolerance of the kernel. It determines the number of steps used
+                in the midpoint rule of the $\\lambda$-integration
+            plan : TransformPlan, optional
+                A precomputed plan of the transformations; if given, ``A``, ``b``, ``rtol`` and ``rule`` are ignored
+            rule : str, optional
+                The quadrature rule of the $\\lambda$-integration, 'midpoint', 'gauss-legendre',
+                'gauss-kronrod' or 'richardson'. Default is the rule selected with
+                ``pyalchemy.quadrature.set_quadrature()``, i.e. 'midpoint' unless changed
+            full_output : bool, optional
+                If ``True``, also return the error estimate and the number of evaluations of ``Delta_v``
+            backend : str, optional
+                'numpy' (default) or 'numba'. With 'numba', a ``Delta_v`` compiled with ``numba.njit`` which
+                takes a single position, and a fixed rule, the $\\lambda$-integration runs compiled and in parallel
+                over the positions; otherwise NumPy is used, with a warning if numba is not installed
+            options : keyword arguments, optional
+                Options of the rule, see ``pyalchemy.quadrature``
+
+    Returns:
+            array of shape (N,)
+                the kernel in nD at all positions in $X$; if ``full_output``, a tuple of the kernel,
+                its estimated errors (NaN for the midpoint rule; loose upper bounds for 'gauss-legendre',
+                see ``pyalchemy.quadrature.fixed_rule``) and the numbers of evaluations
+
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+
+    def evaluate(A_inv, offset, active):
+        return Delta_v(_transform(A_inv, offset, X[active]))
+
+    compiled = None
+    if resolve_backend(backend) == 'numba' and is_compiled(Delta_v):
+        # the compiled Delta_v takes a single position, so the NumPy path evaluates it point by point
+        def compiled(plan):
+            return fixed_rule_sum(Delta_v, plan, X)
+
+        def evaluate(A_inv, offset, active):
+            return np.array([Delta_v(y) for y in _transform(A_inv, offset, X[active])])
+    with span('kernel_nD_batch', points=len(X)):
+        integral, error, evaluations = _lambda_integral(evaluate, len(X), A, b, rtol, plan, rule, options, compiled)
+    if full_output:
+        return integral, error, evaluations
     return integral
@@ -5,9 +5,19 @@ Throughout this code, Hartree atomic units are used.
 ​
 """
 
-from scipy.special import gamma
+import copy
+import os
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+from scipy.special import gammaln, xlogy
 from numpy import sqrt, exp, pi
 
+from .backends import coulomb_sum, resolve_backend
+from .profiling import instrumented
+from .tree import CoulombTree
+
 # Regulator for numerically instable fractions
 _reg = 1e-15
 float_prec = 18 # guaranteed floating point precision in ciritical steps
@@ -19,23 +29,146 @@ def _fc(n):
     else:
         return n*_fc(n-1)
 
+# Coefficients of the three-term recurrence P_k = (a_k + b_k*x)*P_(k-1) - c_k*P_(k-2), k = 1, ..., n
+# of the Hermite polynomials ('H'), the Hermite functions ('psi'), the associated Laguerre
+# polynomials ('L') and the associated Laguerre polynomials normalized by sqrt(k!/Gamma(k+alpha+1)) ('L_hat')
+@lru_cache(maxsize=None)
+def _coefficients(family, n, alpha=0.0):
+    k = np.arange(1, n+1, dtype=float)
+    if family == 'H':
+        a, b, c = np.zeros(n), np.full(n, 2.0), 2*(k - 1)
+    elif family == 'psi':
+        a, b, c = np.zeros(n), sqrt(2/k), sqrt((k - 1)/k)
+    elif family == 'L':
+        a, b, c = (2*k - 1 + alpha)/k, -1/k, (k - 1 + alpha)/k
+    elif family == 'L_hat':
+        norm = sqrt(k*(k + alpha))
+        a, b, c = (2*k - 1 + alpha)/norm, -1/norm, sqrt((k - 1)*(k - 1 + alpha))/norm
+    else:
+        raise ValueError("Polynomial family '" + str(family) + "' is not supported!")
+    for array in (a, b, c):
+        array.setflags(write=False)
+    return a, b, c
+
+
+def _polynomials(family, n, x, alpha=0.0):
+    """
+    Evaluate all degrees 0, ..., n of a family of orthogonal polynomials (see ``_coefficients``) at once
+    via their three-term recurrence. Returns an array of shape (n+1, *x.shape).
+    """
+    x = np.asarray(x, dtype=float)
+    a, b, c = _coefficients(family, int(n), float(alpha))
+    P = np.empty((int(n)+1,) + x.shape)
+    if family == 'psi':
+        P[0] = exp(-x**2/2)/pi**0.25
+    elif family == 'L_hat':
+        P[0] = exp(-gammaln(alpha + 1)/2)
+    else:
+        P[0] = 1
+    for k in range(1, int(n)+1):
+        P[k] = (a[k-1] + b[k-1]*x)*P[k-1]
+        if k > 1:
+            P[k] -= c[k-1]*P[k-2]
+    return P
+
+
+def _log_polynomial(family, n, x, alpha=0.0):
+    """
+    Evaluate log|P_n(x)| of a family of orthogonal polynomials (see ``_coefficients``) via the
+    three-term recurrence, rescaling every step, such that it neither overflows nor underflows.
+    """
+    x = np.asarray(x, dtype=float)
+    a, b, c = _coefficients(family, int(n), float(alpha))
+    log_scale = np.zeros(x.shape)
+    P_prev = np.zeros(x.shape)
+    if family == 'psi':
+        P, log_scale = np.ones(x.shape), -x**2/2 - np.log(pi)/4
+    elif family == 'L_hat':
+        P, log_scale = np.ones(x.shape), np.full(x.shape, -gammaln(alpha + 1)/2)
+    else:
+        P = np.ones(x.shape)
+    for k in range(1, int(n)+1):
+        P, P_prev = (a[k-1] + b[k-1]*x)*P - c[k-1]*P_prev, P
+        # rescale both P_k and P_(k-1) by the same factor, remembering its logarithm
+        scale = np.maximum(np.abs(P), np.abs(P_prev))
+        scale = np.where(scale == 0, 1, scale)
+        P, P_prev = P/scale, P_prev/scale
+        log_scale += np.log(scale)
+    with np.errstate(divide='ignore'):
+        return np.log(np.abs(P)) + log_scale
+
+
 # Hermite polynomials
 def _H(n,x):
-    if n == 0:
-        return 1
-    elif n == 1:
-        return 2*x
-    else:
-        return 2*x*_H(n-1,x) - 2*(n-1)*_H(n-2,x)
+    return _polynomials('H', n, x)[n][()]
 
 # Associated Laguerre polynomials
 def _L(n, alpha, x):
-    if n == 0:
-        return 1
-    elif n == 1:
-        return 1 + alpha - x
-    else:
-        return ((2*(n - 1) + 1 + alpha - x)*_L(n - 1, alpha, x) - (n - 1 + alpha)*_L(n - 2, alpha, x))/n
+    return _polynomials('L', n, x, alpha)[n][()]
+
+
+# pyalchemy0.0.7/potentials.py and pyalchemy0.1.0/potentials.py keep copies of _multi_indices and
+# _coulomb_derivatives, regularized by their _reg; changes of the recurrence apply to them too, see
+# tests/test_pyalchemy_0_0_7.py
+# All multi-indices [n_x, n_y, n_z] with n_x + n_y + n_z <= order, sorted by their total order
+@lru_cache(maxsize=None)
+def _multi_indices(order):
+    indices = np.array([(t, u, L - t - u) for L in range(order + 1) for t in range(L, -1, -1) for u in range(L - t, -1, -1)],
+                       dtype=int).reshape(-1, 3)
+    indices.setflags(write=False)
+    return indices
+
+
+def _coulomb_derivatives(mol, indices, r, nuc_rad=0.0):
+    """
+    Derivatives of the Coulomb potential sum_i -Z_i/sqrt(|r - R_i|^2 + nuc_rad^2) for many multi-indices at once
+    via the Hermite recurrence of McMurchie and Davidson: with s = |r - R_i|^2 + nuc_rad^2 and R^m_(tuv) the
+    derivative d^(t+u+v)/dx^t dy^u dz^v of d^m/ds^m s^(-1/2),
+
+        R^m_(t+1,u,v) = 2*(t*R^(m+1)_(t-1,u,v) + (x - x_i)*R^(m+1)_(tuv))
+
+    and likewise in y and z. The multi-indices must be sorted by their total order and contain every index
+    which follows from lowering their first non-vanishing component, e.g. ``_multi_indices(order)``.
+    Returns an array of shape (len(indices), *r.shape[:-1]).
+    """
+    mol = np.asarray(mol, dtype=float).reshape(-1, 4)
+    r = np.asarray(r, dtype=float)
+    indices = [tuple(int(n) for n in index) for index in indices]
+    order = max(sum(index) for index in indices)
+    points = r.reshape(-1, 3)
+    values = np.zeros((len(indices), len(points)))
+    # points and atoms are treated in blocks, such that the table of the recurrence has at most ~2**22 entries
+    # (at least one point and one atom per block, i.e. len(indices)*(order + 1) entries)
+    size = len(indices)*(order + 1)
+    chunk = max(1, 2**22//size)
+    for first in range(0, len(points), chunk):
+        X = points[first:first + chunk]
+        block = max(1, 2**22//(size*len(X)))
+        for start in range(0, len(mol), block):
+            Z, R_i = mol[start:start + block, 0], mol[start:start + block, 1:]
+            # components of the distance vectors, each of shape (N_chunk, N_block)
+            d = [X[:, j, None] - R_i[:, j] for j in range(3)]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                s = d[0]**2 + d[1]**2 + d[2]**2 + nuc_rad**2
+                # d^m/ds^m s^(-1/2) for m = 0, ..., order
+                F = np.empty((order + 1,) + s.shape)
+                F[0] = 1/sqrt(s)
+                for m in range(1, order + 1):
+                    F[m] = -(2*m - 1)/2*F[m-1]/s
+                R = {(0, 0, 0): F}
+                for index in indices:
+                    if index in R:
+                        continue
+                    # lower the first non-vanishing component; R^m is kept for m = 0, ..., order - (t+u+v)
+                    axis = next(j for j in range(3) if index[j] > 0)
+                    lower = index[:axis] + (index[axis] - 1,) + index[axis+1:]
+                    term = d[axis]*R[lower][1:]
+                    if lower[axis] > 0:
+                        lowest = index[:axis] + (index[axis] - 2,) + index[axis+1:]
+                        term += lower[axis]*R[lowest][1:len(term) + 1]
+                    R[index] = 2*term
+                values[:, first:first + chunk] -= np.array([R[index][0] for index in indices]) @ Z
+    return values.reshape((len(indices),) + r.shape[:-1])
 
 
 # Built-in class for the 1D quantum harmonic oscillator
@@ -48,11 +181,14 @@ class QHO:
         return (n + 0.5)*self.omega
 
     # Return the 1D potential of the QHO
+    @instrumented
     def v(self, x):
         return 0.5*(self.omega*x)**2
 
+    @instrumented
     def rho(self, n, x):
-        return (_H(n,sqrt(self.omega)*x))**2*exp(-self.omega*x**2)*sqrt(self.omega/pi)/(2**n * _fc(n))
+        # normalized Hermite functions, psi_n^2 = H_n^2*exp(-x^2)/(2^n n! sqrt(pi))
+        return sqrt(self.omega)*_polynomials('psi', n, sqrt(self.omega)*np.asarray(x))[n][()]**2
 
 
 # Built-in class for the 1D Morse potential
@@ -62,24 +198,39 @@ class Morse:
         self.a = a
         self.r_e = r_e
 
+    # Return the energy of the Morse potential, NaN if the n-th bound state does not exist
     def E(self, n):
         l = sqrt(2*self.D)/self.a
-        if n > int(l-0.5):
-            print("Eigenenergy with n = " + str(n) + " does not exist!")
-            return 0
-        else:
-            nu = self.a*sqrt(2*self.D)
-            return ((n+0.5) - ((n+0.5)**2)/(2*l))*nu
+        nu = self.a*sqrt(2*self.D)
+        return np.where(np.asarray(n) > int(l-0.5), np.nan, ((n+0.5) - ((n+0.5)**2)/(2*l))*nu)[()]
 
+    @instrumented
     def v(self, x):
-        result = self.D*((-2*self.a)*exp(-2*self.a*(x-self.r_e)) - 2*(-self.a)*exp(-self.a*(x-self.r_e))) + self.D
-        return result
+        return self.D*(exp(-2*self.a*(x-self.r_e)) - 2*exp(-self.a*(x-self.r_e))) + self.D
+
+    def _log_rho(self, n, x):
+        # logarithm of the density of the n-th bound state
+        l = sqrt(2*self.D)/self.a
+        log_z = np.log(2*l) - self.a*(np.asarray(x, dtype=float) - self.r_e)
+        z = exp(log_z)
+        # normalized Laguerre polynomials, L_hat_n^2 = n!/Gamma(2l - n)*L_n^2
+        alpha = 2*l - 2*n - 1
+        with np.errstate(divide='ignore', over='ignore'):
+            return np.log(self.a*alpha) + alpha*log_z - z + 2*_log_polynomial('L_hat', n, z, alpha)
 
+    # Return the density of the n-th bound state, NaN if it does not exist
+    @instrumented
     def rho(self, n, x):
         l = sqrt(2*self.D)/self.a
-        z = 2*l*exp(-self.a*(x - self.r_e))
-        N_squared = _fc(n)*(2*l - 2*n - 1)/(gamma(2*l - n))
-        return self.a*N_squared*z**(2*l - 2*n - 1)*exp(-z)*(_L(n,2*l-2*n-1,z))**2
+        if n > int(l-0.5):
+            return (np.asarray(x, dtype=float)*np.nan)[()]
+        return exp(self._log_rho(n, x))[()]
+
+    # Return the densities of all bound states, an array of shape (n_states, *x.shape)
+    @instrumented
+    def rho_all(self, x):
+        l = sqrt(2*self.D)/self.a
+        return exp(np.array([self._log_rho(n, x) for n in range(0, int(l-0.5)+1)]))
 
 
 # Built-in function for nD potentials of molecules
@@ -87,23 +238,29 @@ class hydlike:
     def __init__(self, Z):
         self.Z = Z
 
+    # Return the energy of the hydrogen-like atom, NaN for n = 0 which does not exist
     def E(self, n):
-        if n == 0:
-            print("Eigenenergy with n = 0 does not exist in the hydrogen-like atom!")
-            return 0
-        else:
-            return -self.Z/(2*n**2)
+        n = np.asarray(n, dtype=float)
+        with np.errstate(divide='ignore'):
+            return np.where(n == 0, np.nan, -self.Z/(2*n**2))[()]
 
+    # Return the potential of the hydrogen-like atom, NaN for radii r <= 0 which are not allowed
+    @instrumented
     def v(self, r):
-        if r <= 0:
-            print("Only positive radii are allowed in the hydrogen-like atom")
-            return 0
-        else:
-            return -self.Z/r
+        r = np.asarray(r, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(r > 0, -self.Z/r, np.nan)[()]
 
+    @instrumented
     def rho(self, n, r):
         xi = 2*self.Z/n
-        return sum([(2*l+1)*((xi*r)**(2*l))*(xi**3)*(exp(-xi*r))*(_L(n-l-1,2*l+1,xi*r))**2*_fc(n-l-1)/(2*n*_fc(n+l)) for l in range(0,n)])/(4*pi*n**2)
+        x = xi*np.asarray(r, dtype=float)
+        result = 0
+        for l in range(0, n):
+            # normalized Laguerre polynomials, L_hat^2 = (n-l-1)!/(n+l)!*L^2; x^(2l)*exp(-x) in log-space
+            L_hat = _polynomials('L_hat', n-l-1, x, 2*l+1)[n-l-1]
+            result = result + (2*l+1)*exp(xlogy(2*l, x) - x)*(xi**3)*L_hat**2/(2*n)
+        return (result/(4*pi*n**2))[()]
 
 
 class Coulomb_3D:
@@ -114,27 +271,203 @@ class Coulomb_3D:
             mol : array of shape (..., 4)
                 A list of lists of the 4D coordinates (nuclear charge :math:`Z_i`, coordinates :math:`x_i, y_i, z_i` of all atoms,
                 i.e. ``mole = [[Z_1, x_1, y_1, z_1], [Z_2, x_2, y_2, z_2], ...]``
+            method : str, optional
+                'direct' (default) sums over all atoms at every position. 'tree' replaces groups of atoms far
+                from a cell of positions by their total charge (Barnes-Hut, see ``pyalchemy.tree``), which is
+                much faster for molecules with thousands of atoms
+            theta : float, optional
+                The accuracy of the method 'tree': the opening angle, i.e. the largest ratio of the size of a group
+                of atoms to its distance. The relative error of a group is of the order ``theta**2/4``
     """
 
-    def __init__(self, mol):
+    def __init__(self, mol, method='direct', theta=0.5):
+        if method not in ('direct', 'tree'):
+            raise ValueError("Method '" + str(method) + "' is not supported!")
         self.mol = mol
+        self.method = method
+        self.theta = theta
+        self._tree = None
 
-    def v(self, r):
+    def tree(self):
+        """
+        Return the ``CoulombTree`` of the molecule, which is rebuilt if ``mol`` or ``theta`` have changed.
+        """
+        mol = np.asarray(self.mol, dtype=float).reshape(-1, 4)
+        if self._tree is None or self._tree.theta != self.theta or not np.array_equal(self._tree.mol, mol):
+            self._tree = CoulombTree(mol, self.theta)
+        return self._tree
+
+    def _tree_derivatives(self, indices, r, nuc_rad=0.0):
+        # derivatives of all multi-indices at all positions, cell by cell of the grid
+        r = np.asarray(r, dtype=float)
+        points = r.reshape(-1, 3)
+        values = np.empty((len(indices), len(points)))
+        for members, sources in self.tree().partition(points):
+            values[:, members] = _coulomb_derivatives(sources, indices, points[members], nuc_rad)
+        return values.reshape((len(indices),) + r.shape[:-1])
+
+    @instrumented
+    def v(self, r, backend=None):
         """
         A function for the external potential in 3D of the given molecule.
 ​
         Parameters:
-                mol : array of shape (..., 4)
-                    A list of lists of the 4D coordinates (nuclear charge :math:`Z_i`, coordinates :math:`x_i, y_i, z_i` of all atoms,
-                    i.e. ``mole = [[Z_1, x_1, y_1, z_1], [Z_2, x_2, y_2, z_2], ...]``
-                r : list of three floats x, y, z
-                    coordinates
+                r : array of shape (..., 3)
+                    coordinates, e.g. a single position ``[x, y, z]`` or all points of a grid
+                backend : str, optional
+                    'numpy' (default) or 'numba', which sums over the atoms in compiled code, in parallel over
+                    the positions and without the intermediate array of all distances; see ``pyalchemy.backends``.
+                    Ignored by the method 'tree'
+
+        Returns:
+                float or array of shape (...)
+                    the external potential at all positions ``\\bm{r} = [x,y,z]``; it is ``-inf`` at the nuclei
+​
+        """
+        mol = np.asarray(self.mol, dtype=float).reshape(-1, 4)
+        r = np.asarray(r, dtype=float)
+        if self.method == 'tree':
+            return self._tree_derivatives(_multi_indices(0), r)[0][()]
+        if resolve_backend(backend) == 'numba':
+            return coulomb_sum(mol, r.reshape(-1, 3)).reshape(r.shape[:-1])[()]
+        # distances of all positions to all nuclei, shape (..., N_atoms)
+        distances = np.linalg.norm(r[..., None, :] - mol[:, 1:], axis=-1)
+        with np.errstate(divide='ignore'):
+            return -np.sum(mol[:, 0]/distances, axis=-1)[()]
+
+    @instrumented
+    def derivatives(self, order, r, nuc_rad=0.0):
+        """
+        All spatial derivatives of the external potential in 3D of the given molecule up to a total order at once.
+        They are analytical and evaluated with the recurrence of McMurchie and Davidson. With the method 'tree',
+        the error of the k-th derivatives grows with k, so it is meant for low orders.
+​
+        Parameters:
+                order : int
+                    The highest total order :math:`n_x+n_y+n_z` of the derivatives
+                r : array of shape (..., 3)
+                    coordinates, e.g. a single position ``[x, y, z]`` or all points of a grid
+                nuc_rad : float, optional
+                    An optional nuclear radius :math:`\\eta` such that the Coulomb potential is rendered finite everywhere:
+                    :math:`\\frac{-Z_i}{|\\bm{r} - \\bm{R}_i|} \\rightarrow \\frac{-Z_i}{\\sqrt{|\\bm{r} - \\bm{R}_i|^2 + \\eta^2}}`
 
         Returns:
-                float
-                    the external potential at ``\bm{r} = [x,y,z]``,
+                indices : array of shape (K, 3)
+                    all multi-indices :math:`[n_x, n_y, n_z]` with :math:`n_x+n_y+n_z \\leq` ``order``, sorted by their total order
+                values : array of shape (K, ...)
+                    the derivatives :math:`\\frac{\\partial^{n_x + n_y + n_z} }{\\partial x^{n_x} \\partial y^{n_y} \\partial z^{n_z} } v(\\bm{r})`
+                    of all multi-indices at all positions
+​
+        """
+        if int(order) != order or order < 0:
+            raise ValueError("Only non-negative integer orders are supported!")
+        indices = _multi_indices(int(order))
+        if self.method == 'tree':
+            return indices, self._tree_derivatives(indices, r, nuc_rad)
+        return indices, _coulomb_derivatives(self.mol, indices, r, nuc_rad)
+
+
+class CoulombColumns:
+    """
+    The contributions :math:`-1/|\\bm{r} - \\bm{R}_a|` of every atom :math:`a` of a molecule at fixed positions,
+    e.g. all points of a grid, for mutations of the nuclear charges on the same geometry.
+
+    Once the contributions are evaluated, the change of the external potential of a mutation
+    "atom a: :math:`Z_a \\rightarrow Z'_a`" is :math:`(Z'_a - Z_a)` times one column, i.e. it costs
+    O(N_points) instead of O(N_points x N_atoms), and the changes of many targets are sparse linear
+    combinations of the columns.
 ​
+    Parameters:
+            mol : Coulomb_3D or array of shape (N_atoms, 4)
+                The reference molecule, i.e. ``[[Z_1, x_1, y_1, z_1], [Z_2, x_2, y_2, z_2], ...]``
+            points : array of shape (N_points, 3)
+                The positions
+            filename : str, optional
+                A ``.npy`` file which holds the contributions as a memory-mapped array. If it exists and
+                has the shape (N_atoms, N_points), it is used without evaluating the contributions again,
+                so it must belong to the same geometry and positions. Default is an array in memory
+            max_memory : int, optional
+                Upper bound in bytes of the intermediate arrays; determines the number of positions per chunk
+
+    Attributes:
+            charges : array of shape (N_atoms,)
+                The nuclear charges of the molecule
+            columns : array of shape (N_atoms, N_points)
+                The contribution of every atom at every position per unit charge
+    """
+
+    def __init__(self, mol, points, filename=None, max_memory=2**27):
+        if isinstance(mol, Coulomb_3D):
+            mol = mol.mol
+        mol = np.asarray(mol, dtype=float).reshape(-1, 4)
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self.charges = mol[:, 0].copy()
+        shape = (len(mol), len(points))
+        if filename is not None and os.path.exists(filename):
+            columns = np.load(filename, mmap_mode='r')
+            if columns.shape == shape:
+                self.columns = columns
+                return
+        if filename is None:
+            self.columns = np.empty(shape)
+        else:
+            self.columns = np.lib.format.open_memmap(filename, mode='w+', dtype=float, shape=shape)
+        chunk_size = max(1, int(max_memory//(8*4*max(len(mol), 1))))
+        for start in range(0, len(points), chunk_size):
+            X = points[start:start + chunk_size]
+            with np.errstate(divide='ignore'):
+                self.columns[:, start:start + chunk_size] = -1/np.linalg.norm(X[None, :, :] - mol[:, None, 1:], axis=-1)
+        if filename is not None:
+            self.columns.flush()
+
+    @instrumented
+    def v(self):
+        """
+        The external potential of the molecule at all positions, an array of shape (N_points,).
+        """
+        return self.charges @ self.columns
+
+    @instrumented
+    def delta_v(self, mutations):
+        """
+        The change of the external potential at all positions for a mutation of one or a few atoms.
+
+        Parameters:
+                mutations : dict
+                    The new nuclear charges of the mutated atoms, i.e. ``{a: Z'_a, ...}``
+
+        Returns:
+                array of shape (N_points,)
+                    :math:`\\sum_a (Z'_a - Z_a) (-1/|\\bm{r} - \\bm{R}_a|)`
+        """
+        result = np.zeros(self.columns.shape[1])
+        for atom, Z in mutations.items():
+            result += (Z - self.charges[atom])*self.columns[atom]
+        return result
+
+    @instrumented
+    def delta_v_many(self, targets):
+        """
+        The changes of the external potential at all positions for many targets at once.
+
+        Parameters:
+                targets : array of shape (T, N_atoms)
+                    The nuclear charges of all targets on the geometry of the molecule. Only the atoms which
+                    differ from the reference contribute, i.e. the cost is proportional to the number of mutations
+
+        Returns:
+                array of shape (T, N_points)
+                    The changes :math:`v_B - v_A` of all targets
+        """
+        Delta_Z = sparse.csr_matrix(np.atleast_2d(np.asarray(targets, dtype=float)) - self.charges)
+        return np.asarray(Delta_Z @ self.columns)
+
+    def mutate(self, mutations):
+        """
+        Return the molecule after a mutation (see ``delta_v``). It shares the columns with this one.
         """
-        for i in range(len(self.mol)):
-            sum += -self.mol[i][0]/sqrt((x-self.mol[i][1])**2+(y-self.mol[i][2])**2+(z-self.mol[i][3])**2)
-        return sum
+        mutated = copy.copy(self)
+        mutated.charges = self.charges.copy()
+        for atom, Z in mutations.items():
+            mutated.charges[atom] = Z
+        return mutated
@@ -0,0 +1,207 @@
+"""
+A module which provides the opt-in instrumentation of pyalchemy, i.e. the
+number of calls and the time of every phase of the kernels (transform setup,
+evaluations of Delta_v, quadrature), of the potentials, of rho and of the
+reduction over the grid.
+
+While no profile is enabled, the instrumented functions only check a global
+and the kernels run unchanged. While one is enabled, every instrumented call
+is recorded as a span; the spans are aggregated into a summary and can be
+exported as a Chrome trace (chrome://tracing, Perfetto) or as JSON.
+
+Only the calling thread and process are recorded, i.e. not the workers of
+``pyalchemy.integrate.delta_E``.
+
+"""
+
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# The enabled profile, None if instrumentation is disabled
+_active = None
+_disabled = nullcontext()
+
+
+class Profile:
+    """
+    A record of the instrumented calls while the profile is enabled.
+
+    Parameters:
+            max_events : int, optional
+                The largest number of spans kept for the trace; the summary includes all of them
+
+    Attributes:
+            events : list of tuples (name, start, duration, args)
+                The recorded spans in the order in which they ended, times in s
+            wall_time : float
+                The time in s from enabling the profile to disabling it (or until now)
+    """
+
+    def __init__(self, max_events=100000):
+        self.max_events = int(max_events)
+        self.events = []
+        self._stats = {}
+        # time of the children of all open spans
+        self._children = []
+        self._start = time.perf_counter()
+        self._stop = None
+
+    @property
+    def wall_time(self):
+        return (self._stop if self._stop is not None else time.perf_counter()) - self._start
+
+    def _open(self):
+        self._children.append(0.0)
+
+    def _close(self, name, start, args):
+        duration = time.perf_counter() - start
+        children = self._children.pop()
+        if self._children:
+            self._children[-1] += duration
+        stats = self._stats.setdefault(name, [0, 0.0, 0.0, 0])
+        stats[0] += 1
+        stats[1] += duration
+        stats[2] += duration - children
+        stats[3] += args.get('points', 0)
+        if len(self.events) < self.max_events:
+            self.events.append((name, start, duration, args))
+
+    def summary(self):
+        """
+        Return the aggregated spans, a dictionary which maps every name onto a dictionary of the
+        number of ``calls``, the total ``time`` and the ``self_time`` without nested spans in s, and,
+        where given, the number of ``points`` and the throughput ``points_per_s``.
+        """
+        summary = {}
+        for name, (calls, total, self_time, points) in sorted(self._stats.items(), key=lambda item: -item[1][1]):
+            entry = {'calls': calls, 'time': total, 'self_time': self_time}
+            if points:
+                entry['points'] = points
+                entry['points_per_s'] = points/total if total > 0 else float('inf')
+            summary[name] = entry
+        return summary
+
+    def chrome_trace(self):
+        """
+        Return the spans in the Chrome trace event format, a dictionary with the key ``traceEvents``.
+        """
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self._start)*1e6, 'dur': duration*1e6,
+                   'pid': pid, 'tid': 0, 'args': args} for name, start, duration, args in self.events]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, filename, format='chrome'):
+        """
+        Write the profile to a file.
+
+        Parameters:
+                filename : str
+                    The file
+                format : str, optional
+                    'chrome' (default) for the Chrome trace of all spans or 'summary' for
+                    the summary and the wall time as JSON
+        """
+        if format == 'chrome':
+            data = self.chrome_trace()
+        elif format == 'summary':
+            data = {'wall_time': self.wall_time, 'summary': self.summary()}
+        else:
+            raise ValueError("Format '" + str(format) + "' is not supported!")
+        with open(filename, 'w') as file:
+            json.dump(data, file, indent=1)
+
+
+class _Span:
+    __slots__ = ('profile', 'name', 'args', 'start')
+
+    def __init__(self, profile, name, args):
+        self.profile, self.name, self.args = profile, name, args
+
+    def __enter__(self):
+        self.profile._open()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile._close(self.name, self.start, self.args)
+        return False
+
+
+def enable(profile=None):
+    """
+    Start recording into ``profile`` (a new ``Profile`` by default) and return it.
+    """
+    global _active
+    _active = Profile() if profile is None else profile
+    return _active
+
+
+def disable():
+    """
+    Stop recording and return the profile which was enabled, or ``None``.
+    """
+    global _active
+    profile, _active = _active, None
+    if profile is not None:
+        profile._stop = time.perf_counter()
+    return profile
+
+
+def is_enabled():
+    """
+    Return whether a profile is recording.
+    """
+    return _active is not None
+
+
+@contextmanager
+def profiling(max_events=100000):
+    """
+    Record everything within a ``with`` block, e.g.
+
+        with profiling() as profile:
+            delta_E(rho, kernel, points, weights, workers=1)
+        print(profile.summary())
+        profile.export('trace.json')
+
+    Yields:
+            Profile
+                the profile of the block
+    """
+    previous = _active
+    profile = enable(Profile(max_events))
+    try:
+        yield profile
+    finally:
+        disable()
+        if previous is not None:
+            enable(previous)
+
+
+def span(name, **args):
+    """
+    Return a context manager which records its block as a span ``name``; a no-op while disabled.
+    The keyword ``points`` is the number of positions of the span, which gives its throughput.
+    """
+    if _active is None:
+        return _disabled
+    return _Span(_active, name, args)
+
+
+def instrumented(function):
+    """
+    Decorator which records every call of a function or method as a span named after its qualified name.
+    """
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _active is None:
+            return function(*args, **kwargs)
+        with _Span(_active, name, {}):
+            return function(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,228 @@
+"""
+A module which provides the quadrature rules of the $\\lambda$-integration
+in the kernel of the Alchemical Integral Transform (AIT).
+
+Fixed rules ('midpoint', 'gauss-legendre') have nodes which are known in advance
+and can be precomputed once per transformation. Adaptive rules ('gauss-kronrod',
+'richardson') refine the nodes until the requested tolerance is reached.
+
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+FIXED_RULES = ('midpoint', 'gauss-legendre')
+ADAPTIVE_RULES = ('gauss-kronrod', 'richardson')
+
+# Nodes and weights of the 7-point Gauss and 15-point Kronrod rule on [-1, 1] (from QUADPACK)
+_xgk = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                 0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245, 0.000000000000000000000000000000000])
+_wgk = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                 0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                 0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                 0.204432940075298892414161999234649, 0.209482141084727828012999174891714])
+_wg = np.array([0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+                0.381830050505118944950369775488975, 0.417959183673469387755102040816327])
+
+# all 15 nodes in ascending order, and the weights of both rules on them
+_kronrod_nodes = np.concatenate([-_xgk[:-1], _xgk[::-1]])
+_kronrod_weights = np.concatenate([_wgk[:-1], _wgk[::-1]])
+_gauss_weights = np.zeros(15)
+_gauss_weights[1::2] = np.concatenate([_wg[:-1], _wg[::-1]])
+
+# The globally selected rule and its options
+_default = {'rule': 'midpoint', 'options': {}}
+
+
+def set_quadrature(rule, **options):
+    """
+    Select the quadrature rule of the $\\lambda$-integration for all kernels which are
+    not given a rule explicitly.
+
+    Parameters:
+            rule : str
+                One of 'midpoint' (default), 'gauss-legendre', 'gauss-kronrod' or 'richardson'
+            options : keyword arguments, optional
+                Options of the rule, i.e. ``order`` for 'gauss-legendre' and ``mode``,
+                ``max_level`` for the adaptive rules
+
+    """
+    if rule not in FIXED_RULES + ADAPTIVE_RULES:
+        raise ValueError("Quadrature rule '" + str(rule) + "' is not supported!")
+    _default['rule'] = rule
+    _default['options'] = dict(options)
+
+
+def get_quadrature():
+    """
+    Return the globally selected rule and its options as a tuple ``(rule, options)``.
+    """
+    return _default['rule'], dict(_default['options'])
+
+
+@lru_cache(maxsize=None)
+def fixed_rule(rule, rtol=1e-6, order=None):
+    """
+    Nodes and weights of a fixed quadrature rule on [0, 1].
+
+    Parameters:
+            rule : str
+                'midpoint' or 'gauss-legendre'
+            rtol : float, optional
+                The relative tolerance. It determines the number of steps of the midpoint rule
+            order : int, optional
+                The number of nodes of the Gauss-Legendre rule. Default is 10
+
+    Returns:
+            nodes : array
+                The nodes on [0, 1]
+            weights : array
+                The weights of all nodes
+            error_weights : array or None
+                Weights of an embedded null rule such that ``abs(error_weights @ f(nodes))``
+                estimates the error; ``None`` for the midpoint rule. For Gauss-Legendre, this is the
+                highest Legendre coefficient which the rule resolves, a loose upper bound: the rule is
+                exact up to twice that degree, so the actual error of smooth integrands is smaller by
+                orders of magnitude
+
+    """
+    if rule == 'midpoint':
+        # the error of the midpoint rule is at most
+        # Error \leq max(f'')*(b-a)^3/24*steps**2, i.e. we can find steps
+        # via the rtol demanded above, i.e. rtol := Error/max(f'')
+        steps = int(1/np.sqrt(24*rtol))+1
+        nodes = (np.arange(steps) + 0.5)/steps
+        weights = np.full(steps, 1/steps)
+        error_weights = None
+    elif rule == 'gauss-legendre':
+        order = 10 if order is None else int(order)
+        if order < 2:
+            raise ValueError("The Gauss-Legendre rule needs at least 2 nodes!")
+        t, w = np.polynomial.legendre.leggauss(order)
+        nodes = (t + 1)/2
+        weights = w/2
+        # the coefficient of the highest Legendre polynomial resolved by the rule;
+        # it vanishes if the integrand is a polynomial of lower degree
+        P = np.polynomial.legendre.legval(t, [0]*(order - 1) + [1])
+        error_weights = (2*order - 1)/2*w*P/2
+    else:
+        raise ValueError("Quadrature rule '" + str(rule) + "' is not a fixed rule!")
+    for array in (nodes, weights, error_weights):
+        if array is not None:
+            array.setflags(write=False)
+    return nodes, weights, error_weights
+
+
+def adaptive(f, n, rule='gauss-kronrod', rtol=1e-6, mode='batch', max_level=None):
+    """
+    Adaptive quadrature on [0, 1] of ``n`` integrands at once.
+
+    Parameters:
+            f : callable
+                Called as ``f(nodes, active)`` with an array of nodes in [0, 1] and an integer
+                index array of the integrands to evaluate; must return an array of shape
+                (len(nodes), len(active))
+            n : int
+                Number of integrands, e.g. grid points
+            rule : str, optional
+                'gauss-kronrod' (globally adaptive bisection with the 7-15 Gauss-Kronrod pair)
+                or 'richardson' (midpoint rule with tripled steps, extrapolated à la Romberg)
+            rtol : float, optional
+                The relative tolerance demanded of every integral
+            mode : str, optional
+                'batch' refines all integrands together until all converged; 'point' only
+                evaluates the integrands which have not converged yet
+            max_level : int, optional
+                Maximum number of bisections ('gauss-kronrod', default 50) or triplings
+                ('richardson', default 8)
+
+    Returns:
+            integral : array of shape (n,)
+                The integrals
+            error : array of shape (n,)
+                The estimated absolute errors
+            evaluations : array of shape (n,)
+                The number of evaluations of every integrand
+
+    """
+    if mode not in ('batch', 'point'):
+        raise ValueError("Mode '" + str(mode) + "' is not supported!")
+    if rule == 'gauss-kronrod':
+        return _gauss_kronrod(f, n, rtol, mode, 50 if max_level is None else max_level)
+    elif rule == 'richardson':
+        return _richardson(f, n, rtol, mode, 8 if max_level is None else max_level)
+    raise ValueError("Quadrature rule '" + str(rule) + "' is not an adaptive rule!")
+
+
+def _unconverged(integral, error, rtol):
+    # relative criterion with a floor at the rounding error of the batch
+    return error > rtol*np.abs(integral) + np.finfo(float).eps*np.abs(integral).max()
+
+
+def _kronrod_interval(f, a, b, active):
+    # Kronrod estimate and |Kronrod - Gauss| on [a, b] for the active integrands
+    values = f(a + (b - a)*(_kronrod_nodes + 1)/2, active)
+    K = (b - a)/2*(_kronrod_weights @ values)
+    G = (b - a)/2*(_gauss_weights @ values)
+    return K, np.abs(K - G)
+
+
+def _gauss_kronrod(f, n, rtol, mode, max_level):
+    everyone = np.arange(n)
+    K, E = _kronrod_interval(f, 0.0, 1.0, everyone)
+    intervals = [(0.0, 1.0, K, E)]
+    evaluations = np.full(n, 15)
+    for _ in range(max_level):
+        integral = sum(interval[2] for interval in intervals)
+        error = sum(interval[3] for interval in intervals)
+        unconverged = _unconverged(integral, error, rtol)
+        if not unconverged.any():
+            break
+        # bisect the interval which contributes most to the error of the unconverged integrands
+        j = int(np.argmax([interval[3][unconverged].max() for interval in intervals]))
+        a, b, K, E = intervals.pop(j)
+        active = everyone if mode == 'batch' else everyone[unconverged]
+        mid = (a + b)/2
+        # converged integrands keep their previous estimate on the left half
+        K_left, E_left, K_right, E_right = K.copy(), E.copy(), np.zeros(n), np.zeros(n)
+        K_left[active], E_left[active] = _kronrod_interval(f, a, mid, active)
+        K_right[active], E_right[active] = _kronrod_interval(f, mid, b, active)
+        intervals += [(a, mid, K_left, E_left), (mid, b, K_right, E_right)]
+        evaluations[active] += 30
+    integral = sum(interval[2] for interval in intervals)
+    error = sum(interval[3] for interval in intervals)
+    return integral, error, evaluations
+
+
+def _richardson(f, n, rtol, mode, max_level):
+    everyone = np.arange(n)
+    # level k uses the midpoint rule with 3**k steps; its nodes contain the ones of level k-1
+    sums = f(np.array([0.5]), everyone)[0]
+    table = [sums.copy()]
+    integral = sums.copy()
+    error = np.full(n, np.inf)
+    evaluations = np.ones(n, dtype=int)
+    unconverged = np.ones(n, dtype=bool)
+    for k in range(1, max_level + 1):
+        # the first extrapolation is not trusted on its own
+        active = everyone if mode == 'batch' or k <= 2 else everyone[unconverged]
+        steps = 3**k
+        new = np.arange(steps) + 0.5
+        new = new[np.arange(steps) % 3 != 1]/steps
+        sums[active] += f(new, active).sum(axis=0)
+        evaluations[active] += len(new)
+        row = [sums/steps]
+        for j in range(1, k + 1):
+            row.append(row[j - 1] + (row[j - 1] - table[j - 1])/(9**j - 1))
+        # converged integrands keep their extrapolated value
+        integral[active] = row[-1][active]
+        error[active] = np.abs(row[-1] - table[-1])[active]
+        table = row
+        unconverged = _unconverged(integral, error, rtol)
+        if k >= 2 and not unconverged.any():
+            break
+    return integral, error, evaluations
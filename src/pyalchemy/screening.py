@@ -0,0 +1,165 @@
+"""
+A module which provides the screening of many final systems B against one
+initial system A with the Alchemical Integral Transform (AIT).
+
+Everything which only depends on the initial system (density, weights, the
+transformed positions and $v_A$) is evaluated once per grid point, and the
+energy differences of all final systems follow from matrix operations over the grid.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import numpy as np
+
+from .kernels import transform_plan
+from .quadrature import FIXED_RULES, get_quadrature
+from .potentials import Coulomb_3D
+
+
+def _coulomb_columns(mol, X):
+    # -1/|x - R_a| of every nucleus a at every position x, shape (len(X), N_atoms)
+    R = np.asarray(mol, dtype=float)[:, 1:]
+    return -1/np.linalg.norm(X[:, None, :] - R[None, :, :], axis=-1)
+
+
+def coulomb_bound(mol, Delta_Z):
+    """
+    An upper bound of the difference of the potentials of nuclear charges on a fixed geometry,
+    $|v_B(x) - v_A(x)| \\leq \\sum_a |Z^B_a - Z^A_a| / |x - R_a|$, e.g. for ``pyalchemy.integrate.screen_grid``.
+    It bounds the kernel without affine transformation, as in ``screen`` without ``A``.
+
+    Parameters:
+            mol : Coulomb_3D or array of shape (N_atoms, 4)
+                The initial molecule, i.e. ``[[Z_1, x_1, y_1, z_1], ...]``
+            Delta_Z : array of shape (N_atoms,) or (T, N_atoms)
+                The changes of the nuclear charges; for many targets, the bound holds for all of them
+
+    Returns:
+            callable
+                the bound, which takes an array of shape (M, 3) of positions and returns an array of shape (M,)
+    """
+    mol = np.asarray(mol.mol if isinstance(mol, Coulomb_3D) else mol, dtype=float)
+    Delta_Z = np.abs(np.asarray(Delta_Z, dtype=float)).reshape(-1, len(mol)).max(axis=0)
+
+    def bound(X):
+        return -_coulomb_columns(mol, np.asarray(X, dtype=float)) @ Delta_Z
+    return bound
+
+
+def screen(reference, targets, grid, names=None, A=None, b=None, rtol=1e-6, plan=None, rule=None, order=None,
+           max_memory=2**27):
+    """
+    Energy differences $E_B - E_A$ of many final systems B with respect to one initial system A.
+
+    If the initial potential is a ``Coulomb_3D`` molecule and the targets are nuclear charges on the same
+    geometry, the energy differences are $\\sum_a (Z^B_a - Z^A_a) C_a$ with one grid integral $C_a$ per
+    nucleus, i.e. the grid is traversed once regardless of the number of targets. Otherwise, the initial
+    system's quantities are evaluated once per chunk of grid points and all targets are evaluated on them.
+
+    Parameters:
+            reference : tuple (rho, v_A)
+                The initial system: its electron density, either a callable which takes an array of shape (M, n)
+                of positions or its values at all grid points, and its external potential, either a ``Coulomb_3D``
+                or a callable which takes an array of shape (M, n) of positions
+            targets : array of shape (T, N_atoms) or list
+                The final systems: nuclear charges on the geometry of the initial ``Coulomb_3D`` molecule and
+                ``Coulomb_3D`` molecules on that geometry, or callables ``v_B`` like ``v_A``, but not both
+            grid : tuple (points, weights)
+                The integration grid, arrays of shape (N, n) and (N,)
+            names : list, optional
+                Names of the targets in the returned table. Default is their index
+            A : callable, optional
+                Must return and invertible matrix of size n x n. Default is no transformation, i.e.
+                the kernel is $v_B - v_A$
+            b : callable, optional
+                Must return a vector of size n
+            rtol : float, optional
+                The relative tolerance of the kernel
+            plan : TransformPlan, optional
+                A precomputed plan of the transformations; if given, ``A``, ``b``, ``rtol``, ``rule`` and ``order``
+                are ignored
+            rule : str, optional
+                The fixed quadrature rule of the $\\lambda$-integration, 'midpoint' or 'gauss-legendre'. Default is
+                the rule selected with ``pyalchemy.quadrature.set_quadrature()``; the adaptive rules refine every
+                position on its own, which the screening does not, so they are replaced by the midpoint rule
+            order : int, optional
+                The number of nodes of the Gauss-Legendre rule; default is the selected option or 10
+            max_memory : int, optional
+                Upper bound in bytes of the intermediate arrays; determines the number of grid points per chunk
+
+    Returns:
+            list of tuples (name, Delta_E)
+                the energy differences of all targets, ranked from lowest to highest
+
+    """
+    rho, v_A = reference
+    points, weights = grid
+    points = np.asarray(points, dtype=float)
+    if points.ndim == 1:
+        points = points[:, None]
+    weights = np.asarray(weights, dtype=float)
+    if not callable(rho):
+        rho = np.asarray(rho, dtype=float)
+    if plan is None and A is not None:
+        if rule is None:
+            rule, options = get_quadrature()
+            if rule not in FIXED_RULES:
+                rule, options = 'midpoint', {}
+            order = options.get('order') if order is None else order
+        plan = transform_plan(A, b, rtol, rule, order)
+    if plan is None:
+        nodes = [(1.0, None)]
+    else:
+        nodes = [(plan.weights[i], i) for i in range(plan.steps)]
+
+    # targets are either all potentials v_B or all nuclear charges, given as numbers or Coulomb_3D molecules
+    kinds = {callable(target) and not isinstance(target, Coulomb_3D) for target in targets}
+    if len(kinds) > 1:
+        raise ValueError("The targets must be all charges/Coulomb_3D or all callables!")
+    coulomb = kinds == {False}
+    if coulomb and not isinstance(v_A, Coulomb_3D):
+        raise ValueError("Targets of nuclear charges need a Coulomb_3D potential of the reference!")
+
+    # bring the targets into the form of a charge matrix if possible
+    if coulomb:
+        mol = np.asarray(v_A.mol, dtype=float)
+        for target in targets:
+            if isinstance(target, Coulomb_3D):
+                R = np.asarray(target.mol, dtype=float)[:, 1:]
+                if R.shape != mol[:, 1:].shape or not np.allclose(R, mol[:, 1:]):
+                    raise ValueError("The Coulomb_3D targets must have the geometry of the reference!")
+        charges = np.array([np.asarray(target.mol, dtype=float)[:, 0] if isinstance(target, Coulomb_3D)
+                            else np.asarray(target, dtype=float) for target in targets])
+        if charges.ndim != 2 or charges.shape[1] != len(mol):
+            raise ValueError("The targets must be nuclear charges of all " + str(len(mol)) + " atoms of the reference!")
+        Delta_Z = charges - mol[:, 0]
+        n_columns = len(mol)
+    else:
+        if isinstance(v_A, Coulomb_3D):
+            v_A = v_A.v
+        if not callable(v_A):
+            raise ValueError("The potential of the reference must be a Coulomb_3D or a callable!")
+        n_columns = len(targets)
+    # the Coulomb columns need the distance vectors to every nucleus
+    chunk_size = max(1, int(max_memory//(8*(4*n_columns + points.shape[1] + 3))))
+
+    # accumulate per nucleus (Coulomb targets) or per target (generic targets)
+    totals = np.zeros(n_columns)
+    for start in range(0, len(points), chunk_size):
+        X = points[start:start + chunk_size]
+        rho_X = rho(X) if callable(rho) else rho[start:start + chunk_size]
+        w_rho = weights[start:start + chunk_size]*rho_X
+        for weight, i in nodes:
+            Y = X if i is None else plan.transform(i, X)
+            if coulomb:
+                totals += weight*(w_rho @ _coulomb_columns(mol, Y))
+            else:
+                v_A_Y = v_A(Y)
+                totals += weight*np.array([w_rho @ (v_B(Y) - v_A_Y) for v_B in targets])
+    Delta_E = Delta_Z @ totals if coulomb else totals
+
+    if names is None:
+        names = list(range(len(Delta_E)))
+    order = np.argsort(Delta_E, kind='stable')
+    return [(names[j], float(Delta_E[j])) for j in order]
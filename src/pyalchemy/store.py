@@ -0,0 +1,205 @@
+"""
+A module which provides a persistent store of the quantities of initial systems
+which are the same in every job against them: the grid points, the weights, the
+density rho_A and optionally the potential v_A at all grid points.
+
+Every reference is a directory of ``.npy`` files and a JSON manifest, named by
+the SHA-256 hash of its content. It is written once and then opened read-only
+with ``np.memmap``, so any number of processes share the same pages, the
+integrators read it without copying, and grids larger than the memory are
+processed chunk by chunk.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+# Version of the layout of the references; part of the manifest
+_version = 1
+
+
+class Reference:
+    """
+    A stored initial system, opened read-only with memory maps.
+
+    Attributes:
+            key : str
+                The content hash of the reference
+            path : str
+                The directory of the reference
+            points : memmap of shape (N, n)
+                The grid points
+            weights, rho : memmaps of shape (N,)
+                The weights of the grid and the density at all grid points
+            v_A : memmap of shape (N,) or None
+                The potential at all grid points, if stored
+            metadata : dict
+                The metadata given when the reference was stored
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'manifest.json')) as file:
+            manifest = json.load(file)
+        self.key = manifest['key']
+        self.metadata = manifest['metadata']
+        self.n_points = manifest['n_points']
+        arrays = {name: np.load(os.path.join(path, entry['file']), mmap_mode='r')
+                  for name, entry in manifest['arrays'].items()}
+        self.points, self.weights, self.rho = arrays['points'], arrays['weights'], arrays['rho']
+        self.v_A = arrays.get('v_A')
+
+    @property
+    def grid(self):
+        return self.points, self.weights
+
+    def __repr__(self):
+        return 'Reference(' + repr(self.key) + ', n_points=' + str(self.n_points) + ')'
+
+
+class ReferenceStore:
+    """
+    A directory of references, e.g. on a file system which is shared by all jobs of a screening campaign.
+
+        store = ReferenceStore('references')
+        key = store.put(points, weights, rho, v_A=molecule.v, metadata={'name': 'N2'})
+        ...
+        reference = store.open(key)  # in every job
+        delta_E(reference.rho, kernel, reference.points, reference.weights)
+
+    Parameters:
+            directory : str
+                The directory of the store; it is created if it does not exist
+            max_memory : int, optional
+                Upper bound in bytes of the chunks in which arrays are written and hashed
+    """
+
+    def __init__(self, directory, max_memory=2**27):
+        self.directory = directory
+        self.max_memory = int(max_memory)
+        os.makedirs(directory, exist_ok=True)
+
+    def keys(self):
+        """
+        Return the keys of all references in the store.
+        """
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.exists(os.path.join(self.directory, name, 'manifest.json')))
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self.directory, key, 'manifest.json'))
+
+    def find(self, **metadata):
+        """
+        Return the keys of all references whose metadata contain the given items, e.g. ``find(name='N2')``.
+        """
+        keys = []
+        for key in self.keys():
+            with open(os.path.join(self.directory, key, 'manifest.json')) as file:
+                stored = json.load(file)['metadata']
+            if all(stored.get(name) == value for name, value in metadata.items()):
+                keys.append(key)
+        return keys
+
+    def open(self, key):
+        """
+        Return the reference with the given key, opened read-only.
+        """
+        if key not in self:
+            raise KeyError("There is no reference " + str(key) + " in " + str(self.directory) + "!")
+        return Reference(os.path.join(self.directory, key))
+
+    def remove(self, key):
+        """
+        Delete the reference with the given key.
+        """
+        shutil.rmtree(os.path.join(self.directory, key))
+
+    def put(self, points, weights, rho, v_A=None, metadata=None):
+        """
+        Store a reference and return its key. The arrays are written and hashed in chunks, so they may be memory
+        maps of any size, and ``rho`` and ``v_A`` may be callables which are evaluated chunk by chunk. Storing
+        the same content again returns the same key and keeps the stored arrays; the given metadata are merged
+        into the stored ones, replacing the values of the same names, such that ``find()`` sees them.
+
+        Parameters:
+                points : array of shape (N, n)
+                    The grid points
+                weights : array of shape (N,)
+                    The weights of the grid
+                rho : callable or array of shape (N,)
+                    The density, a callable which takes an array of shape (M, n) of positions, e.g. a
+                    ``pyalchemy.densities.DensityProvider``, or its values at all grid points
+                v_A : callable or array of shape (N,), optional
+                    The potential, e.g. ``Coulomb_3D(mol).v``, or its values at all grid points
+                metadata : dict, optional
+                    JSON-serializable information on the reference, e.g. its name, method and basis
+
+        Returns:
+                str
+                    the key of the reference
+        """
+        points = np.asarray(points)
+        if points.ndim == 1:
+            points = points[:, None]
+        n_points, dim = points.shape
+        sources = {'points': points, 'weights': weights, 'rho': rho}
+        if v_A is not None:
+            sources['v_A'] = v_A
+        for name, source in sources.items():
+            if not callable(source) and len(source) != n_points:
+                raise ValueError("The number of values of " + name + " does not match the number of grid points!")
+
+        temporary = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        try:
+            files = {name: np.lib.format.open_memmap(os.path.join(temporary, name + '.npy'), mode='w+', dtype=float,
+                                                     shape=(n_points, dim) if name == 'points' else (n_points,))
+                     for name in sources}
+            chunk_size = max(1, self.max_memory//(8*(dim + 3)))
+            hashes = {name: hashlib.sha256(str(files[name].shape).encode()) for name in sources}
+            for start in range(0, n_points, chunk_size):
+                X = np.asarray(points[start:start + chunk_size], dtype=float)
+                for name, source in sources.items():
+                    values = source(X) if callable(source) else source[start:start + chunk_size]
+                    files[name][start:start + chunk_size] = values
+                    hashes[name].update(np.ascontiguousarray(files[name][start:start + chunk_size]).tobytes())
+            for array in files.values():
+                array.flush()
+            del files
+
+            key = hashlib.sha256(''.join(name + hashes[name].hexdigest() for name in sorted(hashes)).encode()).hexdigest()
+            manifest = {'version': _version, 'key': key, 'n_points': n_points, 'dim': dim, 'metadata': metadata or {},
+                        'arrays': {name: {'file': name + '.npy', 'sha256': hashes[name].hexdigest()} for name in sources}}
+            with open(os.path.join(temporary, 'manifest.json'), 'w') as file:
+                json.dump(manifest, file, indent=1)
+            # mkdtemp creates the directory for the owner only; references are shared with other users
+            os.chmod(temporary, 0o755)
+            # renaming the complete directory makes it visible to other processes at once
+            if key not in self:
+                try:
+                    os.rename(temporary, os.path.join(self.directory, key))
+                    return key
+                except OSError:
+                    # stored concurrently by another process
+                    if key not in self:
+                        raise
+            stored = os.path.join(self.directory, key, 'manifest.json')
+            with open(stored) as file:
+                manifest = json.load(file)
+            if metadata and any(manifest['metadata'].get(name) != value for name, value in metadata.items()):
+                manifest['metadata'].update(metadata)
+                # replacing the manifest by a complete new file is atomic for readers, too
+                with open(os.path.join(temporary, 'manifest.json'), 'w') as file:
+                    json.dump(manifest, file, indent=1)
+                os.replace(os.path.join(temporary, 'manifest.json'), stored)
+            return key
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
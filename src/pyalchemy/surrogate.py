@@ -0,0 +1,131 @@
+"""
+A module which provides surrogates of one-dimensional kernels, i.e. piecewise
+Chebyshev interpolants which are built once per pair of potentials and then
+evaluated at any number of positions for any number of densities.
+
+The interval is bisected adaptively until the interpolant of every piece
+agrees with the kernel within the tolerance at check points between its nodes,
+such that the error of the surrogate is measured, not assumed.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+import numpy as np
+
+
+def _chebyshev_coefficients(values):
+    # coefficients of the interpolant at the Chebyshev extrema cos(pi j/d), j = 0, ..., d
+    d = len(values) - 1
+    c = np.fft.rfft(np.concatenate([values, values[-2:0:-1]])).real/d
+    c[0] /= 2
+    c[d] /= 2
+    return c[:d+1]
+
+
+def _clenshaw(coefficients, t, index):
+    # sum_k c_k T_k(t) with the coefficients of the piece ``index`` of every position
+    b_1, b_2 = np.zeros_like(t), np.zeros_like(t)
+    for k in range(coefficients.shape[1] - 1, 0, -1):
+        b_1, b_2 = coefficients[index, k] + 2*t*b_1 - b_2, b_1
+    return coefficients[index, 0] + t*b_1 - b_2
+
+
+class KernelSurrogate:
+    """
+    A piecewise Chebyshev interpolant of a kernel on an interval, e.g. of ``kernel_nD_batch`` in 1D for one
+    pair of potentials, which is reused for all densities and grids paired with that transmutation.
+
+        surrogate = KernelSurrogate(lambda x: kernel_nD_batch(Delta_v, x[:, None], A, b), -30, 70)
+        Delta_E = delta_E(rho, surrogate, grid_points, weights)
+
+    Every piece is interpolated at ``degree + 1`` Chebyshev points and accepted if the interpolant deviates
+    from the kernel by at most ``atol + rtol*max|K|``, with the largest magnitude of the kernel on the piece, at
+    the ``degree`` points between them and its two highest coefficients are below this tolerance; otherwise it
+    is bisected. The tolerance is local: pieces are short where the kernel is small and may be long where it
+    grows by orders of magnitude, e.g. towards the repulsive wall of the Morse potential, where the error is
+    relative to the largest value on the piece.
+
+    Parameters:
+            kernel : callable
+                The kernel, a function of an array of shape (N,) of positions which returns an array of shape (N,),
+                or of a single position if not ``vectorized``
+            a, b : float
+                The interval
+            rtol : float, optional
+                The tolerance relative to the largest magnitude of the kernel on every piece
+            atol : float, optional
+                The absolute tolerance
+            degree : int, optional
+                The degree of the Chebyshev interpolant of every piece
+            max_intervals : int, optional
+                The largest number of pieces; if it is reached, ``certified`` is ``False``
+            vectorized : bool, optional
+                Whether the kernel takes arrays of positions. Default is ``True``
+
+    Attributes:
+            breakpoints : array of shape (M+1,)
+                The bounds of the M pieces
+            coefficients : array of shape (M, degree+1)
+                The Chebyshev coefficients of every piece
+            errors : array of shape (M,)
+                The deviation from the kernel at the check points of every piece
+            certified : bool
+                Whether all pieces are within the tolerance
+            evaluations : int
+                The number of evaluations of the kernel
+    """
+
+    def __init__(self, kernel, a, b, rtol=1e-8, atol=1e-12, degree=32, max_intervals=256, vectorized=True):
+        if not a < b:
+            raise ValueError("The interval must satisfy a < b!")
+        self.a, self.b = float(a), float(b)
+        self.rtol, self.atol = float(rtol), float(atol)
+        self.degree = int(degree)
+        self.evaluations = 0
+        nodes = np.cos(np.pi*np.arange(self.degree + 1)/self.degree)
+        checks = np.cos(np.pi*(np.arange(self.degree) + 0.5)/self.degree)
+
+        def evaluate(x):
+            self.evaluations += len(x)
+            if vectorized:
+                return np.asarray(kernel(x), dtype=float).reshape(len(x))
+            return np.array([kernel(x_i) for x_i in x], dtype=float)
+
+        # pieces (lower, upper, coefficients, error, tolerance)
+        pending, pieces = [(self.a, self.b)], []
+        while pending:
+            lower, upper = pending.pop()
+            half, middle = (upper - lower)/2, (upper + lower)/2
+            values = evaluate(middle + half*nodes)
+            checked = evaluate(middle + half*checks)
+            tolerance = self.atol + self.rtol*max(np.max(np.abs(values)), np.max(np.abs(checked)))
+            coefficients = _chebyshev_coefficients(values)
+            error = max(np.max(np.abs(_clenshaw(coefficients[None, :], checks, np.zeros(self.degree, dtype=int))
+                                      - checked)), np.abs(coefficients[-2:]).max())
+            if not np.isfinite(error):
+                error = np.inf
+            if not error <= tolerance and len(pieces) + len(pending) + 2 <= max_intervals:
+                pending += [(middle, upper), (lower, middle)]
+                continue
+            pieces.append((lower, upper, coefficients, error, tolerance))
+
+        pieces.sort(key=lambda piece: piece[0])
+        self.breakpoints = np.array([piece[0] for piece in pieces] + [self.b])
+        self.coefficients = np.array([piece[2] for piece in pieces])
+        self.errors = np.array([piece[3] for piece in pieces])
+        self.certified = bool(all(piece[3] <= piece[4] for piece in pieces))
+
+    def __call__(self, x):
+        """
+        Return the surrogate of the kernel at x, a float or an array of the shape of x; an array of
+        shape (N, 1) of positions, as passed by ``delta_E()``, gives an array of shape (N,).
+        """
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 2 and x.shape[1] == 1:
+            x = x[:, 0]
+        if np.any(x < self.a) or np.any(x > self.b):
+            raise ValueError("The surrogate is only defined on [" + str(self.a) + ", " + str(self.b) + "]!")
+        index = np.clip(np.searchsorted(self.breakpoints, x, side='right') - 1, 0, len(self.coefficients) - 1)
+        lower, upper = self.breakpoints[index], self.breakpoints[index + 1]
+        return _clenshaw(self.coefficients, (2*x - lower - upper)/(upper - lower), index)[()]
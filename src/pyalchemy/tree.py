@@ -0,0 +1,148 @@
+"""
+A module which provides a Barnes-Hut octree of the nuclei of a molecule for the
+evaluation of its Coulomb potential on large grids.
+
+The grid is split into cells. For every cell the tree is traversed once: groups
+of nuclei which are far from the whole cell, i.e. whose size is smaller than
+``theta`` times their distance, are replaced by their total charge at their
+center of charge, all other nuclei are kept. Since the dipole moment vanishes at
+the center of charge, the relative error of a group is of the order theta^2/4
+for positive nuclear charges.
+
+Throughout this code, Hartree atomic units are used.
+
+"""
+
+from collections import deque
+
+import numpy as np
+
+
+def _ranges(starts, counts):
+    # concatenation of the integer ranges [start, start + count)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + np.arange(counts.sum()) - offsets
+
+
+class CoulombTree:
+    """
+    A Barnes-Hut octree of the nuclei of a molecule.
+
+    Parameters:
+            mol : array of shape (N_atoms, 4)
+                Nuclear charges and coordinates of all atoms, i.e. ``[[Z_1, x_1, y_1, z_1], ...]``
+            theta : float, optional
+                The opening angle: a group of nuclei of size s at a distance d from a cell of the grid
+                is replaced by its total charge if s < theta*d. Smaller is more accurate, 0 is exact
+            leaf_size : int, optional
+                The largest number of nuclei in a leaf of the tree
+
+    Attributes:
+            mol : array of shape (N_atoms, 4)
+                A copy of the molecule of the tree
+            charges : array of shape (N_nodes,)
+                The total charge of every node
+            centers : array of shape (N_nodes, 3)
+                The center of charge of every node
+            sizes : array of shape (N_nodes,)
+                The diameter of every node around its center of charge
+    """
+
+    def __init__(self, mol, theta=0.5, leaf_size=16):
+        if theta < 0:
+            raise ValueError("The opening angle theta must not be negative!")
+        self.mol = np.array(mol, dtype=float).reshape(-1, 4)
+        self.theta = float(theta)
+        self.leaf_size = max(1, int(leaf_size))
+        # the nodes are numbered breadth first, so the children of a node have consecutive numbers,
+        # and the atoms are sorted such that the atoms of every node are consecutive
+        order = np.arange(len(self.mol))
+        charges, centers, sizes, first_child, n_children, first_atom, n_atoms = [], [], [], [], [], [], []
+        queue = deque([(0, len(self.mol))])
+        while queue:
+            start, stop = queue.popleft()
+            Z, R = self.mol[order[start:stop], 0], self.mol[order[start:stop], 1:]
+            # the absolute charges weight the center, so that it is defined for any charges
+            weights = np.abs(Z) if np.abs(Z).sum() > 0 else np.ones(len(Z))
+            center = weights @ R/weights.sum() if len(Z) else np.zeros(3)
+            charges.append(Z.sum())
+            centers.append(center)
+            sizes.append(2*np.sqrt(np.max(np.sum((R - center)**2, axis=1))) if len(Z) else 0.0)
+            first_atom.append(start)
+            n_atoms.append(stop - start)
+            first_child.append(len(charges) + len(queue))
+            lo, hi = (R.min(axis=0), R.max(axis=0)) if len(Z) else (0, 0)
+            if stop - start <= self.leaf_size or np.all(hi == lo):
+                n_children.append(0)
+                continue
+            # split into the octants of the bounding box
+            octant = (R > (lo + hi)/2) @ np.array([1, 2, 4])
+            sort = np.argsort(octant, kind='stable')
+            order[start:stop] = order[start:stop][sort]
+            bounds = start + np.concatenate([[0], np.flatnonzero(np.diff(octant[sort])) + 1, [stop - start]])
+            n_children.append(len(bounds) - 1)
+            queue.extend(zip(bounds[:-1], bounds[1:]))
+        self.charges = np.array(charges)
+        self.centers = np.array(centers).reshape(-1, 3)
+        self.sizes = np.array(sizes)
+        self._sorted = self.mol[order]
+        self._first_child, self._n_children = np.array(first_child), np.array(n_children)
+        self._first_atom, self._n_atoms = np.array(first_atom), np.array(n_atoms)
+
+    def sources(self, center, radius):
+        """
+        The nuclei and groups of nuclei which act on all positions within a sphere.
+
+        Parameters:
+                center : array of shape (3,)
+                    The center of the sphere
+                radius : float
+                    Its radius
+
+        Returns:
+                array of shape (M, 4)
+                    Charges and coordinates of the nuclei which are near the sphere, followed by the
+                    total charges and centers of charge of the groups which are far from it
+        """
+        near, far = [], []
+        # traverse the tree level by level
+        nodes = np.zeros(1, dtype=int)
+        while len(nodes):
+            distance = np.linalg.norm(self.centers[nodes] - center, axis=1) - radius
+            accepted = (distance > 0) & (self.sizes[nodes] < self.theta*distance)
+            far.append(nodes[accepted])
+            nodes = nodes[~accepted]
+            leaf = self._n_children[nodes] == 0
+            near.append(nodes[leaf])
+            nodes = _ranges(self._first_child[nodes[~leaf]], self._n_children[nodes[~leaf]])
+        far, near = np.concatenate(far), np.concatenate(near)
+        atoms = self._sorted[_ranges(self._first_atom[near], self._n_atoms[near])]
+        return np.vstack([atoms, np.column_stack([self.charges[far], self.centers[far]])])
+
+    def partition(self, points, points_per_cell=256):
+        """
+        Split positions into cubic cells and yield the sources of every cell (see ``sources``).
+
+        Parameters:
+                points : array of shape (N, 3)
+                    The positions, e.g. all points of a grid
+                points_per_cell : int, optional
+                    The average number of positions per cell
+
+        Returns:
+                generator of tuples (members, sources)
+                    the indices of the positions in a cell and the sources which act on them
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if len(points) == 0:
+            return
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        n_side = max(1, int(np.ceil((len(points)/points_per_cell)**(1/3))))
+        width = np.maximum((hi - lo)/n_side, np.finfo(float).tiny)
+        cells = np.minimum(((points - lo)/width).astype(int), n_side - 1) @ np.array([1, n_side, n_side**2])
+        order = np.argsort(cells, kind='stable')
+        bounds = np.flatnonzero(np.diff(cells[order])) + 1
+        for members in np.split(order, bounds):
+            cell = points[members]
+            cell_lo, cell_hi = cell.min(axis=0), cell.max(axis=0)
+            yield members, self.sources((cell_lo + cell_hi)/2, np.linalg.norm(cell_hi - cell_lo)/2)
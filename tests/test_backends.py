@@ -0,0 +1,59 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from pyalchemy import backends
+from pyalchemy.kernels import kernel_nD_batch, transform_plan
+from pyalchemy.potentials import Coulomb_3D
+
+
+def test_fallback_warns_without_numba(monkeypatch):
+    monkeypatch.setattr(backends, 'numba', None)
+    with pytest.warns(RuntimeWarning, match='numba is not installed'):
+        assert backends.resolve_backend('numba') == 'numpy'
+    assert backends.available() == ('numpy',)
+    # asking for NumPy is silent
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert backends.resolve_backend(None) == 'numpy'
+        assert backends.resolve_backend('numpy') == 'numpy'
+    with pytest.raises(ValueError):
+        backends.resolve_backend('cython')
+
+
+def test_fixed_rule_sum_matches_numpy():
+    numba = pytest.importorskip('numba')
+
+    @numba.njit
+    def Delta_v_single(y):
+        return np.exp(-y[0]**2 - 0.5*y[1]**2)
+
+    def Delta_v(Y):
+        return np.exp(-Y[:, 0]**2 - 0.5*Y[:, 1]**2)
+
+    def A(lam):
+        return np.array([[1 + lam, 0.2*lam], [0.0, 1 - 0.3*lam]])
+
+    def b(lam):
+        return np.array([0.1*lam, -0.2*lam])
+
+    X = np.random.default_rng(0).uniform(-2, 2, size=(50, 2))
+    for rule in ['midpoint', 'gauss-legendre']:
+        plan = transform_plan(A, b, 1e-6, rule)
+        expected, expected_error, _ = kernel_nD_batch(Delta_v, X, plan=plan, full_output=True)
+        integral, error = backends.fixed_rule_sum(Delta_v_single, plan, X)
+        assert integral == pytest.approx(expected, rel=1e-12, abs=1e-14)
+        np.testing.assert_allclose(error, expected_error, rtol=1e-10, atol=1e-14)
+        assert np.array_equal(kernel_nD_batch(Delta_v_single, X, plan=plan, backend='numba'), integral)
+
+
+def test_coulomb_sum_matches_numpy():
+    pytest.importorskip('numba')
+    mol = [[7, 0, 0, 0], [8, 1.1, 0.3, -0.2], [1, -0.9, 1.2, 0.4]]
+    r = np.random.default_rng(1).uniform(-3, 3, size=(4, 25, 3))
+    expected = Coulomb_3D(mol).v(r)
+    assert backends.coulomb_sum(np.array(mol, dtype=float), r.reshape(-1, 3)).reshape(4, 25) == pytest.approx(expected, rel=1e-12)
+    assert Coulomb_3D(mol).v(r, backend='numba') == pytest.approx(expected, rel=1e-12)
+    # -inf at the nuclei, like NumPy
+    assert Coulomb_3D(mol).v(np.array(mol, dtype=float)[:, 1:], backend='numba').tolist() == [-np.inf]*3
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from pyalchemy.densities import DensityProvider, GaussianDensity, cartesian_components
+from pyalchemy.grids import molecular_grid
+
+CENTER = np.array([0.3, -0.2, 0.5])
+
+
+def shell(l, center=CENTER):
+    # a contraction of two primitives
+    return l, center, [2.5, 0.6], [0.4, 0.7]
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return molecular_grid([[1, *CENTER]], 6, cache=False)
+
+
+@pytest.mark.parametrize('l', [0, 1, 2])
+def test_normalization(grid, l):
+    points, weights = grid
+    n = len(cartesian_components(l))
+    rho = GaussianDensity([shell(l)], np.eye(n))
+    # every component is normalized; for l = 2 the components are not orthogonal
+    chi = rho.orbitals(points)
+    assert weights @ chi**2 == pytest.approx(np.ones(n), rel=1e-6)
+    assert weights @ rho(points) == pytest.approx(n, rel=1e-6)
+
+
+def test_cutoff_radius():
+    shells = [shell(0), shell(1, CENTER + 1), shell(2, CENTER - 1)]
+    cutoff = 1e-6
+    rho = GaussianDensity(shells, np.eye(1 + 3 + 6), cutoff=cutoff)
+    exact = GaussianDensity(shells, np.eye(1 + 3 + 6), cutoff=1e-300)
+    assert np.all(rho.radii < exact.radii)
+    points = np.random.default_rng(0).uniform(-6, 6, size=(20000, 3))
+    chi, chi_exact = rho.orbitals(points), exact.orbitals(points)
+    # the functions are dropped only where they are below the cutoff
+    assert np.max(np.abs(chi - chi_exact)) <= cutoff
+    # and beyond the radius of their shell
+    for (l, center, *_), radius, offset in zip(rho.shells, rho.radii, rho._offsets):
+        outside = np.linalg.norm(points - center, axis=1) > radius
+        n = len(cartesian_components(l))
+        assert np.all(chi[outside, offset:offset + n] == 0)
+        assert np.any(chi[~outside, offset:offset + n] != 0)
+
+
+def test_save_load_and_chunks(tmp_path):
+    shells = [shell(0), shell(1, CENTER + 1), shell(2, CENTER - 1), (0, CENTER + [0, 0, 2], 1.3, 1.0)]
+    dm = np.random.default_rng(1).normal(size=(11, 11))
+    dm = dm @ dm.T
+    rho = GaussianDensity(shells, dm)
+    points = np.random.default_rng(2).uniform(-3, 3, size=(1000, 3))
+    expected = rho(points)
+    assert np.all(expected > 0)
+
+    rho.save(str(tmp_path/'rho.npz'))
+    loaded = GaussianDensity.load(str(tmp_path/'rho.npz'), chunk_size=7)
+    assert loaded.chunk_size == 7 and loaded.n_ao == 11
+    assert np.array_equal(loaded.dm, dm)
+    assert loaded(points) == pytest.approx(expected, rel=1e-12)
+    # a single position
+    assert loaded(points[3]) == pytest.approx(expected[3:4], rel=1e-12)
+    with pytest.raises(ValueError):
+        GaussianDensity(shells, dm[:10, :10])
+
+
+def test_chunks_of_provider():
+    class Recorder(DensityProvider):
+        def __init__(self):
+            super().__init__(chunk_size=4)
+            self.sizes = []
+
+        def evaluate(self, points):
+            self.sizes.append(len(points))
+            return points.sum(axis=1)
+
+    rho = Recorder()
+    points = np.arange(30.0).reshape(10, 3)
+    assert np.array_equal(rho(points), points.sum(axis=1))
+    assert rho.sizes == [4, 4, 2]
+
+    # evaluate is abstract
+    class Incomplete(DensityProvider):
+        pass
+
+    for cls in (DensityProvider, Incomplete):
+        with pytest.raises(TypeError):
+            cls()
+
+
+@pytest.mark.parametrize('cart', [False, True])
+def test_from_pyscf(cart):
+    pyscf = pytest.importorskip('pyscf')
+    from pyscf import dft, scf
+    mol = pyscf.gto.M(atom='O 0 0 0; H 0 0.76 0.59; H 0 -0.76 0.59', basis='cc-pvdz', cart=cart, verbose=0)
+    dm = scf.RHF(mol).run().make_rdm1()
+    points, weights = molecular_grid(np.column_stack([mol.atom_charges(), mol.atom_coords()]), 4, cache=False)
+    expected = dft.numint.eval_rho(mol, dft.numint.eval_ao(mol, points), dm)
+    rho = GaussianDensity.from_pyscf(mol, dm, cutoff=1e-14)
+    assert rho(points) == pytest.approx(expected, rel=1e-8, abs=1e-12)
+    assert weights @ rho(points) == pytest.approx(10, rel=1e-4)
@@ -0,0 +1,103 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from pyalchemy import grids
+from pyalchemy.grids import RADIAL_POINTS, _period, _radial, molecular_grid, reduced_grid
+
+
+@pytest.fixture(autouse=True)
+def grid_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYALCHEMY_GRID_CACHE', str(tmp_path))
+    monkeypatch.setattr(grids, '_memory', OrderedDict())
+
+
+@pytest.mark.parametrize('mol', [[[7, 0, 0, 0]], [[7, 0, 0, 0], [8, 1.2, 0.3, -0.4], [1, 0, 2, 0]]])
+def test_unknown_symmetry(mol):
+    # the string is checked before any grid is built, also for molecules without symmetry
+    with pytest.raises(ValueError):
+        reduced_grid(mol, 1, symmetry='cylindrical')
+
+
+def test_no_symmetry():
+    mol = [[1, 0, 0, 0], [1, 1.4, 0, 0]]
+    for reduced, full in zip(reduced_grid(mol, 1, symmetry='none'), molecular_grid(mol, 1)):
+        assert np.array_equal(reduced, full)
+
+
+@pytest.mark.parametrize('Z_A, Z_B', [(1, 3), (3, 1), (9, 11)])
+def test_spherical_radial_grid_of_all_nuclei(Z_A, Z_B):
+    # e.g. H -> Li needs the points and the extent of Li
+    points, weights = reduced_grid([[Z_A, 0, 0, 0]], 2, others=[[[Z_B, 0, 0, 0]]])
+    n = max(RADIAL_POINTS[2, _period(Z)] for Z in (Z_A, Z_B))
+    r = max((_radial(Z, n)[0] for Z in (Z_A, Z_B)), key=lambda r: r[-1])
+    assert np.array_equal(points[:, 2], r)
+    assert len(weights) == n
+
+
+def no_build(*args):
+    raise AssertionError('the grid was built again')
+
+
+def test_disk_cache_hit_and_miss(tmp_path, monkeypatch):
+    mol = [[1, 0, 0, 0], [9, 0, 0, 1.7]]
+    points, weights = molecular_grid(mol, 0)
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith('.npz')
+    # readable by other users, like the references of pyalchemy.store
+    assert os.stat(tmp_path/files[0]).st_mode & 0o777 == 0o644
+
+    # a new process finds the file, but not for another level or geometry
+    monkeypatch.setattr(grids, '_memory', OrderedDict())
+    monkeypatch.setattr(grids, '_build', no_build)
+    cached = molecular_grid(mol, 0)
+    assert np.array_equal(cached[0], points) and np.array_equal(cached[1], weights)
+    assert not cached[0].flags.writeable
+    for other in [(mol, 1), ([[1, 0, 0, 0], [9, 0, 0, 1.8]], 0)]:
+        with pytest.raises(AssertionError, match='built again'):
+            molecular_grid(*other)
+
+
+def test_corrupted_file_is_rebuilt(tmp_path, monkeypatch):
+    mol = [[1, 0, 0, 0], [9, 0, 0, 1.7]]
+    points, weights = molecular_grid(mol, 0)
+    path = tmp_path/os.listdir(tmp_path)[0]
+    with open(path, 'r+b') as file:
+        file.truncate(100)
+    monkeypatch.setattr(grids, '_memory', OrderedDict())
+    rebuilt = molecular_grid(mol, 0)
+    assert np.array_equal(rebuilt[0], points) and np.array_equal(rebuilt[1], weights)
+    # and the file is replaced
+    monkeypatch.setattr(grids, '_memory', OrderedDict())
+    monkeypatch.setattr(grids, '_build', no_build)
+    assert np.array_equal(molecular_grid(mol, 0)[1], weights)
+
+
+def test_memory_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(grids, '_memory_size', 2)
+    mols = [[[Z, 0, 0, 0]] for Z in (1, 2, 3)]
+    first = molecular_grid(mols[0], 0)
+    assert molecular_grid(mols[0], 0) is first
+    molecular_grid(mols[1], 0)
+    # the first grid was used last, so the second one is dropped
+    molecular_grid(mols[0], 0)
+    molecular_grid(mols[2], 0)
+    assert len(grids._memory) == 2
+    for file in os.listdir(tmp_path):
+        os.remove(tmp_path/file)
+    monkeypatch.setattr(grids, '_build', no_build)
+    assert molecular_grid(mols[0], 0) is first
+    with pytest.raises(AssertionError, match='built again'):
+        molecular_grid(mols[1], 0)
+
+
+def test_without_cache(tmp_path):
+    mol = [[1, 0, 0, 0], [9, 0, 0, 1.7]]
+    grid = molecular_grid(mol, 0, cache=False)
+    assert os.listdir(tmp_path) == [] and len(grids._memory) == 0
+    cached = molecular_grid(mol, 0)
+    assert cached is not grid and np.array_equal(cached[1], grid[1])
+    # neither is read without the cache
+    assert molecular_grid(mol, 0, cache=False) is not cached
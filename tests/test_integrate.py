@@ -0,0 +1,111 @@
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from pyalchemy import integrate
+from pyalchemy.grids import molecular_grid
+from pyalchemy.integrate import delta_E, screen_grid
+from pyalchemy.potentials import Coulomb_3D
+from pyalchemy.screening import coulomb_bound
+
+N_2, NO = [[7, 0, 0, 0], [7, 2.076, 0, 0]], [[7, 0, 0, 0], [8, 2.076, 0, 0]]
+
+
+def rho(X):
+    return sum(Z**4/(8*np.pi)*np.exp(-Z*np.linalg.norm(X - R, axis=1)) for Z, *R in N_2)
+
+
+def kernel(X):
+    return Coulomb_3D(NO).v(X) - Coulomb_3D(N_2).v(X)
+
+
+def failing_kernel(X):
+    raise RuntimeError("kernel failed")
+
+
+def nested_kernel(X):
+    # a kernel which integrates itself, e.g. a self-consistent correction
+    delta_E(np.ones(10), kernel, np.linspace(1, 2, 30).reshape(10, 3), np.ones(10), workers=1, chunk_size=3)
+    return kernel(X)
+
+
+def grid(N=20000):
+    rng = np.random.default_rng(0)
+    return rng.uniform(-4, 4, size=(N, 3)), rng.uniform(0, 1e-3, size=N)
+
+
+@pytest.mark.parametrize('memmap', [False, True])
+def test_delta_E_workers_agree(tmp_path, memmap):
+    points, weights = grid()
+    if memmap:
+        # memory-mapped arrays are passed to the workers by file name
+        stored = np.lib.format.open_memmap(str(tmp_path / 'points.npy'), mode='w+', dtype=float, shape=points.shape)
+        stored[...] = points
+        stored.flush()
+        points = np.load(str(tmp_path / 'points.npy'), mmap_mode='r')
+    serial = delta_E(rho, kernel, points, weights, workers=1, chunk_size=1000)
+    # the chunks are summed exactly, so the result does not depend on the number of workers
+    assert delta_E(rho, kernel, points, weights, workers=2, chunk_size=1000) == serial
+    assert delta_E(rho(points), kernel, points, weights, workers=2, chunk_size=1000) == serial
+
+
+def test_delta_E_nested_and_concurrent_calls():
+    points, weights = grid(5000)
+    expected = delta_E(rho, kernel, points, weights, workers=1, chunk_size=500)
+    assert delta_E(rho, nested_kernel, points, weights, workers=1, chunk_size=500) == expected
+    results = [None]*4
+
+    def run(i):
+        results[i] = delta_E(rho, kernel, points[i:], weights[i:], workers=1, chunk_size=500)
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [delta_E(rho, kernel, points[i:], weights[i:], workers=1, chunk_size=500) for i in range(4)]
+
+
+def test_delta_E_unlinks_shared_memory_after_failure(monkeypatch):
+    blocks, share = [], integrate._share
+
+    def recording_share(array):
+        blocks.append(share(array))
+        return blocks[-1]
+    monkeypatch.setattr(integrate, '_share', recording_share)
+    points, weights = grid(2000)
+    with pytest.raises(RuntimeError):
+        delta_E(rho, failing_kernel, points, weights, workers=2, chunk_size=500)
+    assert len(blocks) == 2
+    for block in blocks:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=block.name)
+
+
+@pytest.mark.parametrize('tol', [1e-3, 1e-6])
+@pytest.mark.parametrize('cell', [None, 0.5, 5.0])
+def test_screen_grid_within_tolerance(tol, cell):
+    points, weights = molecular_grid(N_2, 1, cache=False)
+    full = delta_E(rho, kernel, points, weights, workers=1)
+    kept, kept_weights, rho_values, report = screen_grid(points, weights, rho, tol,
+                                                         bound=coulomb_bound(N_2, [0, 1]), cell=cell)
+    assert report['error_bound'] <= tol
+    assert abs(delta_E(rho_values, kernel, kept, kept_weights, workers=1) - full) <= report['error_bound'] + 1e-12
+    assert report['kept'] + report['dropped'] == report['points']
+    assert report['kept'] < report['points']
+    # the points which were dropped, or moved into the coarse points at the end
+    coarse_weights = kept_weights[len(kept_weights) - report['coarse']:]
+    assert report['discarded_mass'] > 0
+    if cell is not None:
+        assert report['discarded_mass'] == pytest.approx(np.sum(coarse_weights))
+        assert np.all(rho_values[len(rho_values) - report['coarse']:] == 1)
+
+
+def test_screen_grid_needs_bound():
+    points, weights = molecular_grid(N_2, 1, cache=False)
+    with pytest.raises(ValueError, match='coulomb_bound'):
+        screen_grid(points, weights, rho, 1e-3)
+    # bound=1 bounds the number of electrons instead
+    kept, kept_weights, rho_values, report = screen_grid(points, weights, rho, 1e-3, bound=1)
+    assert abs(weights @ rho(points) - kept_weights @ rho_values) <= report['error_bound'] == report['discarded_mass'] <= 1e-3
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pyalchemy.kernels import kernel_nD, kernel_nD_batch, transform_plan
+
+
+def system(dim):
+    # a non-trivial affine transformation and a potential difference which is not separable
+    def Delta_v(X):
+        X = np.asarray(X)
+        return 0.22*np.sum(X**2, axis=-1) + np.sin(X[..., 0])
+
+    def A(lam):
+        return (1 + 0.2*lam)*np.eye(dim) + 0.05*lam*np.ones((dim, dim))
+
+    def b(lam):
+        return 0.1*lam*np.arange(dim)
+
+    return Delta_v, A, b
+
+
+@pytest.mark.parametrize('dim', [1, 2, 3])
+@pytest.mark.parametrize('rule', ['midpoint', 'gauss-legendre'])
+@pytest.mark.parametrize('rtol', [1e-3, 1e-6])
+def test_batch_equals_per_point(dim, rule, rtol):
+    Delta_v, A, b = system(dim)
+    X = np.random.default_rng(dim).uniform(-2, 2, size=(50, dim))
+    batch = kernel_nD_batch(Delta_v, X, A, b, rtol, rule=rule)
+    per_point = np.array([kernel_nD(Delta_v, x, A, b, rtol, rule=rule) for x in X])
+    assert np.array_equal(batch, per_point)
+
+
+@pytest.mark.parametrize('dim', [1, 2, 3])
+def test_kernel_averages_over_path(dim):
+    # for a translation b(lambda) = lambda*c and a linear Delta_v, K(x) = w.x - w.c/2 exactly
+    w, c = np.arange(1.0, dim + 1), np.full(dim, 0.3)
+    x = np.linspace(-1, 1, dim)
+    K = kernel_nD(lambda y: np.dot(w, y), x, lambda lam: np.eye(dim), lambda lam: lam*c, 1e-3)
+    assert K == pytest.approx(np.dot(w, x) - np.dot(w, c)/2, rel=1e-12)
+
+
+@pytest.mark.parametrize('dim', [1, 2, 3])
+def test_batch_equals_per_point_with_plan(dim):
+    Delta_v, A, b = system(dim)
+    plan = transform_plan(A, b, 1e-4)
+    X = np.random.default_rng(dim).uniform(-2, 2, size=(50, dim))
+    batch = kernel_nD_batch(Delta_v, X, plan=plan)
+    assert np.array_equal(batch, np.array([kernel_nD(Delta_v, x, plan=plan) for x in X]))
+    assert np.array_equal(batch, kernel_nD_batch(Delta_v, X, A, b, 1e-4))
+
+
+def test_transform_plan_is_cached_and_read_only():
+    Delta_v, A, b = system(2)
+    transform_plan.cache_clear()
+    plan = transform_plan(A, b, 1e-4)
+    assert transform_plan(A, b, 1e-4) is plan
+    assert transform_plan.cache_info().hits == 1
+    assert transform_plan(A, b, 1e-3) is not plan
+    # the kernels reuse the cached plan instead of setting up a new one
+    kernel_nD_batch(Delta_v, np.zeros((3, 2)), A, b, 1e-4)
+    assert transform_plan.cache_info().hits == 2
+    for array in (plan.A_inv, plan.offsets, plan.lambdas, plan.weights):
+        with pytest.raises(ValueError):
+            array[0] = 0
+    assert np.allclose(plan.A_inv @ np.array([A(lam) for lam in plan.lambdas]), np.eye(2))
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+from scipy.special import gammaln
+
+from pyalchemy.potentials import QHO, Coulomb_3D, CoulombColumns, Morse, _H, _L, _log_polynomial, _polynomials, hydlike
+
+
+@pytest.mark.parametrize('system', [QHO(10.0), Morse(22, 1.0, 0), hydlike(2.0)])
+@pytest.mark.parametrize('n', [1, 2, 5])
+def test_rho_of_scalar_position(system, n):
+    # scalar positions give scalars, equal to the value of a one-element array
+    value = system.rho(n, 1.0)
+    assert np.ndim(value) == 0
+    assert value == system.rho(n, np.array([1.0]))[0]
+
+
+def test_morse_potential():
+    # the potential itself: zero at the minimum r_e and D at the dissociation limit
+    morse = Morse(22, 1.3, 0.7)
+    x = np.linspace(-0.5, 20, 200)
+    assert np.allclose(morse.v(x), 22*(1 - np.exp(-1.3*(x - 0.7)))**2)
+    assert morse.v(0.7) == 0
+    assert (morse.v(0.7 + 1e-6) - morse.v(0.7 - 1e-6))/2e-6 == pytest.approx(0, abs=1e-8)
+    assert morse.v(60.0) == pytest.approx(22)
+
+
+@pytest.mark.parametrize('D, a', [(22, 1.0), (8, 0.5)])
+def test_morse_rho_all_equals_rho(D, a):
+    morse = Morse(D, a, 0)
+    # the highest bound states reach far out
+    x = np.linspace(-4/a, 200/a, 100001)
+    densities = morse.rho_all(x)
+    n_states = int(np.sqrt(2*D)/a - 0.5) + 1
+    assert densities.shape == (n_states, len(x))
+    for n in range(n_states):
+        assert np.allclose(densities[n], morse.rho(n, x), rtol=1e-12, atol=0)
+        assert np.sum(densities[n])*(x[1] - x[0]) == pytest.approx(1, rel=1e-6)
+    assert np.all(np.isnan(morse.rho(n_states, x)))
+    assert np.isnan(morse.E(n_states))
+
+
+def test_qho_rho_is_normalized():
+    qho = QHO(2.5)
+    x = np.linspace(-10, 10, 4001)
+    for n in range(6):
+        assert np.sum(qho.rho(n, x))*(x[1] - x[0]) == pytest.approx(1, rel=1e-8)
+
+
+def test_hydlike_invalid_arguments_are_nan():
+    atom = hydlike(3)
+    assert np.isnan(atom.E(0))
+    assert np.array_equal(np.isnan(atom.v(np.array([-1.0, 0.0, 2.0]))), [True, True, False])
+    assert atom.v(2.0) == -1.5
+
+
+def test_coulomb_vectorized():
+    mol = [[7, 0, 0, 0], [8, 1.1, 0.3, -0.2]]
+    r = np.random.default_rng(0).normal(size=(4, 5, 3))
+    expected = sum(-Z/np.linalg.norm(r - R, axis=-1) for Z, *R in mol)
+    assert np.allclose(Coulomb_3D(mol).v(r), expected, rtol=1e-14)
+    assert Coulomb_3D(mol).v(r[0, 0]) == pytest.approx(expected[0, 0], rel=1e-14)
+
+
+def _H_recursive(n, x):
+    # the recursive Hermite polynomials of earlier versions
+    if n == 0:
+        return np.ones_like(x)
+    if n == 1:
+        return 2*x
+    return 2*x*_H_recursive(n-1, x) - 2*(n-1)*_H_recursive(n-2, x)
+
+
+def _L_recursive(n, alpha, x):
+    # the recursive associated Laguerre polynomials of earlier versions
+    if n == 0:
+        return np.ones_like(x)
+    if n == 1:
+        return 1 + alpha - x
+    return ((2*(n - 1) + 1 + alpha - x)*_L_recursive(n - 1, alpha, x) - (n - 1 + alpha)*_L_recursive(n - 2, alpha, x))/n
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 7, 12])
+def test_recurrences_equal_recursive_polynomials(n):
+    x = np.linspace(-3, 6, 37)
+    assert np.allclose(_H(n, x), _H_recursive(n, x), rtol=1e-12, atol=0)
+    for alpha in [0.0, 1.5, 3.0]:
+        assert np.allclose(_L(n, alpha, x), _L_recursive(n, alpha, x), rtol=1e-12, atol=1e-12)
+        # the normalized family and the logarithm
+        L_hat = _polynomials('L_hat', n, x, alpha)[n]
+        assert np.allclose(L_hat, _L_recursive(n, alpha, x)*np.exp((gammaln(n + 1) - gammaln(n + alpha + 1))/2),
+                           rtol=1e-12, atol=1e-12)
+        nonzero = np.abs(L_hat) > 1e-8
+        assert np.allclose(_log_polynomial('L_hat', n, x, alpha)[nonzero], np.log(np.abs(L_hat[nonzero])), atol=1e-10)
+    psi = _polynomials('psi', n, x)[n]
+    assert np.allclose(psi, _H_recursive(n, x)*np.exp(-x**2/2 - (n*np.log(2) + gammaln(n + 1))/2)/np.pi**0.25,
+                       rtol=1e-12, atol=1e-15)
+
+
+def test_coulomb_columns_match_direct(tmp_path):
+    mol = [[7, 0, 0, 0], [8, 1.1, 0.3, -0.2], [1, -0.9, 1.2, 0.4], [6, 0.2, -1.5, 0.9]]
+    points = np.random.default_rng(3).uniform(-3, 3, size=(1000, 3))
+    # a small max_memory splits the positions into many chunks
+    columns = CoulombColumns(Coulomb_3D(mol), points, max_memory=4096)
+    for a, atom in enumerate(mol):
+        assert columns.columns[a] == pytest.approx(Coulomb_3D([[1] + atom[1:]]).v(points), rel=1e-12)
+    assert columns.v() == pytest.approx(Coulomb_3D(mol).v(points), rel=1e-12)
+
+    # mutations on the same geometry
+    target = [[6, 0, 0, 0], [8, 1.1, 0.3, -0.2], [1, -0.9, 1.2, 0.4], [7, 0.2, -1.5, 0.9]]
+    expected = Coulomb_3D(target).v(points) - Coulomb_3D(mol).v(points)
+    assert columns.delta_v({0: 6, 3: 7}) == pytest.approx(expected, rel=1e-10, abs=1e-12)
+    many = columns.delta_v_many([[Z for Z, *_ in target], [Z for Z, *_ in mol]])
+    assert many[0] == pytest.approx(expected, rel=1e-10, abs=1e-12)
+    assert np.all(many[1] == 0)
+    mutated = columns.mutate({0: 6, 3: 7})
+    assert mutated.v() == pytest.approx(Coulomb_3D(target).v(points), rel=1e-12)
+    assert mutated.columns is columns.columns and columns.charges[0] == 7
+
+    # the memory-mapped columns are reused for the same shape
+    filename = str(tmp_path/'columns.npy')
+    stored = CoulombColumns(mol, points, filename=filename)
+    assert np.array_equal(np.load(filename), columns.columns)
+    del stored
+    np.save(filename, np.zeros((4, 1000)))
+    assert np.all(CoulombColumns(mol, points, filename=filename).columns == 0)
+    # but not for another shape
+    assert CoulombColumns(mol, points[:10], filename=filename).columns == pytest.approx(columns.columns[:, :10])
@@ -0,0 +1,94 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from pyalchemy import profiling
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.profiling import instrumented, profiling as profile_block, span
+
+
+@instrumented
+def leaf(n):
+    with span('leaf.sleep', points=n):
+        time.sleep(0.001)
+    return n
+
+
+@instrumented
+def outer(n):
+    return sum(leaf(m) for m in range(n))
+
+
+def test_nested_spans():
+    with profile_block() as profile:
+        outer(3)
+        outer(2)
+    summary = profile.summary()
+    assert {name: entry['calls'] for name, entry in summary.items()} == {'outer': 2, 'leaf': 5, 'leaf.sleep': 5}
+    for entry in summary.values():
+        assert 0 <= entry['self_time'] <= entry['time'] <= profile.wall_time
+    # the time of a span is its self time and the time of its children
+    assert summary['outer']['time'] == pytest.approx(summary['outer']['self_time'] + summary['leaf']['time'])
+    assert summary['leaf']['time'] == pytest.approx(summary['leaf']['self_time'] + summary['leaf.sleep']['time'])
+    assert summary['leaf.sleep']['self_time'] == summary['leaf.sleep']['time'] >= 0.005
+    assert summary['leaf.sleep']['points'] == 0 + 1 + 2 + 0 + 1
+    assert 'points' not in summary['outer']
+    # sorted by time, the outermost first
+    assert list(summary) == ['outer', 'leaf', 'leaf.sleep']
+
+
+def test_disabled_records_nothing():
+    profile = profiling.Profile()
+    assert not profiling.is_enabled()
+    assert outer(2) == 1
+    assert profile.summary() == {}
+    with profile_block() as first:
+        with profile_block() as second:
+            leaf(1)
+        # the enclosing profile is enabled again
+        assert profiling._active is first
+        leaf(1)
+    assert not profiling.is_enabled()
+    assert first.summary()['leaf']['calls'] == second.summary()['leaf']['calls'] == 1
+
+
+def test_kernel_spans():
+    X = np.linspace(0.1, 2, 50)[:, None]
+    with profile_block() as profile:
+        kernel_nD_batch(lambda X: np.sin(X[:, 0]), X, lambda lam: (1 + lam)*np.eye(1), lambda lam: np.zeros(1), 1e-4)
+    summary = profile.summary()
+    assert summary['kernel_nD_batch']['calls'] == 1
+    assert summary['kernel_nD_batch']['points'] == 50
+    assert all(entry['time'] <= summary['kernel_nD_batch']['time'] for entry in summary.values())
+
+
+def test_export(tmp_path):
+    with profile_block(max_events=4) as profile:
+        outer(3)
+    # the trace keeps the first spans which ended, the summary all of them
+    assert len(profile.events) == 4
+    assert sum(entry['calls'] for entry in profile.summary().values()) == 7
+
+    profile.export(str(tmp_path/'trace.json'))
+    with open(tmp_path/'trace.json') as file:
+        trace = json.load(file)
+    events = trace['traceEvents']
+    assert [event['name'] for event in events] == ['leaf.sleep', 'leaf', 'leaf.sleep', 'leaf']
+    for event in events:
+        assert event['ph'] == 'X'
+        assert event['ts'] >= 0 and event['dur'] >= 0
+        assert isinstance(event['pid'], int) and event['tid'] == 0
+    # a child lies within its parent
+    child, parent = events[0], events[1]
+    assert parent['ts'] <= child['ts'] and child['ts'] + child['dur'] <= parent['ts'] + parent['dur']
+    assert events[0]['args'] == {'points': 0}
+
+    profile.export(str(tmp_path/'summary.json'), format='summary')
+    with open(tmp_path/'summary.json') as file:
+        data = json.load(file)
+    assert data['wall_time'] == profile.wall_time
+    assert data['summary']['outer']['calls'] == 1
+    with pytest.raises(ValueError):
+        profile.export(str(tmp_path/'profile.txt'), format='text')
@@ -0,0 +1,107 @@
+import importlib.util
+import os
+import itertools
+from collections import Counter
+from math import comb, factorial, prod
+
+import numpy as np
+import pytest
+
+
+def _load_0_0_7(name):
+    # the modules of version 0.0.7 are not on the PYTHONPATH, they are loaded from their files
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pyalchemy0.0.7', name + '.py')
+    spec = importlib.util.spec_from_file_location('pyalchemy_0_0_7_' + name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+kernels = _load_0_0_7('kernels')
+potentials = _load_0_0_7('potentials')
+
+
+def counted(omega, calls):
+    # partial_v of 1 + omega^2/2 |x|^2 which counts the calls per multi-index
+    def partial_v(*arguments):
+        n, x = arguments[:len(arguments)//2], arguments[len(arguments)//2:]
+        calls[tuple(int(n_i) for n_i in n)] += 1
+        if sum(n) == 0:
+            return 1 + 0.5*omega**2*sum(x_i**2 for x_i in x)
+        if sum(n) == 1:
+            return omega**2*x[list(n).index(1)]
+        if max(n) == 2 and sum(n) == 2:
+            return omega**2
+        return 0.0
+    return partial_v
+
+
+@pytest.mark.parametrize('dim', [1, 2, 3])
+@pytest.mark.parametrize('orders', [[1, 2, 3, 5], [5, 3, 2, 1], [2], [1]])
+def test_every_derivative_once(dim, orders):
+    calls_A, calls_B = Counter(), Counter()
+    kernel = [kernels.kernel_1D, kernels.kernel_2D, kernels.kernel_3D][dim - 1]
+    kernel(counted(1.0, calls_A), counted(1.1, calls_B), *[0.3, -0.2, 0.7][:dim], orders=orders)
+
+    # the multi-indices of all orders, and the zeroth derivative
+    needed = {(0,)*dim}
+    for p in orders:
+        if p > 1:
+            needed |= {tuple(int(mu) for mu in row) for row in kernels._Diophantine(p, dim)[0][:, :dim]}
+    for calls in (calls_A, calls_B):
+        assert set(calls) == needed
+        assert set(calls.values()) == {1}
+
+
+@pytest.mark.parametrize('p', [2, 5, 9, 10, 11])
+@pytest.mark.parametrize('dim', [1, 2, 3])
+def test_Diophantine_is_complete(p, dim):
+    # brute force: all k with sum_i i*k_i = p-1, combined with all mu with sum(mu) = sum(k)
+    k_all = [k for k in itertools.product(*[range((p - 1)//i + 1) for i in range(1, p)])
+             if sum(i*k_i for i, k_i in enumerate(k, 1)) == p - 1]
+    expected = sorted(list(mu) + list(k) for k in k_all
+                      for mu in itertools.product(range(sum(k) + 1), repeat=dim) if sum(mu) == sum(k))
+    table, coefficients = kernels._Diophantine(p, dim)
+    assert table.tolist() == expected
+    assert coefficients.tolist() == [1/prod(factorial(k_i) for k_i in row[dim:]) for row in expected]
+    assert not table.flags.writeable
+
+
+# the number of partitions of n = 0, ..., 12
+PARTITIONS = [1, 1, 2, 3, 5, 7, 11, 15, 22, 30, 42, 56, 77]
+
+
+@pytest.mark.parametrize('p', range(2, 14))
+def test_Diophantine_counts(p):
+    assert len(kernels._Diophantine_1D(p)) == PARTITIONS[p - 1]
+    # every partition into m parts is spread over the dim directions in comb(m+dim-1, dim-1) ways
+    for dim, Diophantine in [(2, kernels._Diophantine_2D), (3, kernels._Diophantine_3D)]:
+        assert len(Diophantine(p)) == sum(comb(sum(k) + dim - 1, dim - 1) for k in kernels._partitions(p - 1))
+
+
+def test_coulomb_regularized_at_nuclei():
+    mol = [[7, 0, 0, 0], [8, 1.1, 0.3, -0.2]]
+    x = np.array([0.0, 1.1, 0.4])
+    y = np.array([0.0, 0.3, -0.5])
+    z = np.array([0.0, -0.2, 0.6])
+    for n in [(0, 0, 0), (1, 0, 0), (0, 2, 1), (4, 1, 0)]:
+        assert np.all(np.isfinite(potentials.partial_v_mol_3D(mol, *n, x, y, z)))
+    # the regulator of the explicit formulas, e.g. -Z_i/(|r - R_i| + _reg) and the second derivative
+    V = potentials.partial_v_mol_3D(mol, 0, 0, 0, x, y, z)
+    assert V[0] == pytest.approx(-7/potentials._reg - 8/np.sqrt(1.1**2 + 0.3**2 + 0.2**2))
+    d = np.array([[x_i - X for x_i, X in zip((x[2], y[2], z[2]), R)] for _, *R in mol])
+    s = np.sum(d**2, axis=1)
+    expected = sum(Z*(-2*d_i[0]**2 + d_i[1]**2 + d_i[2]**2)/(s_i**(5/2) + potentials._reg)
+                   for (Z, *_), d_i, s_i in zip(mol, d, s))
+    assert potentials.partial_v_mol_3D(mol, 2, 0, 0, x[2], y[2], z[2]) == pytest.approx(expected, rel=1e-12)
+
+
+def test_coulomb_matches_src():
+    # the recurrence of version 0.0.7 is a copy of the one in src, up to the regulator
+    from pyalchemy.potentials import Coulomb_3D
+    mol = [[7, 0, 0, 0], [8, 1.1, 0.3, -0.2], [1, -0.9, 1.2, 0.4]]
+    r = np.random.default_rng(0).uniform(-3, 3, size=(20, 3))
+    indices, expected = Coulomb_3D(mol).derivatives(5, r)
+    values = potentials.partial_v_mol_3D_all(mol, 5, *r.T)
+    for index, value in zip(indices, expected):
+        assert values[tuple(index)] == pytest.approx(value, rel=1e-5, abs=1e-8)
@@ -0,0 +1,199 @@
+import importlib
+import importlib.util
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+
+def _load_0_1_0(name):
+    # version 0.1.0 is not on the PYTHONPATH, its package is loaded from its directory
+    package = 'pyalchemy_0_1_0'
+    if package not in sys.modules:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pyalchemy0.1.0')
+        spec = importlib.util.spec_from_file_location(package, os.path.join(path, '__init__.py'),
+                                                      submodule_search_locations=[path])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[package] = module
+        spec.loader.exec_module(module)
+    return importlib.import_module(package + '.' + name)
+
+
+kernels = _load_0_1_0('kernels')
+potentials = _load_0_1_0('potentials')
+taylor = _load_0_1_0('taylor')
+
+
+def Bell_recursive(n, k, x):
+    # the recursive definition of the partial Bell polynomials, as in the original _Bell
+    if n == 0 and k == 0:
+        return 1
+    if n == 0 or k == 0:
+        return 0
+    return sum(math.comb(n-1, i)*x[i]*Bell_recursive(n-i-1, k-1, x) for i in range(n-k+1))
+
+
+def test_factorials_and_binomials_are_exact():
+    assert kernels._fc(25) == math.factorial(25) and isinstance(kernels._fc(25), int)
+    assert kernels._bn(30, 12) == math.comb(30, 12)
+    assert kernels._bn(3, 5) == 0
+    table = kernels._binomials(6)
+    assert table[6].tolist() == [1, 6, 15, 20, 15, 6, 1]
+    assert not table.flags.writeable
+
+
+def test_Bell_table_matches_recursion():
+    x = np.random.default_rng(0).normal(size=(7, 5))
+    B = kernels._Bell_table(7, x)
+    for n in range(8):
+        for k in range(n+1):
+            assert B[n, k] == pytest.approx(Bell_recursive(n, k, x), rel=1e-12, abs=1e-12)
+            assert kernels._Bell(n, k, x) == pytest.approx(B[n, k], rel=1e-12, abs=1e-12)
+    assert kernels._Bell(2, 3, x) == 0
+    # known values: B(n, k) of ones are the Stirling numbers of the second kind, B(4, 2) = 4 x1 x3 + 3 x2^2
+    assert kernels._Bell_table(5, np.ones(5))[5].tolist() == [0, 1, 15, 25, 10, 1]
+    assert kernels._Bell(4, 2, [1.0, 2.0, 3.0]) == 4*3 + 3*2**2
+
+
+def g_recursive(i, f, x):
+    # the original coefficients of the inverse, one Bell polynomial at a time
+    f1 = f(1, x)
+    if i == 1:
+        return 1/f1
+    f_hat = [f(k+1, x)/((k+1)*(f1 + kernels._reg)) for k in range(1, i)]
+    return sum((-1)**k*(math.factorial(i+k-1)/math.factorial(k-1))*Bell_recursive(i-1, k, f_hat)
+               for k in range(1, i))/f1**i
+
+
+def test_inverse_matches_recursion():
+    def f(k, x):
+        return np.exp(0.7*x)*0.7**k + (x if k == 0 else 1.0 if k == 1 else 0.0)
+    x = np.linspace(-1, 1, 5)
+    g = kernels._g_all(6, f, x)
+    for i in range(1, 7):
+        assert g[i-1] == pytest.approx([g_recursive(i, f, y) for y in x], rel=1e-12)
+        assert kernels._g(i, f, 0.5) == pytest.approx(g_recursive(i, f, 0.5), rel=1e-12)
+    # Lagrange inversion does not hold where the first derivative vanishes
+    assert np.all(kernels._g_all(3, lambda k, x: np.sin(x), np.array([0.0, 1.0]))[:, 0] == 0)
+
+
+def kernel_1D_recursive(v_A, v_B, x, max_order=4, h=0.01):
+    # the original kernel_1D, which evaluates the potentials anew for every order and every node
+    summe = v_B(0, x) - v_A(0, x)
+    for p in range(2, max_order+1):
+        for k in range(1, p):
+            def f(y):
+                g_vec = [-g_recursive(i, v_A, y) for i in range(1, p-k+1)]
+                return Bell_recursive(p-1, k, g_vec)*(v_B(0, y) - v_A(0, y))**p
+            derivative = sum((-1)**i*math.comb(k, i)*f(x + (k/2 - i)*h) for i in range(k+1))/h**k
+        summe += derivative/math.factorial(p)
+    return summe
+
+
+PAIRS = [(potentials.QHO(1.0), potentials.QHO(1.2)), (potentials.Morse(10, 0.5, 0), potentials.Morse(10, 0.45, 0.1))]
+
+
+@pytest.mark.parametrize('max_order', [1, 2, 4, 5])
+@pytest.mark.parametrize('A, B', PAIRS)
+def test_kernel_1D_matches_recursion(A, B, max_order):
+    for x in [-0.7, 0.3, 1.9]:
+        assert kernels.kernel_1D(A.v, B.v, x, max_order) == pytest.approx(
+            kernel_1D_recursive(A.v, B.v, x, max_order), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('A, B', PAIRS)
+def test_kernel_1D_grid_matches_kernel_1D(A, B):
+    # the spacing 0.025 is a multiple of h/2, so h is not lowered and the nodes are shared exactly
+    for x in [np.linspace(-1, 2, 121), np.linspace(2, -1, 121), np.array([0.4, -0.3, 1.7, 0.41])]:
+        expected = [kernels.kernel_1D(A.v, B.v, y) for y in x]
+        assert kernels.kernel_1D_grid(A.v, B.v, x) == pytest.approx(expected, rel=1e-9, abs=1e-12)
+    # otherwise h is lowered, which only changes the error of the finite differences, away from the
+    # minimum of v_A where the kernel is singular
+    x = np.linspace(0.5, 2, 97)
+    expected = [kernels.kernel_1D(A.v, B.v, y) for y in x]
+    assert kernels.kernel_1D_grid(A.v, B.v, x) == pytest.approx(expected, rel=1e-3, abs=1e-6)
+
+
+def test_kernel_1D_grid_evaluates_every_node_once():
+    calls = []
+
+    def v_A(k, x):
+        calls.append((k, x))
+        return potentials.QHO(1.0).v(k, x)
+
+    x = np.linspace(-1, 2, 121)
+    kernels.kernel_1D_grid(v_A, potentials.QHO(1.2).v, x, max_order=4)
+    # neighbouring points share their nodes: the lattice of spacing h/2 = 0.005 has 5 nodes between
+    # two points, and 3 on either side of the grid
+    nodes = {y for k, y in calls}
+    assert len(calls) == len(set(calls)) == 4*len(nodes)
+    assert len(nodes) == 5*120 + 7
+
+
+def falling(alpha, n):
+    # alpha (alpha - 1) ... (alpha - n + 1)
+    return math.prod(alpha - j for j in range(n))
+
+
+X = np.array([0.3, 1.0, 2.5])
+K = 7
+def x_to_the_x(n, x):
+    return x**x*[1, 1 + np.log(x), (1 + np.log(x))**2 + 1/x][n]
+
+
+def sinc(n, x):
+    return [np.sin(x)/x, (x*np.cos(x) - np.sin(x))/x**2, -np.sin(x)/x - 2*np.cos(x)/x**2 + 2*np.sin(x)/x**3][n]
+
+
+# the functions, their analytical derivatives and the highest order known
+SERIES = [
+    (lambda x: np.exp(x), lambda n, x: np.exp(x), K),
+    (lambda x: np.exp(-2*x), lambda n, x: (-2)**n*np.exp(-2*x), K),
+    (lambda x: np.log(x), lambda n, x: np.log(x) if n == 0 else (-1)**(n-1)*math.factorial(n-1)/x**n, K),
+    (lambda x: np.sqrt(x), lambda n, x: falling(0.5, n)*x**(0.5 - n), K),
+    (lambda x: x**2.5, lambda n, x: falling(2.5, n)*x**(2.5 - n), K),
+    (lambda x: x**3, lambda n, x: falling(3, n)*x**(3 - n) if n <= 3 else 0*x, K),
+    (lambda x: 2.0**x, lambda n, x: np.log(2)**n*2**x, K),
+    (lambda x: x**x, x_to_the_x, 2),
+    (lambda x: 1/(1 + x), lambda n, x: (-1)**n*math.factorial(n)/(1 + x)**(n+1), K),
+    (lambda x: np.sin(x)/x, sinc, 2),
+    (lambda x: np.cos(3*x), lambda n, x: 3**n*np.cos(3*x + n*np.pi/2), K),
+    (lambda x: np.sinh(x) - np.cosh(x), lambda n, x: (-1)**(n+1)*np.exp(-x), K),
+]
+
+
+@pytest.mark.parametrize('v, expected, order', SERIES)
+def test_taylor_derivatives(v, expected, order):
+    values = taylor.derivatives(v, X, K)
+    assert values.shape == (K+1, len(X))
+    for n in range(order+1):
+        assert values[n] == pytest.approx(expected(n, X), rel=1e-11, abs=1e-11)
+
+
+def test_taylor_division_and_integer_powers_at_zero():
+    # the series of x^3 vanishes at 0, where x^alpha with a float alpha would divide by zero
+    assert taylor.derivatives(lambda x: x**3, 0.0, 5).tolist() == [0, 0, 0, 6, 0, 0]
+    assert taylor.derivatives(lambda x: x**0, 0.0, 3).tolist() == [1, 0, 0, 0]
+    q = taylor.derivatives(lambda x: (x**2 + 1)/(x - 2), X, 4)
+    assert q[3] == pytest.approx(-30/(X - 2)**4)
+    # constants and unsupported functions
+    assert taylor.derivatives(lambda x: 4.0, X, 2).tolist() == [[4.0]*3, [0.0]*3, [0.0]*3]
+    with pytest.raises(TypeError):
+        taylor.derivatives(np.arctan, X, 2)
+
+
+def test_taylor_potential_matches_morse():
+    D, a, r_e = 10, 0.5, 0.3
+    morse = potentials.Morse(D, a, r_e)
+    v = taylor.TaylorPotential(lambda x: D*(1 - np.exp(-a*(x - r_e)))**2)
+    x = np.linspace(-2, 6, 17)
+    derivatives = kernels._derivatives(v, 6, x)
+    # Morse uses the constant e of the module, which is truncated to 9 digits
+    for k in range(7):
+        assert derivatives[k] == pytest.approx([morse.v(k, y) for y in x], rel=1e-7, abs=1e-7)
+        assert v(k, 1.5) == pytest.approx(morse.v(k, 1.5), rel=1e-7)
+    # and so do the kernels
+    B = potentials.Morse(D, 0.45, r_e)
+    assert kernels.kernel_1D_grid(v, B.v, x[x > 1]) == pytest.approx(kernels.kernel_1D_grid(morse.v, B.v, x[x > 1]), rel=1e-6)
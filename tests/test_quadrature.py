@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.quadrature import adaptive, fixed_rule, get_quadrature, set_quadrature
+
+
+@pytest.fixture
+def restore_quadrature():
+    rule, options = get_quadrature()
+    yield
+    set_quadrature(rule, **options)
+
+
+def exponentials(c):
+    # the integrands exp(c_j lambda) of all integrands j, and their integrals over [0, 1]
+    def f(nodes, active):
+        return np.exp(np.outer(nodes, c[active]))
+    return f, np.expm1(c)/c
+
+
+@pytest.mark.parametrize('order', [2, 5, 10, 16])
+def test_gauss_legendre_is_exact_for_polynomials(order):
+    nodes, weights, error_weights = fixed_rule('gauss-legendre', order=order)
+    for k in range(2*order):
+        assert weights @ nodes**k == pytest.approx(1/(k + 1), rel=1e-13)
+    # the null rule vanishes below the highest resolved degree and detects it
+    for k in range(order - 1):
+        assert abs(error_weights @ nodes**k) < 1e-14
+    assert error_weights @ np.polynomial.legendre.legval(2*nodes - 1, [0]*(order - 1) + [1]) == pytest.approx(0.5)
+
+
+def test_gauss_legendre_error_estimate_is_an_upper_bound():
+    nodes, weights, error_weights = fixed_rule('gauss-legendre', order=10)
+    f, exact = exponentials(np.array([0.5, 1.0, 3.0]))
+    values = f(nodes, np.arange(3))
+    assert np.all(np.abs(weights @ values - exact) <= np.abs(error_weights @ values))
+
+
+@pytest.mark.parametrize('mode', ['batch', 'point'])
+@pytest.mark.parametrize('rtol', [1e-6, 1e-10])
+def test_gauss_kronrod_converges(mode, rtol):
+    c = np.array([-20.0, -1.0, 0.5, 8.0])
+    f, exact = exponentials(c)
+    integral, error, evaluations = adaptive(f, len(c), 'gauss-kronrod', rtol, mode=mode)
+    assert np.all(np.abs(integral - exact) <= rtol*np.abs(exact))
+    assert np.all(error <= rtol*np.abs(exact))
+    # the steep integrand needs more bisections
+    assert evaluations[0] > evaluations[2] if mode == 'point' else np.all(evaluations == evaluations[0])
+
+
+def test_gauss_kronrod_with_endpoint_singularity():
+    def f(nodes, active):
+        return np.sqrt(nodes)[:, None]*np.ones(len(active))
+    integral, error, evaluations = adaptive(f, 1, 'gauss-kronrod', 1e-9)
+    assert integral[0] == pytest.approx(2/3, rel=1e-9)
+    assert evaluations[0] > 15
+
+
+@pytest.mark.parametrize('level, degree', [(1, 3), (2, 5), (3, 7)])
+def test_richardson_order(level, degree):
+    # the midpoint rule has an error expansion in h^2, so k extrapolations are exact up to degree 2k+1
+    def f(nodes, active):
+        return np.outer(nodes**degree + nodes**(degree - 1), np.ones(len(active)))
+    integral, error, evaluations = adaptive(f, 1, 'richardson', 1e-300, max_level=level)
+    assert integral[0] == pytest.approx(1/(degree + 1) + 1/degree, rel=1e-13)
+    assert evaluations[0] == 3**level
+
+    # but not for the next degree
+    def g(nodes, active):
+        return np.outer(nodes**(degree + 1), np.ones(len(active)))
+    assert adaptive(g, 1, 'richardson', 1e-300, max_level=level)[0][0] != pytest.approx(1/(degree + 2), rel=1e-13)
+
+
+def test_richardson_converges():
+    c = np.array([-5.0, 1.0, 4.0])
+    f, exact = exponentials(c)
+    integral, error, evaluations = adaptive(f, len(c), 'richardson', 1e-10)
+    assert np.all(np.abs(integral - exact) <= 1e-10*np.abs(exact))
+
+
+def test_set_quadrature_round_trip(restore_quadrature):
+    set_quadrature('gauss-legendre', order=7)
+    assert get_quadrature() == ('gauss-legendre', {'order': 7})
+    # the returned options are a copy
+    get_quadrature()[1]['order'] = 3
+    assert get_quadrature() == ('gauss-legendre', {'order': 7})
+    with pytest.raises(ValueError):
+        set_quadrature('trapezoidal')
+    assert get_quadrature() == ('gauss-legendre', {'order': 7})
+    set_quadrature('midpoint')
+    assert get_quadrature() == ('midpoint', {})
+
+
+@pytest.mark.parametrize('rule, options', [('gauss-legendre', {'order': 7}), ('gauss-kronrod', {}), ('richardson', {})])
+def test_kernels_use_selected_rule(restore_quadrature, rule, options):
+    def Delta_v(X):
+        return np.sin(X[:, 0])
+
+    def A(lam):
+        return (1 + lam)*np.eye(1)
+
+    def b(lam):
+        return np.zeros(1)
+
+    X = np.linspace(0.1, 2, 7)[:, None]
+    explicit = kernel_nD_batch(Delta_v, X, A, b, 1e-8, rule=rule, **options)
+    set_quadrature(rule, **options)
+    assert np.array_equal(kernel_nD_batch(Delta_v, X, A, b, 1e-8), explicit)
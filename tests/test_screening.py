@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.potentials import Coulomb_3D
+from pyalchemy.quadrature import get_quadrature, set_quadrature
+from pyalchemy.screening import screen
+
+N_2 = [[7, 0, 0, 0], [7, 2.076, 0, 0]]
+
+
+def grid():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-3, 5, size=(2000, 3))
+    return points, np.full(len(points), 512/len(points))
+
+
+def rho(X):
+    return sum(np.exp(-np.linalg.norm(X - R, axis=1)) for _, *R in N_2)
+
+
+def test_charges_and_molecules_agree():
+    targets = [[6, 8], [8, 6], [7, 8]]
+    by_charges = screen((rho, Coulomb_3D(N_2)), targets, grid())
+    by_molecules = screen((rho, Coulomb_3D(N_2)), [Coulomb_3D([[Z_1, 0, 0, 0], [Z_2, 2.076, 0, 0]])
+                                                   for Z_1, Z_2 in targets], grid())
+    assert np.allclose([Delta_E for _, Delta_E in by_charges], [Delta_E for _, Delta_E in by_molecules])
+
+
+def test_molecule_of_other_geometry_raises():
+    with pytest.raises(ValueError):
+        screen((rho, Coulomb_3D(N_2)), [Coulomb_3D([[6, 0, 0, 0], [8, 2.2, 0, 0]])], grid())
+
+
+def test_mixed_targets_raise():
+    v_B = Coulomb_3D([[6, 0, 0, 0], [8, 2.076, 0, 0]]).v
+    with pytest.raises(ValueError, match='all charges/Coulomb_3D or all callables'):
+        screen((rho, Coulomb_3D(N_2)), [[6, 8], v_B], grid())
+    with pytest.raises(ValueError):
+        screen((rho, Coulomb_3D(N_2).v), [[6, 8]], grid())
+
+
+@pytest.mark.parametrize('rule, order', [('midpoint', None), ('gauss-legendre', 4)])
+def test_screen_uses_selected_rule(rule, order):
+    def A(lam):
+        return (1 + 0.1*lam)*np.eye(3)
+
+    def b(lam):
+        return np.zeros(3)
+
+    v_A, v_B = Coulomb_3D(N_2).v, Coulomb_3D([[6, 0, 0, 0], [8, 2.076, 0, 0]]).v
+    points, weights = grid()
+    K = kernel_nD_batch(lambda Y: v_B(Y) - v_A(Y), points, A, b, 1e-4, rule=rule, order=order)
+    expected = np.sum(weights*rho(points)*K)
+    previous = get_quadrature()
+    try:
+        set_quadrature(rule, **({} if order is None else {'order': order}))
+        for targets in ([v_B], [[6, 8]]):
+            [(_, Delta_E)] = screen((rho, Coulomb_3D(N_2)), targets, (points, weights), A=A, b=b, rtol=1e-4)
+            assert Delta_E == pytest.approx(expected, rel=1e-10)
+    finally:
+        set_quadrature(previous[0], **previous[1])
+    [(_, Delta_E)] = screen((rho, Coulomb_3D(N_2)), [v_B], (points, weights), A=A, b=b, rtol=1e-4, rule=rule,
+                            order=order)
+    assert Delta_E == pytest.approx(expected, rel=1e-10)
@@ -0,0 +1,18 @@
+import numpy as np
+
+from pyalchemy.store import ReferenceStore
+
+
+def test_put_same_content_merges_metadata(tmp_path):
+    store = ReferenceStore(str(tmp_path))
+    points = np.linspace(-1, 1, 11)
+    weights, rho = np.full(11, 0.2), np.exp(-points**2)
+    key = store.put(points, weights, rho, metadata={'name': 'a', 'basis': 'cc-pVDZ'})
+    assert store.put(points, weights, rho, metadata={'name': 'b'}) == key
+    assert store.keys() == [key]
+    assert store.find(name='b') == [key]
+    assert store.find(name='a') == []
+    assert store.open(key).metadata == {'name': 'b', 'basis': 'cc-pVDZ'}
+    # no temporary directories are left behind
+    assert sorted(path.name for path in tmp_path.iterdir()) == [key]
+    assert np.array_equal(store.open(key).rho, rho)
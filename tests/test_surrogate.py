@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from pyalchemy.integrate import delta_E
+from pyalchemy.kernels import kernel_nD_batch
+from pyalchemy.surrogate import KernelSurrogate
+
+
+def Delta_v(X):
+    return np.exp(-0.5*(X[:, 0] - 1)) - np.exp(-0.45*(X[:, 0] - 1.1))
+
+
+def A(lam):
+    return (1 + 0.1*lam)*np.eye(1)
+
+
+def b(lam):
+    return np.array([0.05*lam])
+
+
+def kernel(x):
+    return kernel_nD_batch(Delta_v, x[:, None], A, b, 1e-10, rule='gauss-legendre', order=12)
+
+
+@pytest.mark.parametrize('rtol, atol', [(1e-8, 1e-12), (1e-4, 1e-6)])
+def test_certified_between_nodes(rtol, atol):
+    surrogate = KernelSurrogate(kernel, -3, 20, rtol=rtol, atol=atol)
+    assert surrogate.certified
+    assert len(surrogate.coefficients) == len(surrogate.breakpoints) - 1
+    assert np.all(np.diff(surrogate.breakpoints) > 0)
+    # random positions, i.e. neither nodes nor check points
+    x = np.sort(np.random.default_rng(0).uniform(-3, 20, 5000))
+    exact = kernel(x)
+    index = np.searchsorted(surrogate.breakpoints, x, side='right') - 1
+    scale = np.array([np.abs(kernel(np.linspace(lower, upper, 50))).max()
+                      for lower, upper in zip(surrogate.breakpoints[:-1], surrogate.breakpoints[1:])])
+    assert np.all(np.abs(surrogate(x) - exact) <= 10*(atol + rtol*scale[index]))
+    # and the same at the bounds of the interval and the pieces
+    assert surrogate(surrogate.breakpoints) == pytest.approx(kernel(surrogate.breakpoints), rel=10*rtol, abs=10*atol)
+
+
+def test_shapes_and_delta_E():
+    surrogate = KernelSurrogate(kernel, -3, 20)
+    x = np.linspace(-3, 20, 2001)
+    assert np.shape(surrogate(0.5)) == ()
+    assert surrogate(x.reshape(3, -1)[:, :-1]).shape == (3, 666)
+    assert surrogate(x[:, None]).shape == (2001,)
+    weights = np.full(len(x), x[1] - x[0])
+    rho = np.exp(-(x - 2)**2)
+    assert delta_E(rho, surrogate, x[:, None], weights, workers=1) == pytest.approx(
+        delta_E(rho, lambda X: kernel(X[:, 0]), x[:, None], weights, workers=1), rel=1e-7)
+    for outside in (-3.1, [0, 20.5]):
+        with pytest.raises(ValueError):
+            surrogate(outside)
+    with pytest.raises(ValueError):
+        KernelSurrogate(kernel, 1, 1)
+
+
+def test_scalar_kernel():
+    def scalar(x):
+        return np.sin(x)/(1 + x**2)
+    surrogate = KernelSurrogate(scalar, -5, 5, degree=16, vectorized=False)
+    assert surrogate.certified
+    # every piece evaluates its nodes and its check points
+    assert surrogate.evaluations >= (2*16 + 1)*len(surrogate.coefficients)
+    x = np.linspace(-5, 5, 1001)
+    # |K| < 0.5, i.e. within rtol/2 + atol
+    assert surrogate(x) == pytest.approx(scalar(x), abs=0.5e-8 + 1e-12)
+
+
+@pytest.mark.parametrize('f', [np.sign, lambda x: 1/x, lambda x: np.where(x > 0.3, np.nan, x)])
+def test_certification_fails(f):
+    # jumps, poles and NaN cannot be interpolated; the pieces are bisected until max_intervals
+    with np.errstate(divide='ignore', invalid='ignore'):
+        surrogate = KernelSurrogate(f, -1, 1.2, max_intervals=16)
+    assert not surrogate.certified
+    assert len(surrogate.coefficients) <= 16
+    # the pieces away from the problem are fine
+    assert np.max(surrogate.errors) > 1 and np.min(surrogate.errors) < 1e-8
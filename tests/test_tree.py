@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from pyalchemy.potentials import Coulomb_3D
+from pyalchemy.tree import CoulombTree
+
+
+def cloud(N, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.integers(1, 9, N), rng.uniform(-10, 10, (N, 3))]).astype(float)
+
+
+@pytest.mark.parametrize('theta', [0.3, 0.5, 0.8])
+def test_tree_within_opening_angle_error(theta):
+    mol = cloud(3000)
+    r = np.random.default_rng(1).uniform(-12, 12, (4000, 3))
+    direct = Coulomb_3D(mol).v(r)
+    tree = Coulomb_3D(mol, method='tree', theta=theta).v(r)
+    # a group of radius a < theta*d/2 at a distance d: the multipole series of positive charges is bounded
+    # by (a/d)^2 (1 + a/d)/(1 - a/d) relative to its exact potential, and so is the sum over all groups
+    t = theta/2
+    relative = np.abs(tree - direct)/np.abs(direct)
+    assert relative.max() <= t**2*(1 + t)/(1 - t)
+    # groups of atoms were replaced
+    assert relative.max() > 0
+
+
+def test_tree_is_exact_for_zero_opening_angle():
+    mol = cloud(500)
+    r = np.random.default_rng(2).uniform(-12, 12, (300, 3))
+    assert Coulomb_3D(mol, method='tree', theta=0).v(r) == pytest.approx(Coulomb_3D(mol).v(r), rel=1e-12)
+
+
+def test_sources_conserve_charge():
+    mol = cloud(2000)
+    tree = CoulombTree(mol, 0.5)
+    for center, radius in [(np.zeros(3), 1.0), (np.array([30.0, 0, 0]), 2.0), (np.array([5.0, -5, 5]), 0.1)]:
+        sources = tree.sources(center, radius)
+        assert sources[:, 0].sum() == pytest.approx(mol[:, 0].sum())
+        assert len(sources) < len(mol)